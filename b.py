@@ -1,43 +1,54 @@
-import streamlit as st
 import os
+import io
+import shutil
+import tempfile
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-from docx import Document
-from pydub import AudioSegment
-import speech_recognition as sr
-from moviepy.editor import VideoFileClip
+import wave
+import translation
 import requests
+import httpx
 import random
-from pydub import AudioSegment
+# Document, audio and speech backends (PyPDF2, python-docx, pydub,
+# SpeechRecognition) are imported inside the functions that use them, so
+# API workers only load what their requests actually need. The Streamlit UI
+# lives in streamlit_app.py.
 # Load environment variables from .env 
-from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import HTTPException
+from llm_backends import get_backend
+from llm_client import upstream
+from metrics import span
+from response_cache import cache_bypass, cache_key, get_cache
+from singleflight import get_singleflight
+from question_parser import json_instructions, parse_fill_in_the_blanks, parse_matching, parse_mcq, parse_true_false
+from chunking import estimate_tokens
+from topup import generate_with_topup
 
 
 load_dotenv()
 
-# Get API key from environment variables
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
-MODEL = "llama-3.1-sonar-small-128k-online"
+# Ask the model for JSON matching the question schema; "0" falls back to the legacy text prompts
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "1") == "1"
 
 # Function to extract text from PDF
-def extract_text_from_pdf(file_path):
-    reader = PdfReader(file_path)
-    text = "".join(page.extract_text() for page in reader.pages if page.extract_text())
-    return text
+def extract_text_from_pdf(file_path, pages=None):
+    import pdf_extraction
+
+    # Each page is extracted once; large documents are spread over a process pool
+    return pdf_extraction.extract_text_from_pdf(file_path, pages)
 
 # Function to extract text from Word document
 def extract_text_from_word(file_path):
+    from docx import Document
+
     doc = Document(file_path)
     return "\n".join(paragraph.text for paragraph in doc.paragraphs)
 
 # Function to load text
-def load_text(file_path_or_text):
+def load_text(file_path_or_text, pages=None):
     if os.path.isfile(file_path_or_text):
         if file_path_or_text.endswith('.pdf'):
-            return extract_text_from_pdf(file_path_or_text)
+            return extract_text_from_pdf(file_path_or_text, pages)
         elif file_path_or_text.endswith('.docx'):
             return extract_text_from_word(file_path_or_text)
         elif file_path_or_text.endswith('.txt'):
@@ -47,11 +58,24 @@ def load_text(file_path_or_text):
             raise ValueError("Unsupported file format. Use PDF, Word (.docx), or plain text files.")
     return file_path_or_text
 
+# Function to extract text from an uploaded document held in a file object
+def extract_text_from_file(file, filename, pages=None):
+    with span("extraction"):
+        if filename.endswith('.pdf'):
+            return extract_text_from_pdf(file, pages)
+        elif filename.endswith('.docx'):
+            return extract_text_from_word(file)
+        elif filename.endswith('.txt'):
+            return file.read().decode('utf-8')
+    raise ValueError("Unsupported file format. Use PDF, Word (.docx), or plain text files.")
+
 # Function to prepare audio files for speech-to-text
 def prepare_voice_file(path: str) -> str:
     if os.path.splitext(path)[1] == '.wav':
         return path
     elif os.path.splitext(path)[1] in ('.mp3', '.m4a', '.ogg', '.flac'):
+        from pydub import AudioSegment
+
         audio_file = AudioSegment.from_file(path, format=os.path.splitext(path)[1][1:])
         wav_file = os.path.splitext(path)[0] + '.wav'
         audio_file.export(wav_file, format='wav')
@@ -59,174 +83,310 @@ def prepare_voice_file(path: str) -> str:
     else:
         raise ValueError(f'Unsupported audio format: {os.path.splitext(path)[1]}')
     
-def convert_to_wav(input_audio, output_audio="converted_audio.wav"):
+# Convert audio to WAV; without an output path the WAV is returned in memory
+def convert_to_wav(input_audio, output_audio=None, format=None):
+    from pydub import AudioSegment
+
     try:
-        audio = AudioSegment.from_file(input_audio)
-        audio.export(output_audio, format="wav")
-        return output_audio
+        with span("transcoding"):
+            audio = AudioSegment.from_file(input_audio, format=format)
+            if output_audio is None:
+                output_audio = io.BytesIO()
+                audio.export(output_audio, format="wav")
+                output_audio.seek(0)
+                return output_audio
+            audio.export(output_audio, format="wav")
+            return output_audio
     except Exception as e:
         raise ValueError(f"Error converting audio file: {e}")
 
 
-# Speech-to-text transcription
-def transcribe_audio(audio_data, language="en-US"):
-    recognizer = sr.Recognizer()
+# Transcription and conversion failures are returned as text rather than
+# raised; these prefixes tell them apart from real transcripts (so they are
+# never cached)
+EXTRACTION_ERRORS = (
+    "Error with the speech recognition service",
+    "Could not understand the audio.",
+    "No transcription available.",
+    "File conversion error",
+    "Failed to process the video.",
+)
+
+
+def is_extraction_error(text):
+    return text.startswith(EXTRACTION_ERRORS)
+
+
+# Speech-to-text transcription.
+# Long recordings are split into segments that are recognized concurrently,
+# so memory is bounded by the segment size rather than the recording length.
+def transcribe_audio(audio_data, language="en-US", progress=None):
+    from transcription import RecognizerError, transcribe_segments
+
     try:
-        with sr.AudioFile(audio_data) as source:
-            audio = recognizer.record(source)
-        result = recognizer.recognize_google(audio, language=language, show_all=True)
-        
-        if not result or 'alternative' not in result:
-            return "No transcription available."
-
-        # Handle missing 'confidence' key
-        alternatives = result['alternative']
-        best_transcription = max(
-            alternatives,
-            key=lambda x: x.get('confidence', 0)  # Default confidence to 0 if missing
-        )['transcript']
-        return best_transcription
-    except sr.UnknownValueError:
-        return "Could not understand the audio."
-    except sr.RequestError as e:
+        with span("transcription"):
+            result = transcribe_segments(audio_data, language, progress=progress)
+    except RecognizerError as e:
         return f"Error with the speech recognition service: {e}"
+    except (wave.Error, EOFError):
+        return "Could not understand the audio."
 
+    if not result["segments"]:
+        return "No transcription available."
+    if not result["text"]:
+        return "Could not understand the audio."
+    return result["text"]
+
+
+# Transcribe speech from audio file.
+# ffmpeg decodes any input straight to 16 kHz mono PCM in a spooled file, so
+# memory stays bounded by the segment size however long the recording is.
+def speech_to_text(audio_path, language="en-US", progress=None):
+    from media import extract_audio_wav
 
-# Transcribe speech from audio file
-def speech_to_text(audio_path, language="en-US"):
-    recognizer = sr.Recognizer()
-    
     try:
-        # Convert input audio to WAV format if necessary
-        wav_file = convert_to_wav(audio_path)
-
-        with sr.AudioFile(wav_file) as source:
-            audio_data = recognizer.record(source)
-        result = recognizer.recognize_google(audio_data, language=language, show_all=True)
-        
-        if not result or 'alternative' not in result:
-            return "No transcription available."
-
-        # Handle missing 'confidence' key
-        alternatives = result['alternative']
-        best_transcription = max(
-            alternatives,
-            key=lambda x: x.get('confidence', 0)
-        )['transcript']
-        return best_transcription
-    except sr.UnknownValueError:
-        return "Could not understand the audio."
-    except sr.RequestError as e:
-        return f"Error with the speech recognition service: {e}"
-    except ValueError as e:
+        with span("transcoding"):
+            wav_file = extract_audio_wav(audio_path)
+    except (OSError, ValueError) as e:
         return f"File conversion error: {e}"
+    with wav_file:
+        return transcribe_audio(wav_file, language, progress)
+
+
+# Transcribe an uploaded audio file held in a file object.
+# WAV is read in place; other formats go through a temporary copy because
+# ffmpeg needs a seekable input for containers such as m4a.
+def transcribe_audio_file(file, filename, language="en-US", progress=None):
+    if os.path.splitext(filename)[1].lower() == ".wav":
+        return transcribe_audio(file, language, progress)
+    with temporary_copy(file, filename) as audio_path:
+        return speech_to_text(audio_path, language, progress)
 
 
-# Extract audio from video
-def extract_audio_from_video(video_path, output_audio_path="extracted_audio.wav"):
+# Extract audio from video with ffmpeg; without an output path a unique temporary WAV is used
+def extract_audio_from_video(video_path, output_audio_path=None):
+    from media import extract_audio_to_file
+
+    temporary = output_audio_path is None
+    if temporary:
+        fd, output_audio_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
     try:
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(output_audio_path, codec='pcm_s16le')
-        print(f"Audio extracted and saved to {output_audio_path}")
+        extract_audio_to_file(video_path, output_audio_path)
         return output_audio_path
-    except Exception as e:
+    except (OSError, ValueError) as e:
         print(f"Error extracting audio: {e}")
+        if temporary:
+            os.remove(output_audio_path)
         return None
 
-# Convert video to text
-def convert_video_to_text(video_path, language="en-US"):
-    audio_path = extract_audio_from_video(video_path)
-    if audio_path:
-        transcription = speech_to_text(audio_path, language)
-        return transcription
-    return "Failed to process the video."
+# Convert video to text.
+# ffmpeg decodes only the audio track, straight to 16 kHz mono PCM, which is
+# what the recognizer consumes, so no WAV files are written in between.
+def convert_video_to_text(video_path, language="en-US", progress=None):
+    from media import extract_audio_wav
+
+    try:
+        wav_file = extract_audio_wav(video_path)
+    except (OSError, ValueError) as e:
+        print(f"Error extracting audio: {e}")
+        return "Failed to process the video."
+    with wav_file:
+        return transcribe_audio(wav_file, language, progress)
+
+# Copy a file object to a uniquely named temporary file, for tools that need a real path
+@contextmanager
+def temporary_copy(file, filename):
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as copy:
+        shutil.copyfileobj(file, copy)
+        copy.flush()
+        yield copy.name
+
+# Copy a file object to a uniquely named temporary file that the caller must delete
+def spool_to_path(file, filename):
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as copy:
+            shutil.copyfileobj(file, copy)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+# Convert a temporary video copy to text, then delete it. Run in a worker
+# process, which owns the copy: it is removed only once the worker is done
+# with it, even if the caller has stopped waiting.
+def convert_temporary_video_to_text(video_path, language="en-US"):
+    try:
+        return convert_video_to_text(video_path, language)
+    finally:
+        os.remove(video_path)
+
+# Convert an uploaded video held in a file object to text.
+# ffmpeg needs a seekable input for most containers, so the video goes to a uniquely named temporary file.
+def convert_video_file_to_text(file, filename, language="en-US"):
+    with temporary_copy(file, filename) as video_path:
+        return convert_video_to_text(video_path, language)
 #Translation 
 class TextInput(BaseModel):
     text: str
 
 def translate_text(text: str, target_language: str) -> str:
-    """Translate text using Google Translate API."""
-    api_url = "https://translation.googleapis.com/language/translate/v2"
-    api_key = os.getenv("GOOGLE_TRANSLATE_API_KEY")
-
-    if not api_key:
-        raise HTTPException(status_code=500, detail="API key not configured.")
-
-    params = {
-        "q": text,
-        "target": target_language,
-        "format": "text",
-        "key": api_key,
-    }
-    try:
-        response = requests.post(api_url, params=params)
-        response.raise_for_status()
-        result = response.json()
-        return result["data"]["translations"][0]["translatedText"]
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Translation API error: {e}")
-    
+    """Translate text using Google Translate API (through the shared translation memory)."""
+    return translation.translate_text(text, target_language)
+
 def get_supported_languages() -> dict:
-    """Fetch supported languages from Google Translate API."""
-    api_url = "https://translation.googleapis.com/language/translate/v2/languages"
-    api_key = os.getenv("GOOGLE_TRANSLATE_API_KEY")
+    """Fetch supported languages from Google Translate API (cached with a TTL)."""
+    return translation.get_supported_languages()
 
-    if not api_key:
-        raise HTTPException(status_code=500, detail="API key not configured.")
 
-    params = {
-        "key": api_key,
-        "target": "en",  # Fetch language names in English
-    }
-    try:
-        response = requests.get(api_url, params=params)
-        response.raise_for_status()
-        result = response.json()
-        return {lang["name"]: lang["language"] for lang in result["data"]["languages"]}
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Language API error: {e}")
+# LLM-based question generation. The backend (Perplexity, any
+# OpenAI-compatible API, or the offline fake) is chosen by LLM_BACKEND.
+# Every call goes through the shared rate limiter and circuit breaker
+# (llm_client.upstream); failures raise resilience.UpstreamError, an
+# HTTPException with a 429/502/503 status.
+NO_OUTPUT = "No output received from the API."
 
 
+# Upstream usage for cost reporting: calls made, completions served from the
+# cache, and prompt/completion tokens sent and received (estimated)
+usage = {"calls": 0, "cached": 0, "prompt_tokens": 0, "completion_tokens": 0}
 
 
-# Perplexity-based question generation
-def query_perplexity(prompt, model=MODEL):
-    if not PERPLEXITY_API_KEY:
-        raise ValueError("Perplexity API key is missing. Please set the PERPLEXITY_API_KEY variable in your .env file.")
+def _record_usage(prompt, completion):
+    usage["calls"] += 1
+    usage["prompt_tokens"] += estimate_tokens(prompt)
+    usage["completion_tokens"] += estimate_tokens(completion)
 
-    headers = {
-        "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    
-    # Modify temperature to 0 for deterministic output
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant for generating educational questions."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0,  # Set temperature to 0 for deterministic responses
-        "max_tokens": 10000,  # Ensure an appropriate max token limit
-        # Optionally, add a seed parameter if supported by the API (uncomment below if supported)
-        "seed": 12345,  # Optional seed for deterministic responses (if supported by the API)
-    }
-    
-    try:
-        response = requests.post(PERPLEXITY_API_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        if 'choices' in result and len(result['choices']) > 0:
-            return result['choices'][0]['message']['content']
-        return "No output received from the API."
-    except requests.exceptions.RequestException as e:
-        return f"Error querying Perplexity API: {str(e)}"
 
+def query_llm(prompt, model=None):
+    backend = get_backend()
 
+    def call():
+        upstream.limiter.acquire_blocking(upstream.name)
+        return backend.complete_blocking(prompt, model)
 
-# Question generation functions with difficulty
-def generate_mcq(syllabus, num_questions, difficulty):
-    prompt = f"""
+    content = upstream.call_blocking(call)
+    _record_usage(prompt, content or "")
+    return content or NO_OUTPUT
+
+
+# Async variant used by the API server; shares one pooled client across requests.
+# Completions are deterministic (temperature 0, fixed seed), so successful
+# responses are cached by prompt and model, and concurrent identical prompts
+# are coalesced into a single upstream call. With `cache_if`, a completion is
+# only cached when cache_if(text) is true (e.g. it parses to some questions),
+# so an unusable answer is not replayed to every later identical request.
+async def aquery_llm(prompt, model=None, timeout=None, cache_if=None):
+    backend = get_backend()
+    model = model or backend.model
+    cache = get_cache()
+    key = cache_key(prompt, model)
+    if cache is not None:
+        if cache_bypass.get():
+            cache.bypassed += 1
+        else:
+            cached = await cache.aget(key)
+            if cached is not None:
+                usage["cached"] += 1
+                return cached
+
+    async def fetch():
+        with span("upstream"):
+            content = await upstream.call(lambda: backend.complete(prompt, model, timeout=timeout))
+        _record_usage(prompt, content or "")
+        if content is None:
+            return NO_OUTPUT
+        if cache is not None and (cache_if is None or cache_if(content)):
+            await cache.aset(key, content)
+        return content
+
+    # Identical prompts already in flight share one upstream call
+    singleflight = get_singleflight()
+    if singleflight is not None:
+        return await singleflight.do(key, fetch)
+    return await fetch()
+
+
+# Streamed variant: yields the completion text piece by piece as the model
+# produces it. A cached completion is yielded in one piece; a freshly streamed
+# one is cached once it has been received in full (and passes `cache_if`).
+async def astream_llm(prompt, model=None, timeout=None, cache_if=None):
+    backend = get_backend()
+    model = model or backend.model
+    cache = get_cache()
+    key = cache_key(prompt, model)
+    if cache is not None and not cache_bypass.get():
+        cached = await cache.aget(key)
+        if cached is not None:
+            usage["cached"] += 1
+            yield cached
+            return
+
+    received = []
+
+    async def receive():
+        async for delta in backend.stream(prompt, model, timeout=timeout):
+            received.append(delta)
+            yield delta
+
+    # The breaker sees the stream as one call: it succeeds once fully received
+    upstream.breaker.before_call(upstream.name)
+    with span("upstream"):
+        try:
+            async for delta in receive():
+                yield delta
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            raise upstream.failed(e) from e
+        except BaseException:
+            upstream.breaker.release()
+            raise
+    upstream.breaker.record_success()
+    _record_usage(prompt, "".join(received))
+
+    content = "".join(received)
+    if cache is not None and content and (cache_if is None or cache_if(content)):
+        await cache.aset(key, content)
+
+
+# Earlier names, kept for existing callers
+query_perplexity = query_llm
+aquery_perplexity = aquery_llm
+astream_perplexity = astream_llm
+
+
+# Question generation prompts with difficulty
+_STRUCTURED_TASKS = {
+    "mcq": "Generate {n} multiple-choice questions (MCQs), each with exactly 4 options. "
+           "\"answer\" is the letter (A-D) of the correct option.",
+    "fill_in_the_blanks": "Generate {n} 'Fill in the Blank' questions. Each question is a sentence "
+                          "with the missing word or phrase replaced by \"__________\".",
+    "true_false": "Generate {n} True/False questions. \"answer\" is either \"True\" or \"False\".",
+    "matching": "Generate {n} matching pairs of terms and the item each one matches.",
+}
+
+
+def structured_prompt(kind, syllabus, num_questions, difficulty):
+    """Prompt asking for a JSON array that question_parser can validate item by item."""
+    return f"""
+    Syllabus:
+    {syllabus}
+
+    Instructions:
+    - {_STRUCTURED_TASKS[kind].format(n=num_questions)}
+    - Questions must be unique, meaningful, and based on the syllabus.
+    - Explain briefly why each answer is correct.
+    - Difficulty Level: {difficulty}.
+
+    {json_instructions(kind)}
+    """
+
+
+def mcq_prompt(syllabus, num_questions, difficulty):
+    if STRUCTURED_OUTPUT:
+        return structured_prompt("mcq", syllabus, num_questions, difficulty)
+    return f"""
     Syllabus:
     {syllabus}
 
@@ -247,19 +407,16 @@ def generate_mcq(syllabus, num_questions, difficulty):
     Questions must be unique, meaningful, and ensure the structure: Question -> Options -> Answer -> Explanation.
     Difficulty Level: {difficulty}.
     """
-    # Generate the MCQs
-    mcqs = query_perplexity(prompt)
-    return mcqs
 
 
-
-# Simulated response for generating fill-in-the-blank questions
-def generate_fill_in_the_blanks(syllabus, num_questions, difficulty):
-    prompt = f"""
+def fill_in_the_blanks_prompt(syllabus, num_questions, difficulty):
+    if STRUCTURED_OUTPUT:
+        return structured_prompt("fill_in_the_blanks", syllabus, num_questions, difficulty)
+    return f"""
     Syllabus: {syllabus}
 
     Instructions:
-    - Generate {num_questions} 'Fill in the Blank' questions based on the syllabus "{syllabus}".
+    - Generate {num_questions} 'Fill in the Blank' questions based on the syllabus above.
     - Each question must include a blank space represented as "__________" in the sentence.
     - The format for each question must be as follows:
       1. "Fill in the blank: [Question text with __________]."
@@ -269,15 +426,16 @@ def generate_fill_in_the_blanks(syllabus, num_questions, difficulty):
     - Ensure the content aligns with the difficulty level: {difficulty}.
     - Do not include any additional text, summaries, or explanations beyond the required format.
     """
-    return query_perplexity(prompt)
 
 
-def generate_true_false(syllabus, num_questions, difficulty):
-    prompt = f"""
+def true_false_prompt(syllabus, num_questions, difficulty):
+    if STRUCTURED_OUTPUT:
+        return structured_prompt("true_false", syllabus, num_questions, difficulty)
+    return f"""
     Topic: {syllabus}
 
     Instructions:
-    - Generate {num_questions} True/False questions about the topic "{syllabus}".
+    - Generate {num_questions} True/False questions about the topic above.
     - Use the following strict format for each question:
 
     Q<n>. <Question text>? (True/False)
@@ -299,11 +457,12 @@ def generate_true_false(syllabus, num_questions, difficulty):
     - The output is structured for easy parsing.
     - Matches the difficulty level specified: {difficulty}.
     """
-    return query_perplexity(prompt)
 
-    
-def generate_matching_questions(syllabus, num_questions, difficulty):
-    prompt = f"""
+
+def matching_prompt(syllabus, num_questions, difficulty):
+    if STRUCTURED_OUTPUT:
+        return structured_prompt("matching", syllabus, num_questions, difficulty)
+    return f"""
     Syllabus:
     {syllabus}
 
@@ -320,17 +479,91 @@ def generate_matching_questions(syllabus, num_questions, difficulty):
     Do NOT provide additional context or explanations.
     Difficulty Level: {difficulty}.
     """
-    result = query_perplexity(prompt)  # Assuming this interacts with Perplexity AI
-    # Parse the result into structured data
-    pairs = [line.split(" | ") for line in result.split("\n") if " | " in line]
-    
+
+
+def exclusion_note(exclude):
+    """
+    Prompt suffix listing questions a follow-up request must not repeat. An
+    empty list (a follow-up after nothing could be parsed) still changes the
+    prompt, so the retry is not answered with the same completion.
+    """
+    if exclude is None:
+        return ""
+    if not exclude:
+        return """
+    The previous answer could not be read. Follow the required format exactly.
+    """
+    listed = "\n".join(f"    - {text}" for text in exclude)
+    return f"""
+    These have already been generated; do not repeat them or ask the same thing in other words:
+{listed}
+    """
+
+
+def _parses(parse):
+    # Completions are only cached when they yield at least one question
+    return lambda text: bool(parse(text))
+
+
+# Question generation functions with difficulty
+async def generate_mcq(syllabus, num_questions, difficulty, exclude=None):
+    # Generate the MCQs
+    mcqs = await aquery_llm(
+        mcq_prompt(syllabus, num_questions, difficulty) + exclusion_note(exclude), cache_if=_parses(parse_mcq)
+    )
+    return mcqs
+
+
+async def generate_fill_in_the_blanks(syllabus, num_questions, difficulty, exclude=None):
+    return await aquery_llm(
+        fill_in_the_blanks_prompt(syllabus, num_questions, difficulty) + exclusion_note(exclude),
+        cache_if=_parses(parse_fill_in_the_blanks),
+    )
+
+
+async def generate_true_false(syllabus, num_questions, difficulty, exclude=None):
+    return await aquery_llm(
+        true_false_prompt(syllabus, num_questions, difficulty) + exclusion_note(exclude),
+        cache_if=_parses(parse_true_false),
+    )
+
+
+async def generate_matching_pairs(syllabus, num_questions, difficulty, exclude=None):
+    return await aquery_llm(
+        matching_prompt(syllabus, num_questions, difficulty) + exclusion_note(exclude),
+        cache_if=_parses(parse_matching),
+    )
+
+
+async def generate_matching_questions(syllabus, num_questions, difficulty):
+    # Parse the result (JSON or "Term | Match" lines), topping up any missing pairs
+    pairs = await generate_with_topup(generate_matching_pairs, parse_matching, syllabus, num_questions, difficulty)
+    return matching_columns(pairs)
+
+
+def matching_columns(pairs):
     # Separate columns and answers
-    column1 = [{"id": f"c1_item_{i+1}", "item": pair[0]} for i, pair in enumerate(pairs)]
-    column2 = [{"id": f"c2_item_{i+1}", "item": pair[1]} for i, pair in enumerate(pairs)]
+    column1 = [{"id": f"c1_item_{i+1}", "item": pair["term"]} for i, pair in enumerate(pairs)]
+    column2 = [{"id": f"c2_item_{i+1}", "item": pair["match"]} for i, pair in enumerate(pairs)]
     answers = [{"column1_id": f"c1_item_{i+1}", "column2_id": f"c2_item_{i+1}"} for i in range(len(pairs))]
 
     return column1, column2, answers
 
+
+# Streaming generation for the SSE endpoints
+def stream_mcq(syllabus, num_questions, difficulty):
+    return astream_llm(mcq_prompt(syllabus, num_questions, difficulty), cache_if=_parses(parse_mcq))
+
+
+def stream_fill_in_the_blanks(syllabus, num_questions, difficulty):
+    return astream_llm(
+        fill_in_the_blanks_prompt(syllabus, num_questions, difficulty), cache_if=_parses(parse_fill_in_the_blanks)
+    )
+
+
+def stream_true_false(syllabus, num_questions, difficulty):
+    return astream_llm(true_false_prompt(syllabus, num_questions, difficulty), cache_if=_parses(parse_true_false))
+
   
 def generate_questions(syllabus, num_questions, question_type, difficulty):
     """
@@ -356,85 +589,8 @@ def generate_questions(syllabus, num_questions, question_type, difficulty):
     return "\n".join(generated_questions)
 
 
-
-# Main Function
-
-def main():
-    st.title("Multilingual Question Generator")
-
-    # Input Type Selection
-    input_type = st.sidebar.selectbox("Select Input Type", ["Text", "File", "Video", "Audio"])
-    syllabus = None
-
-    # Handle different input types
-    if input_type == "Text":
-        syllabus = st.text_area("Enter Syllabus or Content")
-
-    elif input_type == "File":
-        uploaded_file = st.file_uploader("Upload a PDF, Word, or Text file", type=["pdf", "docx", "txt"])
-        if uploaded_file is not None:
-            if uploaded_file.name.endswith('.pdf'):
-                syllabus = extract_text_from_pdf(uploaded_file)
-            elif uploaded_file.name.endswith('.docx'):
-                syllabus = extract_text_from_word(uploaded_file)
-            elif uploaded_file.name.endswith('.txt'):
-                syllabus = uploaded_file.read().decode("utf-8")
-
-    elif input_type == "Video":
-        uploaded_video = st.file_uploader("Upload a Video file", type=["mp4", "mkv", "avi"])
-        if uploaded_video is not None:
-            with open("uploaded_video.mp4", "wb") as f:
-                f.write(uploaded_video.read())
-            audio_path = extract_audio_from_video("uploaded_video.mp4")
-            syllabus = speech_to_text(audio_path, "en-US")
-
-    elif input_type == "Audio":
-        uploaded_audio = st.file_uploader("Upload an Audio file", type=["wav", "mp3", "m4a"])
-        if uploaded_audio is not None:
-            with open("uploaded_audio.wav", "wb") as f:
-                f.write(uploaded_audio.read())
-            syllabus = speech_to_text("uploaded_audio.wav", "en-US")
-
-    # Display extracted content
-    if syllabus:
-        st.subheader("Extracted Syllabus:")
-        st.text_area("Extracted Content", syllabus, height=200)
-
-        # Question Generator Section
-        st.subheader("Question Generator")
-        question_type = st.selectbox("Select Question Type", ["MCQ", "Fill in the Blanks", "True/False", "Matching"])
-        num_questions = st.number_input("Number of Questions", min_value=1, max_value=20, step=1)
-        difficulty = st.selectbox("Difficulty Level", ["Easy", "Medium", "Hard"]).lower()
-
-        # Fetch Supported Languages
-        languages = get_supported_languages()
-        if "Error" in languages:
-            st.error("Could not fetch language options.")
-            return
-        selected_language = st.selectbox("Select Language", list(languages.keys()))
-        target_language_code = languages[selected_language]
-
-        # Generate Questions and Translate
-        if st.button("Generate Questions"):
-            with st.spinner("Generating questions..."):
-                # Generate questions (dummy logic, replace with actual implementation)
-                if question_type == "MCQ":
-                    result = query_perplexity(f"Generate {num_questions} MCQs based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
-                elif question_type == "Fill in the Blanks":
-                    result = query_perplexity(f"Generate {num_questions} 'Fill in the Blanks' questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
-                elif question_type == "True/False":
-                    result = query_perplexity(f"Generate {num_questions} True/False questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
-                elif question_type == "Matching":
-                    result = query_perplexity(f"Generate {num_questions} matching questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
-                else:
-                    st.error("Invalid Question Type Selected.")
-                    return
-
-                # Translate the output
-                translated_result = translate_text(result, target_language_code)
-                st.text_area("Translated Questions", translated_result, height=300)
-
-
-
 if __name__ == "__main__":
+    # "streamlit run b.py" still starts the UI
+    from streamlit_app import main
+
     main()
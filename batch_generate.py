@@ -0,0 +1,268 @@
+"""
+Precompute quizzes for a whole corpus of documents.
+
+Reads a directory (every .pdf, .docx and .txt file under it) or a manifest,
+extracts the documents in parallel worker processes with `load_text`, and
+generates a quiz for each with a bounded number of documents in flight at
+once. Every call goes through the shared LLM rate limiter, so
+--rate-per-minute (or LLM_RATE_PER_MINUTE) keeps the run inside the API
+quota. Results are appended to a JSONL file, one line per document, as
+each finishes.
+
+Runs can be resumed: documents already written with status "ok" (same id,
+same content and same quiz settings) are skipped, so an interrupted run
+continues where it stopped. Failed documents are retried.
+
+A manifest is a .jsonl file of {"path": ..., "id": ...} objects, which may
+also override "difficulty", "mcq", "true_false", "fill_in_the_blanks" and
+"matching_sets" per document, or a text file with one path per line.
+Relative paths are resolved against the manifest's directory.
+
+    python batch_generate.py courses/ --output quizzes.jsonl --mcq 10 --true-false 5
+    python batch_generate.py manifest.jsonl --output quizzes.jsonl --concurrency 8 --rate-per-minute 120
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DOCUMENT_EXTENSIONS = (".pdf", ".docx", ".txt")
+QUIZ_SETTINGS = ("difficulty", "mcq", "true_false", "fill_in_the_blanks", "matching_sets", "matching_pairs")
+
+
+def find_documents(source):
+    """(id, path, overrides) for every document in a directory or manifest."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(DOCUMENT_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), path, {}
+        return
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if source.endswith(".jsonl") else {"path": line}
+            path = os.path.join(base, entry["path"])
+            overrides = {key: entry[key] for key in QUIZ_SETTINGS if key in entry}
+            yield entry.get("id", entry["path"]), path, overrides
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def document_key(doc_id, content_hash, settings):
+    """Identity of one unit of work: the document, its content and the quiz asked for."""
+    digest = hashlib.sha256(json.dumps([doc_id, content_hash, settings], sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def completed_keys(output):
+    """Keys of documents already written with status "ok"; the last line for a key wins."""
+    status = {}
+    if os.path.exists(output):
+        with open(output, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run
+                    continue
+                status[record["key"]] = record["status"]
+    return {key for key, value in status.items() if value == "ok"}
+
+
+def extract(path):
+    """Runs in a worker process: the document's text, or raises."""
+    from b import is_extraction_error, load_text
+
+    # load_text treats anything that is not a file as text already
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No such file: {path}")
+    text = load_text(path)
+    if is_extraction_error(text) or not text.strip():
+        raise ValueError(text.strip() or "No text could be extracted.")
+    return text
+
+
+class Progress:
+    """Counts finished documents and prints throughput and upstream usage."""
+
+    def __init__(self, total, skipped, prompt_price, completion_price):
+        self.total = total
+        self.skipped = skipped
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.ok = 0
+        self.failed = 0
+        self.questions = 0
+        self.start = time.perf_counter()
+
+    def summary(self):
+        from b import usage
+
+        elapsed = time.perf_counter() - self.start
+        done = self.ok + self.failed
+        cost = (usage["prompt_tokens"] * self.prompt_price
+                + usage["completion_tokens"] * self.completion_price) / 1_000_000
+        return {
+            "documents": self.total,
+            "skipped": self.skipped,
+            "ok": self.ok,
+            "failed": self.failed,
+            "questions": self.questions,
+            "seconds": round(elapsed, 1),
+            "docs_per_minute": round(done / elapsed * 60, 1) if elapsed else 0.0,
+            "llm_calls": usage["calls"],
+            "llm_cached": usage["cached"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "estimated_cost": round(cost, 4),
+        }
+
+    def report(self, final=False):
+        stats = self.summary()
+        done = stats["ok"] + stats["failed"]
+        print(
+            f"{done}/{self.total - self.skipped} documents ({stats['failed']} failed, {self.skipped} skipped)"
+            f" {stats['docs_per_minute']:.1f} docs/min, {stats['llm_calls']} LLM calls,"
+            f" {stats['prompt_tokens'] + stats['completion_tokens']:,} tokens, ~${stats['estimated_cost']:.4f}",
+            file=sys.stderr, flush=True,
+        )
+        if final:
+            print(json.dumps(stats))
+
+
+async def run(args):
+    from llm_client import close_client
+    from quiz import generate_quiz
+
+    defaults = {
+        "difficulty": args.difficulty, "mcq": args.mcq, "true_false": args.true_false,
+        "fill_in_the_blanks": args.fill_in_the_blanks, "matching_sets": args.matching_sets,
+        "matching_pairs": args.matching_pairs,
+    }
+    if args.overwrite and os.path.exists(args.output):
+        os.remove(args.output)
+    done = completed_keys(args.output)
+
+    pending = []
+    documents = list(find_documents(args.source))
+    for doc_id, path, overrides in documents:
+        settings = dict(defaults, **overrides)
+        # A missing file still gets a key; its extraction fails and is reported,
+        # and it is never skipped as done
+        content_hash = file_hash(path) if os.path.isfile(path) else None
+        key = document_key(doc_id, content_hash, settings)
+        if key not in done or content_hash is None:
+            pending.append((key, doc_id, path, settings))
+    progress = Progress(len(documents), len(documents) - len(pending), args.prompt_price, args.completion_price)
+
+    loop = asyncio.get_running_loop()
+    # Documents in flight: some being extracted while others are generated
+    slots = asyncio.Semaphore(args.concurrency + args.extract_workers)
+    generating = asyncio.Semaphore(args.concurrency)
+
+    with ProcessPoolExecutor(max_workers=args.extract_workers) as pool, \
+            open(args.output, "a+", encoding="utf-8") as output:
+        # Start on a fresh line if the last run was cut off mid-write
+        end = output.tell()
+        if end:
+            output.seek(end - 1)
+            if output.read(1) != "\n":
+                output.write("\n")
+
+        def write(record):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+        async def process(key, doc_id, path, settings):
+            record = {"key": key, "id": doc_id, "path": path, "settings": settings}
+            async with slots:
+                try:
+                    text = await loop.run_in_executor(pool, extract, path)
+                except Exception as e:
+                    record.update(status="failed", errors={"extraction": str(e)})
+                else:
+                    counts = {kind: settings[kind] for kind in ("mcq", "true_false", "fill_in_the_blanks")}
+                    async with generating:
+                        sections, timings, errors, prompt_stats = await generate_quiz(
+                            text, settings["difficulty"], counts,
+                            matching_sets=settings["matching_sets"], matching_pairs=settings["matching_pairs"],
+                            from_bank=args.from_bank,
+                        )
+                    record.update(status="failed" if errors else "ok", quiz=sections, errors=errors,
+                                  timings=timings, prompt_stats=prompt_stats)
+                    progress.questions += sum(len(items) for items in sections.values())
+            write(record)
+            if record["status"] == "ok":
+                progress.ok += 1
+            else:
+                progress.failed += 1
+            if (progress.ok + progress.failed) % args.report_every == 0:
+                progress.report()
+
+        try:
+            await asyncio.gather(*(process(*job) for job in pending))
+        finally:
+            await close_client()
+    progress.report(final=True)
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory of documents, or a manifest (.jsonl or one path per line)")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--difficulty", default="medium")
+    parser.add_argument("--mcq", type=int, default=10)
+    parser.add_argument("--true-false", type=int, default=0)
+    parser.add_argument("--fill-in-the-blanks", type=int, default=0)
+    parser.add_argument("--matching-sets", type=int, default=0)
+    parser.add_argument("--matching-pairs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4, help="documents generated at the same time")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1,
+                        help="processes extracting documents")
+    parser.add_argument("--rate-per-minute", type=float,
+                        help="LLM requests per minute (overrides LLM_RATE_PER_MINUTE)")
+    parser.add_argument("--from-bank", action="store_true", help="fill quizzes from the question bank first")
+    parser.add_argument("--overwrite", action="store_true", help="start over instead of resuming")
+    parser.add_argument("--report-every", type=int, default=10, help="print progress every N documents")
+    parser.add_argument("--prompt-price", type=float, default=0.0, help="USD per million prompt tokens")
+    parser.add_argument("--completion-price", type=float, default=0.0, help="USD per million completion tokens")
+    args = parser.parse_args(argv)
+    for name in ("concurrency", "extract_workers", "report_every"):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+
+    # Configuration is read at import time, so set it before the app modules load
+    if args.rate_per_minute is not None:
+        os.environ["LLM_RATE_PER_MINUTE"] = str(args.rate_per_minute)
+    # A batch waits for quota instead of failing documents with 429
+    os.environ.setdefault("LLM_RATE_MAX_WAIT", "3600")
+    # Each extraction worker handles one document, so PDFs are not split further
+    os.environ.setdefault("PDF_WORKERS", "1")
+
+    try:
+        progress = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print(f"Interrupted; run the same command again to resume from {args.output}.", file=sys.stderr)
+        return 130
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Concurrent-request throughput of the generation path, before and after the
+async client.
+
+"before" awaits N coroutines that each call the blocking query_perplexity,
+which is what the async endpoints did previously: every call freezes the
+event loop, so requests are served one after another.
+"after" awaits N concurrent generate_mcq calls through the pooled
+httpx.AsyncClient.
+
+    python benchmarks/bench_async_client.py --requests 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+async def run_before(b, n):
+    async def one():
+        return b.query_perplexity("Generate 5 MCQs about photosynthesis.")
+
+    await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def run_after(b, n):
+    await asyncio.gather(*(b.generate_mcq("Photosynthesis", 5, "easy") for _ in range(n)))
+    from llm_client import close_client
+    await close_client()
+
+
+def report(label, n, elapsed):
+    print(f"{label:<8} {n} requests in {elapsed:6.2f}s  ->  {n / elapsed:7.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub server latency in seconds")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as server:
+        os.environ["PERPLEXITY_API_URL"] = server.url
+        os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+        import b
+
+        start = time.perf_counter()
+        asyncio.run(run_before(b, args.requests))
+        report("before", args.requests, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        asyncio.run(run_after(b, args.requests))
+        report("after", args.requests, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
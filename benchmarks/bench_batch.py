@@ -0,0 +1,104 @@
+"""
+End-to-end run of batch_generate.py against the local stub LLM server:
+documents per minute at several generation concurrencies, then an
+interrupted run that is resumed, checking that every document ends up in
+the output exactly once with status "ok" and that the resumed run only
+paid for the documents the first one had not finished.
+
+The corpus is generated locally (text files and small PDFs), and the
+question bank and response cache are disabled so every document really
+goes upstream.
+
+    python benchmarks/bench_batch.py --documents 40 --concurrency 1,4,16 --latency 0.2
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pdf_extraction import write_pdf  # noqa: E402
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+def make_corpus(directory, documents):
+    for i in range(documents):
+        unit = os.path.join(directory, f"unit{i % 4}")
+        os.makedirs(unit, exist_ok=True)
+        if i % 3 == 0:
+            write_pdf(os.path.join(unit, f"chapter{i}.pdf"), pages=4, seed=i)
+        else:
+            with open(os.path.join(unit, f"notes{i}.txt"), "w", encoding="utf-8") as file:
+                file.write(" ".join(f"Lesson {i}, point {j}: cells store energy as ATP." for j in range(80)))
+
+
+def command(corpus, output, concurrency, questions, *extra):
+    return [sys.executable, os.path.join(ROOT, "batch_generate.py"), corpus, "--output", output,
+            "--mcq", str(questions), "--concurrency", str(concurrency), "--extract-workers", "2",
+            "--report-every", "1000", *extra]
+
+
+def records(output):
+    with open(output, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=10, help="MCQs per document")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated generation concurrencies")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per request (seconds)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, StubLLMServer(latency=args.latency, per_question=0.01) as server:
+        corpus = os.path.join(tmp, "corpus")
+        make_corpus(corpus, args.documents)
+        env = dict(
+            os.environ, PYTHONPATH=ROOT, LLM_BACKEND="perplexity", PERPLEXITY_API_URL=server.url,
+            PERPLEXITY_API_KEY="benchmark", RESPONSE_CACHE_ENABLED="0", QUESTION_BANK_ENABLED="0",
+        )
+
+        print(f"{'concurrency':>11s} {'docs/min':>9s} {'seconds':>8s} {'LLM calls':>10s} {'ok':>4s}")
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            output = os.path.join(tmp, f"run{concurrency}.jsonl")
+            result = subprocess.run(command(corpus, output, concurrency, args.questions), env=env,
+                                    capture_output=True, text=True, check=True)
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{concurrency:11d} {stats['docs_per_minute']:9.1f} {stats['seconds']:8.1f}"
+                  f" {stats['llm_calls']:10d} {stats['ok']:4d}")
+
+        # Interrupt a run halfway through, then resume it
+        output = os.path.join(tmp, "resumed.jsonl")
+        calls = server.calls
+        process = subprocess.Popen(command(corpus, output, 4, args.questions), env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        while not os.path.exists(output) or len(records(output)) < args.documents // 2:
+            time.sleep(0.05)
+        process.send_signal(signal.SIGINT)
+        process.communicate()
+        first = len(records(output))
+        first_calls = server.calls - calls
+
+        calls = server.calls
+        result = subprocess.run(command(corpus, output, 4, args.questions), env=env,
+                                capture_output=True, text=True, check=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        ok = [record["id"] for record in records(output) if record["status"] == "ok"]
+        print(f"\ninterrupted after {first} documents ({first_calls} LLM calls);"
+              f" resumed run skipped {stats['skipped']} and generated {stats['ok']} ({server.calls - calls} LLM calls)")
+        complete = len(ok) == len(set(ok)) == args.documents
+        print(f"output: {len(ok)} ok records for {len(set(ok))} of {args.documents} documents"
+              f" -> {'complete, no duplicates' if complete else 'INCOMPLETE'}")
+        if not complete:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
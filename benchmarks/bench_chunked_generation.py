@@ -0,0 +1,72 @@
+"""
+Wall-clock of chunked map-reduce generation versus the single-prompt path on a
+large synthetic document.
+
+The stub server charges a fixed base latency plus time per requested question
+and per 1000 prompt characters, so one huge prompt asking for every question
+is slow while several small concurrent prompts overlap.
+
+    python benchmarks/bench_chunked_generation.py --paragraphs 600 --questions 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+def synthetic_document(paragraphs, seed=7):
+    rng = random.Random(seed)
+    words = ["cell", "energy", "membrane", "protein", "enzyme", "light", "carbon",
+             "water", "glucose", "oxygen", "nucleus", "gene", "reaction", "plant"]
+    return "\n\n".join(
+        " ".join(
+            " ".join(rng.choice(words) for _ in range(12)).capitalize() + "."
+            for _ in range(6)
+        )
+        for _ in range(paragraphs)
+    )
+
+
+async def run(b, chunking, qp, document, n):
+    start = time.perf_counter()
+    items = qp.parse_mcq(await b.generate_mcq(document, n, "medium"))
+    print(f"single prompt: {time.perf_counter() - start:6.2f}s  {len(items)} questions")
+
+    start = time.perf_counter()
+    items = await chunking.generate_chunked(b.generate_mcq, qp.parse_mcq, document, n, "medium")
+    print(f"chunked:       {time.perf_counter() - start:6.2f}s  {len(items)} questions")
+    from llm_client import close_client
+    await close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=600)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--per-question", type=float, default=0.1)
+    parser.add_argument("--per-kchar", type=float, default=0.002)
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency, per_question=args.per_question, per_kchar=args.per_kchar) as server:
+        os.environ["PERPLEXITY_API_URL"] = server.url
+        os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+        import b
+        import chunking
+        import question_parser as qp
+
+        document = synthetic_document(args.paragraphs)
+        chunks = chunking.split_into_chunks(document)
+        print(f"document: {len(document):,} chars, ~{chunking.estimate_tokens(document):,} tokens, {len(chunks)} chunks")
+
+        asyncio.run(run(b, chunking, qp, document, args.questions))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Near-duplicate index throughput as the question history grows: microseconds
+per insert and per query at several index sizes, resident memory, and how
+well lightly edited repeats are caught versus distinct questions wrongly
+flagged.
+
+Questions are synthetic (random words from a fixed vocabulary in a few
+question templates). Repeats are made by the edits a model makes when it
+restates a question: changed case and punctuation, a swapped or dropped
+word, a reworded lead-in.
+
+    python benchmarks/bench_dedup.py --size 300000 --queries 2000
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dedup import NearDuplicateIndex  # noqa: E402
+
+TEMPLATES = (
+    "What is the main function of the {0} in {1} {2}?",
+    "Which of the following best describes how {0} affects {1} during {2}?",
+    "Why does the {0} {1} increase when {2} is reduced?",
+    "{0} {1} is an example of which type of {2}?",
+    "Explain the relationship between {0}, {1} and {2}.",
+)
+LEAD_INS = ("What is", "Which is", "Identify")
+
+
+def make_vocabulary(rng, size=50000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def make_question(rng, words):
+    return rng.choice(TEMPLATES).format(*rng.sample(words, 3))
+
+
+def perturb(rng, question, words):
+    """A restatement of `question` with one or two small edits."""
+    tokens = question.split()
+    for _ in range(rng.randint(1, 2)):
+        edit = rng.randrange(4)
+        if edit == 0:
+            tokens = [token.upper() if rng.random() < 0.3 else token for token in tokens]
+        elif edit == 1:
+            tokens[-1] = tokens[-1].rstrip("?.") + rng.choice(("", ".", " ?", "?!"))
+        elif edit == 2 and len(tokens) > 6:
+            del tokens[rng.randrange(1, len(tokens) - 1)]
+        else:
+            position = rng.randrange(len(tokens))
+            tokens[position] = rng.choice(words) if tokens[position] not in LEAD_INS else rng.choice(LEAD_INS)
+    return " ".join(tokens)
+
+
+def jaccard(index, first, second):
+    """Exact similarity over the shingles the index uses."""
+    first, second = (set(index.sketch(text)[0].tolist()) for text in (first, second))
+    return len(first & second) / len(first | second)
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=300000, help="questions inserted into the index")
+    parser.add_argument("--queries", type=int, default=2000, help="timed queries at each checkpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = make_vocabulary(rng)
+    questions = [make_question(rng, words) for _ in range(args.size)]
+    index = NearDuplicateIndex()
+    checkpoints = sorted({size for size in (1000, 10000, 100000, args.size) if size <= args.size})
+
+    base_rss = rss_mb()
+    print(f"{'indexed':>9s} {'insert us':>10s} {'query us':>9s} {'RSS MB':>8s}")
+    inserted = 0
+    for checkpoint in checkpoints:
+        start = time.perf_counter()
+        for question in questions[inserted:checkpoint]:
+            index.add(question)
+        insert_us = (time.perf_counter() - start) / (checkpoint - inserted) * 1e6
+        inserted = checkpoint
+        probes = [make_question(rng, words) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for probe in probes:
+            index.query(probe)
+        query_us = (time.perf_counter() - start) / len(probes) * 1e6
+        print(f"{checkpoint:9,d} {insert_us:10.1f} {query_us:9.1f} {rss_mb() - base_rss:8.1f}")
+
+    # Restated questions already in the index should be caught and new ones
+    # not. Whether a restatement still reaches the threshold depends on the
+    # edit, so recall is also given for those that do: what the LSH banding
+    # can miss. New questions can only be flagged wrongly by a similarity bug
+    repeats = [(source, perturb(rng, source, words)) for source in rng.sample(questions, args.queries)]
+    fresh = [make_question(rng, words) for _ in range(args.queries)]
+    similar = [(source, question) for source, question in repeats if jaccard(index, source, question) >= index.threshold]
+    caught = sum(index.query(question) is not None for _, question in repeats)
+    caught_similar = sum(index.query(question) is not None for _, question in similar)
+    matches = [(question, index.query(question)) for question in fresh]
+    flagged = [(question, match) for question, match in matches if match is not None]
+    wrong = sum(jaccard(index, question, questions[match[0]]) < index.threshold for question, match in flagged)
+    print(f"\nthreshold {index.threshold}, {index.num_perm} hashes in {index.bands} bands")
+    print(f"restated questions caught:   {caught / len(repeats):6.1%}"
+          f"   ({caught_similar / max(len(similar), 1):.1%} of those at or above the threshold)")
+    print(f"new questions flagged:       {len(flagged) / len(fresh):6.1%}"
+          f"   ({wrong / len(fresh):.1%} below the threshold)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+/process-file/ latency for a repeated upload: first upload (extractor runs),
+repeat upload (memory tier hit), and repeat upload after a restart (SQLite
+tier hit), for a PDF, an audio recording and a video.
+
+Fixtures are generated locally (a text PDF and ffmpeg test sources) and
+speech recognition uses the offline stub backend, so the "first upload"
+column is decoding and extraction time only; with a real recognizer the gap
+is larger still.
+
+    python benchmarks/bench_extraction_cache.py --pages 300 --seconds 120
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_audio(path, seconds):
+    from media import ffmpeg_binary
+
+    subprocess.run([
+        ffmpeg_binary(), "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}", path,
+    ], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="pages in the generated PDF")
+    parser.add_argument("--seconds", type=int, default=120, help="length of the generated audio and video")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Configuration is read at import time, so set it before importing the app
+        os.environ.update({
+            "STT_BACKEND": "stub",
+            "LLM_BACKEND": "fake",
+            "EXTRACTION_CACHE_DB": os.path.join(tmp, "extractions.db"),
+        })
+        from bench_media_extraction import make_clip
+        from bench_pdf_extraction import write_pdf
+        from fastapi.testclient import TestClient
+
+        import extraction_cache
+        import main as app_module
+        from b import is_extraction_error
+
+        fixtures = {
+            "pdf": ("course.pdf", os.path.join(tmp, "course.pdf")),
+            "audio": ("lecture.wav", os.path.join(tmp, "lecture.wav")),
+            "video": ("lecture.mp4", os.path.join(tmp, "lecture.mp4")),
+        }
+        write_pdf(fixtures["pdf"][1], args.pages)
+        make_audio(fixtures["audio"][1], args.seconds)
+        make_clip(fixtures["video"][1], args.seconds)
+
+        with TestClient(app_module.app) as client:
+            def upload(name, path):
+                with open(path, "rb") as file:
+                    start = time.perf_counter()
+                    response = client.post("/process-file/", files={"file": (name, file)})
+                    elapsed = time.perf_counter() - start
+                response.raise_for_status()
+                if is_extraction_error(response.json()["result"]):
+                    raise SystemExit(f"{name}: {response.json()['result']}")
+                return elapsed
+
+            print(f"{'upload':8s} {'size MB':>8s} {'first s':>9s} {'repeat ms':>10s} {'after restart ms':>17s}")
+            for label, (name, path) in fixtures.items():
+                first = upload(name, path)
+                repeat = upload(name, path)
+                # A fresh cache object has an empty memory tier but reopens the same SQLite file
+                extraction_cache._cache = extraction_cache.ExtractionCache()
+                restarted = upload(name, path)
+                size = os.path.getsize(path) / 1024 / 1024
+                print(f"{label:8s} {size:8.1f} {first:9.2f} {repeat * 1000:10.1f} {restarted * 1000:17.1f}")
+
+
+if __name__ == "__main__":
+    main()
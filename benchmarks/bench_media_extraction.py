@@ -0,0 +1,89 @@
+"""
+Wall-clock and peak RSS of getting recognizer-ready audio out of a video.
+
+"previous" is the old pipeline: moviepy VideoFileClip -> write_audiofile to a
+WAV, then pydub re-encodes it into a second WAV. "ffmpeg" is media.extract_audio_wav,
+which decodes only the audio track straight to 16 kHz mono PCM in memory.
+Each variant runs in a fresh interpreter so peak RSS is measured in isolation
+(the figure includes ffmpeg child processes).
+
+Test clips are generated locally with ffmpeg's lavfi test sources. The
+"previous" variant needs moviepy installed.
+
+    python benchmarks/bench_media_extraction.py --seconds 120
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_clip(path, seconds):
+    from media import ffmpeg_binary
+
+    subprocess.run([
+        ffmpeg_binary(), "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path,
+    ], check=True)
+
+
+def run_previous(clip, workdir):
+    from moviepy.editor import VideoFileClip
+    from pydub import AudioSegment
+
+    extracted = os.path.join(workdir, "extracted_audio.wav")
+    converted = os.path.join(workdir, "converted_audio.wav")
+    VideoFileClip(clip).audio.write_audiofile(extracted, codec="pcm_s16le", logger=None)
+    AudioSegment.from_file(extracted).export(converted, format="wav")
+
+
+def run_ffmpeg(clip, workdir):
+    from media import extract_audio_wav
+
+    extract_audio_wav(clip).close()
+
+
+def measure(variant, clip):
+    # Runs inside the child interpreter
+    from pydub import AudioSegment
+    from media import ffmpeg_binary
+
+    AudioSegment.converter = ffmpeg_binary()
+    os.environ.setdefault("FFMPEG_BINARY", ffmpeg_binary())
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        {"previous": run_previous, "ffmpeg": run_ffmpeg}[variant](clip, workdir)
+        elapsed = time.perf_counter() - start
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{variant:<9} {elapsed:7.2f}s   peak RSS {own:7.1f} MB (python)  {children:7.1f} MB (largest child)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=120, help="length of the generated clip")
+    parser.add_argument("--measure", nargs=2, metavar=("VARIANT", "CLIP"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, "clip.mp4")
+        make_clip(clip, args.seconds)
+        print(f"clip: {args.seconds}s 720p, {os.path.getsize(clip) / 1e6:.1f} MB")
+        for variant in ("previous", "ffmpeg"):
+            subprocess.run([sys.executable, __file__, "--measure", variant, clip], check=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+PDF extraction throughput: the previous extractor (two extract_text calls per
+page, serial) versus pdf_extraction with one call per page across a process
+pool, plus the time until the first page is available from the generator.
+
+Fixtures are multi-hundred-page PDFs written locally by a minimal PDF writer.
+
+    python benchmarks/bench_pdf_extraction.py --pages 300 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader  # noqa: E402
+
+import pdf_extraction  # noqa: E402
+
+
+def write_pdf(path, pages, lines_per_page=45, seed=3):
+    """Write a text-only PDF with `pages` pages using the built-in Helvetica font."""
+    rng = random.Random(seed)
+    words = ["photosynthesis", "chlorophyll", "energy", "light", "reaction", "glucose",
+             "carbon", "dioxide", "oxygen", "plant", "leaf", "cell", "stage", "cycle"]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for _ in range(pages):
+        text = ["BT /F1 10 Tf 50 800 Td 14 TL"]
+        for _ in range(lines_per_page):
+            line = " ".join(rng.choice(words) for _ in range(12))
+            text.append(f"({line}) Tj T*")
+        text.append("ET")
+        stream = "\n".join(text)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>"
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def previous_extractor(path):
+    reader = PdfReader(path)
+    return "".join(page.extract_text() for page in reader.pages if page.extract_text())
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - start:7.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fixture.pdf")
+        write_pdf(path, args.pages)
+        print(f"fixture: {args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB, {args.workers} workers")
+
+        before = timed("previous (2x serial)", lambda: previous_extractor(path))
+        serial = timed("single pass, serial", lambda: pdf_extraction.extract_text_from_pdf(path, workers=1))
+        # Warm the pool so process start-up is not counted against the first run
+        pdf_extraction.PDF_WORKERS = args.workers
+        pdf_extraction._get_executor().submit(int).result()
+        parallel = timed("single pass, process pool", lambda: pdf_extraction.extract_text_from_pdf(path, workers=args.workers))
+        assert before == serial == parallel
+
+        start = time.perf_counter()
+        next(pdf_extraction.iter_pdf_pages(path, workers=args.workers))
+        print(f"{'first page from generator':<28} {time.perf_counter() - start:7.2f}s")
+        pdf_extraction.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Question bank retrieval latency at scale: fills a SQLite bank with synthetic
+questions for many syllabi, question types and difficulties, then times
+`take` for 20-question requests (least served first, counted as served) and
+a full /generate-mcq/ request served from the bank, compared with
+generating the same request through the fake LLM backend.
+
+    python benchmarks/bench_question_bank.py --syllabi 1000 --per-key 50 --requests 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+KINDS = ("mcq", "true_false", "fill_in_the_blanks")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def fill(bank, syllabi, per_key, rng):
+    for syllabus in syllabi:
+        for kind in KINDS:
+            for difficulty in DIFFICULTIES:
+                bank.add(syllabus, kind, difficulty, [
+                    # Random words, so the near-duplicate filter keeps every question
+                    {"id": str(uuid.uuid4()),
+                     "question": " ".join(f"{rng.getrandbits(24):x}" for _ in range(8)) + "?",
+                     "options": "A. a\nB. b\nC. c\nD. d", "answer": "A", "explanation": "Because."}
+                    for _ in range(per_key)
+                ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--syllabi", type=int, default=1000, help="distinct syllabi in the bank")
+    parser.add_argument("--per-key", type=int, default=50, help="questions per syllabus, type and difficulty")
+    parser.add_argument("--requests", type=int, default=500, help="timed retrievals")
+    parser.add_argument("--questions", type=int, default=20, help="questions per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Configuration is read at import time, so set it before importing the app
+        os.environ.update({
+            "LLM_BACKEND": "fake",
+            "RESPONSE_CACHE_ENABLED": "0",
+            "QUESTION_BANK_ENABLED": "1",
+            "QUESTION_BANK_DB": os.path.join(tmp, "question_bank.db"),
+        })
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+        from prompt_budget import prepare_syllabus
+        from question_bank import get_question_bank
+
+        rng = random.Random(1)
+        bank = get_question_bank()
+        syllabi = [prepare_syllabus(f"Unit {i}: syllabus text for course {i}.")[0] for i in range(args.syllabi)]
+        start = time.perf_counter()
+        fill(bank, syllabi, args.per_key, rng)
+        rows = args.syllabi * len(KINDS) * len(DIFFICULTIES) * args.per_key
+        size = os.path.getsize(os.path.join(tmp, "question_bank.db")) / 1024 / 1024
+        print(f"bank: {rows:,} questions, {size:.0f} MB, filled in {time.perf_counter() - start:.1f}s")
+
+        samples = []
+        for _ in range(args.requests):
+            syllabus = rng.choice(syllabi)
+            start = time.perf_counter()
+            items = bank.take(syllabus, rng.choice(KINDS), rng.choice(DIFFICULTIES), args.questions)
+            samples.append(time.perf_counter() - start)
+            assert len(items) == args.questions
+        p50, p99 = percentiles(samples)
+        print(f"take({args.questions}):              p50 {p50 * 1000:6.2f} ms   p99 {p99 * 1000:6.2f} ms")
+
+        with TestClient(app_module.app) as client:
+            def request(syllabus, from_bank):
+                start = time.perf_counter()
+                response = client.post("/generate-mcq/", json={
+                    "syllabus": syllabus, "num_questions": args.questions, "difficulty": "medium",
+                    "from_bank": from_bank,
+                })
+                response.raise_for_status()
+                return time.perf_counter() - start
+
+            count = min(args.requests, 100)
+            banked = percentiles([request(rng.choice(syllabi), True) for _ in range(count)])
+            generated = percentiles([request(f"Fresh syllabus {i}.", False) for i in range(min(count, 20))])
+        print(f"/generate-mcq/ from bank:  p50 {banked[0] * 1000:6.2f} ms   p99 {banked[1] * 1000:6.2f} ms")
+        print(f"/generate-mcq/ generated:  p50 {generated[0] * 1000:6.2f} ms   p99 {generated[1] * 1000:6.2f} ms"
+              "   (fake LLM latency)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Parse success rate and parse time of the shared question parser versus the
+original per-endpoint string splitting, over a corpus of responses in the
+shapes the model actually returns (clean legacy text, JSON, fenced JSON,
+preambles, missing blank lines, markdown, truncated output, malformed items).
+
+Each corpus entry records how many well-formed questions it contains; a
+parser's success rate is questions recovered / questions present.
+
+    python benchmarks/bench_question_parsing.py --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import question_parser  # noqa: E402
+
+
+# (kind, expected questions, response text)
+CORPUS = [
+    ("mcq", 2, """Q1. What is the powerhouse of the cell?
+A. Nucleus
+B. Mitochondria
+C. Ribosome
+D. Golgi body
+Answer: B - Explanation: Mitochondria produce most of the cell's ATP.
+
+Q2. Which gas do plants absorb?
+A. Oxygen
+B. Nitrogen
+C. Carbon dioxide
+D. Helium
+Answer: C - Explanation: Plants take in carbon dioxide for photosynthesis."""),
+    ("mcq", 2, """Here are the questions you asked for:
+
+Q1. What is the powerhouse of the cell?
+A. Nucleus
+B. Mitochondria
+C. Ribosome
+D. Golgi body
+Answer: B - Explanation: Mitochondria produce most of the cell's ATP.
+Q2. Which gas do plants absorb?
+A. Oxygen
+B. Nitrogen
+C. Carbon dioxide
+D. Helium
+Answer: C - Explanation: Plants take in carbon dioxide for photosynthesis."""),
+    ("mcq", 2, """**Q1. What is the powerhouse of the cell?**
+A) Nucleus
+B) Mitochondria
+C) Ribosome
+D) Golgi body
+**Answer:** B
+**Explanation:** Mitochondria produce most of the cell's ATP.
+
+**Q2. Which gas do plants absorb?**
+A) Oxygen
+B) Nitrogen
+C) Carbon dioxide
+D) Helium
+**Answer:** C
+**Explanation:** Plants take in carbon dioxide for photosynthesis."""),
+    ("mcq", 2, json.dumps([
+        {"question": "What is the powerhouse of the cell?",
+         "options": ["Nucleus", "Mitochondria", "Ribosome", "Golgi body"],
+         "answer": "B", "explanation": "Mitochondria produce most of the cell's ATP."},
+        {"question": "Which gas do plants absorb?",
+         "options": ["Oxygen", "Nitrogen", "Carbon dioxide", "Helium"],
+         "answer": "C", "explanation": "Plants take in carbon dioxide for photosynthesis."},
+    ], indent=2)),
+    ("mcq", 1, "Sure! Here is the quiz:\n```json\n" + json.dumps([
+        {"question": "What is the powerhouse of the cell?",
+         "options": ["A. Nucleus", "B. Mitochondria", "C. Ribosome", "D. Golgi body"],
+         "answer": "B. Mitochondria", "explanation": "Mitochondria produce most of the cell's ATP."},
+        {"question": "Which gas do plants absorb?", "options": ["Oxygen"], "answer": "A"},
+    ]) + "\n```"),
+    ("mcq", 1, json.dumps({"questions": [
+        {"question": "What is the powerhouse of the cell?",
+         "options": ["Nucleus", "Mitochondria", "Ribosome", "Golgi body"],
+         "answer": "B", "explanation": "Mitochondria produce most of the cell's ATP."},
+        {"question": "Which gas do plants absorb?",
+         "options": ["Oxygen", "Nitrogen", "Carbon dioxide", "Helium"],
+         "answer": "C", "explanation": "Plants take in carbon dioxide for photosynthesis."},
+    ]})[:-60]),  # cut off mid-item, as when max_tokens runs out
+    ("fill_in_the_blanks", 2, """1. Fill in the blank: The powerhouse of the cell is the __________.
+Answer: mitochondria
+Explanation: Mitochondria produce most of the cell's ATP.
+
+2. Fill in the blank: Plants absorb __________ for photosynthesis.
+Answer: carbon dioxide
+Explanation: Carbon dioxide is fixed into sugars."""),
+    ("fill_in_the_blanks", 2, """Fill in the blank: The powerhouse of the cell is the __________.
+Answer: mitochondria
+Explanation: Mitochondria produce most of the cell's ATP.
+
+Fill in the blank: Plants absorb __________ for photosynthesis.
+Answer: carbon dioxide
+Explanation: Carbon dioxide is fixed into sugars."""),
+    ("fill_in_the_blanks", 2, """1. Fill in the blank: The powerhouse of the cell is the __________.
+Answer: mitochondria
+Explanation: Mitochondria produce most of the cell's ATP.
+2. Fill in the blank: Plants absorb __________ for photosynthesis.
+Answer: carbon dioxide"""),
+    ("fill_in_the_blanks", 2, json.dumps([
+        {"question": "The powerhouse of the cell is the __________.", "answer": "mitochondria",
+         "explanation": "Mitochondria produce most of the cell's ATP."},
+        {"question": "Plants absorb __________ for photosynthesis.", "answer": "carbon dioxide"},
+    ])),
+    ("true_false", 2, """Q1. Cricket is played with a ball and bat? (True/False)
+Answer: True
+Explanation: Cricket is a game played with a bat and ball between two teams.
+
+Q2. A cricket team consists of 15 players? (True/False)
+Answer: False
+Explanation: A cricket team consists of 11 players, not 15."""),
+    ("true_false", 2, """Q1. Cricket is played with a ball and bat? (True/False)
+Answer: True.
+Explanation: Cricket is a game played with a bat and ball between two teams.
+Q2. A cricket team consists of 15 players? (True/False)
+Answer: false
+Explanation: A cricket team consists of 11 players, not 15."""),
+    ("true_false", 2, """Q1. Cricket is played with a ball and bat? (True/False)
+Answer: True - Explanation: Cricket is a game played with a bat and ball.
+
+Q2. A cricket team consists of 15 players? (True/False)
+Answer: False - Explanation: A cricket team consists of 11 players, not 15.
+
+Q3. Cricket is played on ice?
+Answer: Maybe"""),
+    ("true_false", 2, "```json\n" + json.dumps([
+        {"question": "Cricket is played with a ball and bat?", "answer": "True",
+         "explanation": "Cricket is a game played with a bat and ball."},
+        {"question": "A cricket team consists of 15 players?", "answer": "False",
+         "explanation": "A cricket team consists of 11 players, not 15."},
+    ]) + "\n```"),
+]
+
+
+# The per-endpoint parsing main.py used before the shared parser
+def legacy_parse_mcq(text):
+    items = []
+    for question in text.split("\n\n"):
+        parts = question.split("\n")
+        if len(parts) < 6:
+            continue
+        answer_and_explanation = parts[5]
+        if "Answer:" in answer_and_explanation and "- Explanation:" in answer_and_explanation:
+            try:
+                answer, explanation = answer_and_explanation.split(" - Explanation: ")
+            except ValueError:
+                continue
+            items.append({"id": str(uuid.uuid4()), "question": parts[0], "options": "\n".join(parts[1:5]),
+                          "answer": answer.split(":")[1].strip(), "explanation": explanation.strip()})
+    return items
+
+
+def legacy_parse_fill_in_the_blanks(text):
+    items = []
+    for block in text.strip().split("\n\n"):
+        lines = block.strip().split("\n")
+        if len(lines) == 3:
+            items.append({"id": str(uuid.uuid4()),
+                          "question": lines[0].replace("Fill in the blank:", "").strip(),
+                          "answer": lines[1].replace("Answer:", "").strip(),
+                          "explanation": lines[2].replace("Explanation:", "").strip()})
+    return items
+
+
+def legacy_parse_true_false(text):
+    items = []
+    for block in text.split("\n\n"):
+        lines = block.split("\n")
+        if len(lines) == 3:
+            question_line = lines[0].strip()
+            if question_line.startswith("Q") and "?" in question_line:
+                items.append({"id": str(uuid.uuid4()),
+                              "question": question_line.split(". ", 1)[1].strip(),
+                              "answer": lines[1].replace("Answer:", "").strip(),
+                              "explanation": lines[2].replace("Explanation:", "").strip()})
+    return items
+
+
+LEGACY_PARSERS = {
+    "mcq": legacy_parse_mcq,
+    "fill_in_the_blanks": legacy_parse_fill_in_the_blanks,
+    "true_false": legacy_parse_true_false,
+}
+
+
+def measure(parse, repeat):
+    recovered = expected = 0
+    for kind, count, text in CORPUS:
+        # Never credit more questions than the response actually holds
+        recovered += min(len(parse(kind, text)), count)
+        expected += count
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for kind, _, text in CORPUS:
+            parse(kind, text)
+    per_response = (time.perf_counter() - start) / (repeat * len(CORPUS))
+    return recovered, expected, per_response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{len(CORPUS)} responses")
+    for name, parse in (
+        ("string splitting", lambda kind, text: LEGACY_PARSERS[kind](text)),
+        ("shared parser", question_parser.parse_questions),
+    ):
+        recovered, expected, per_response = measure(parse, args.repeat)
+        print(f"{name:17s} {recovered:3d}/{expected} questions ({recovered / expected:6.1%})"
+              f"  {per_response * 1e6:8.1f} us/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+End-to-end latency of a mixed quiz: one call per question type, one after
+the other (what the front end did before), versus one /generate-quiz/ call
+that fans the sections out concurrently.
+
+    python benchmarks/bench_quiz.py --mcq 10 --true-false 5 --blanks 5 --matching-pairs 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+SYLLABUS = """
+Photosynthesis converts light energy into chemical energy stored in glucose.
+It takes place in the chloroplasts of plant cells, using water and carbon dioxide
+and releasing oxygen. The light-dependent reactions happen in the thylakoid
+membranes; the Calvin cycle fixes carbon in the stroma.
+""" * 20
+
+
+async def run(args):
+    import b
+    import quiz
+
+    counts = {"mcq": args.mcq, "true_false": args.true_false, "fill_in_the_blanks": args.blanks}
+
+    start = time.perf_counter()
+    for kind, count in counts.items():
+        generate, parse = quiz.QUIZ_SECTIONS[kind]
+        parse(await generate(SYLLABUS, count, "medium"))
+    await b.generate_matching_questions(SYLLABUS, args.matching_pairs, "medium")
+    print(f"separate calls: {time.perf_counter() - start:6.2f}s")
+
+    start = time.perf_counter()
+    _, timings, _, _ = await quiz.generate_quiz(SYLLABUS, "medium", counts,
+                                             matching_sets=1, matching_pairs=args.matching_pairs)
+    print(f"/generate-quiz/: {time.perf_counter() - start:6.2f}s  per section: {timings}")
+    from llm_client import close_client
+    await close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mcq", type=int, default=10)
+    parser.add_argument("--true-false", type=int, default=5)
+    parser.add_argument("--blanks", type=int, default=5)
+    parser.add_argument("--matching-pairs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--per-question", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency, per_question=args.per_question) as server:
+        os.environ["PERPLEXITY_API_URL"] = server.url
+        os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+        os.environ["TOPUP_MAX_ROUNDS"] = "0"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
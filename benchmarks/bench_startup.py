@@ -0,0 +1,71 @@
+"""
+API worker startup cost: import time and resident memory of a fresh
+interpreter importing the app, compared with eagerly loading every
+extractor/media backend and the Streamlit UI (which is what importing the
+server used to do).
+
+Each measurement runs in a new process, so nothing is shared between runs.
+
+    python benchmarks/bench_startup.py --runs 5 --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the server can load lazily, checked after each import
+HEAVY_MODULES = ("streamlit", "PyPDF2", "docx", "pydub", "speech_recognition", "numpy")
+
+SCENARIOS = {
+    "api worker (import main)": ["main"],
+    "api worker + all backends": ["main", "streamlit", "PyPDF2", "docx", "pydub", "speech_recognition", "numpy"],
+    "streamlit ui": ["streamlit_app"],
+}
+
+PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(modules):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, *modules], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per scenario")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers to project total memory for")
+    args = parser.parse_args()
+
+    # One throwaway run so .pyc compilation is not counted
+    for modules in SCENARIOS.values():
+        measure(modules)
+
+    print(f"{'scenario':28s} {'import s':>9s} {'RSS MB':>7s} {f'x{args.workers} MB':>8s}  heavy modules loaded")
+    for label, modules in SCENARIOS.items():
+        runs = [measure(modules) for _ in range(args.runs)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss = statistics.median(run["rss_mb"] for run in runs)
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(f"{label:28s} {seconds:9.3f} {rss:7.1f} {rss * args.workers:8.0f}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
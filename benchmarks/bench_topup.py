@@ -0,0 +1,93 @@
+"""
+Cost of recovering from malformed questions: regenerating the whole request
+until enough questions parse (what users did before) versus topping up only
+the missing count.
+
+The stub server drops the answer line from a fraction of questions and can
+fail a fraction of requests with 503; latency grows with the number of
+questions requested, so asking for fewer questions is cheaper.
+
+    python benchmarks/bench_topup.py --requests 20 --questions 10 --malformed 0.2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_llm import StubLLMServer  # noqa: E402
+
+
+async def regenerate(generate, qp, syllabus, n, max_attempts):
+    items = []
+    for _ in range(max_attempts):
+        items = qp.parse_mcq(await generate(syllabus, n, "medium"))
+        if len(items) >= n:
+            break
+    return items
+
+
+async def run(strategy, server, requests, n, max_rounds):
+    import b
+    import question_parser as qp
+    import topup
+
+    requested = 0
+
+    async def generate(syllabus, count, difficulty, exclude=None):
+        # Questions asked for upstream, a proxy for output tokens paid for
+        nonlocal requested
+        requested += count
+        return await b.generate_mcq(syllabus, count, difficulty, exclude=exclude)
+
+    calls_before = server.calls
+    complete = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        syllabus = f"Syllabus {i}: the cell, its membrane and the organelles inside it."
+        if strategy == "regenerate":
+            items = await regenerate(generate, qp, syllabus, n, max_rounds + 1)
+        else:
+            items = await topup.generate_with_topup(generate, qp.parse_mcq, syllabus, n, "medium",
+                                                    max_rounds=max_rounds)
+        complete += len(items) >= n
+    elapsed = time.perf_counter() - start
+    return elapsed, server.calls - calls_before, requested, complete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--malformed", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=2, help="follow-ups (or regenerations) allowed per request")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-question", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency, per_question=args.per_question,
+                       malformed=args.malformed, error_rate=args.error_rate) as server:
+        os.environ["PERPLEXITY_API_URL"] = server.url
+        os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+        os.environ["LLM_BACKOFF_BASE"] = "0.05"
+        import b
+
+        async def both():
+            for strategy in ("regenerate", "top-up"):
+                elapsed, calls, requested, complete = await run(
+                    strategy, server, args.requests, args.questions, args.rounds
+                )
+                print(f"{strategy:10s} {elapsed:6.2f}s  {calls:4d} upstream calls  "
+                      f"{requested:5d} questions requested  {complete}/{args.requests} requests complete")
+            from llm_client import close_client
+            await close_client()
+
+        asyncio.run(both())
+
+
+if __name__ == "__main__":
+    main()
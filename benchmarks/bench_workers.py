@@ -0,0 +1,201 @@
+"""
+Throughput of the multi-worker deployment (serve.py) as workers are added,
+then checks that the workers really share state through the SQLite backend:
+
+- connections are spread over the worker processes,
+- a completion cached by one worker is served by the others (only the
+  first of many identical requests reaches the LLM),
+- a background job submitted to one worker can be polled on any,
+- the LLM rate limit is one quota for the whole deployment, not one per
+  worker.
+
+The API runs with the fake LLM backend, so each request costs only the
+server's own CPU (prompt preparation, parsing, serialization) plus the fake
+latency, and every request uses a distinct syllabus so none is a cache hit.
+The load comes from --clients separate processes; on a machine with few
+cores they compete with the workers, so leave spare cores for them.
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --duration 10 --concurrency 64
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, tmp, **env):
+    port = free_port()
+    env = dict(
+        os.environ, PYTHONPATH=ROOT, LLM_BACKEND="fake", FAKE_LLM_LATENCY="0.05", QUESTION_BANK_ENABLED="0",
+        SHARED_STATE_DB=os.path.join(tmp, f"shared_state_{port}.db"), **env,
+    )
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), "--workers", str(workers), "--port", str(port),
+         "--backend", "sqlite", "--log-level", "warning"],
+        cwd=tmp, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            # Every worker must be up, not just the first
+            if len(worker_pids(url, 8 * workers)) == workers:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server with {workers} workers did not start")
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(30)
+
+
+def fresh(method, url, **kwargs):
+    # A new connection per request, so the kernel may hand it to any worker
+    with httpx.Client(timeout=60) as client:
+        return client.request(method, url, **kwargs)
+
+
+def worker_pids(url, requests):
+    return {fresh("GET", f"{url}/worker-stats/").json()["pid"] for _ in range(requests)}
+
+
+def make_syllabus(rng, words, course):
+    sentences = [" ".join(rng.choice(words) for _ in range(12)) + "." for _ in range(40)]
+    return f"Course {course}. " + " ".join(sentences)
+
+
+async def drive(url, duration, concurrency, seed):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(4, 9))) for _ in range(5000)]
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def user(client, number):
+        nonlocal errors
+        request = 0
+        while time.perf_counter() < deadline:
+            request += 1
+            payload = {"syllabus": make_syllabus(rng, words, f"{seed}-{number}-{request}"),
+                       "num_questions": 10, "difficulty": "medium"}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/generate-mcq/", json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await asyncio.gather(*(user(client, number) for number in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(job):
+    return asyncio.run(drive(*job))
+
+
+def measure(url, duration, concurrency, clients):
+    jobs = [(url, duration, max(1, concurrency // clients), seed) for seed in range(clients)]
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client_process, jobs)
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return len(latencies) / duration, statistics.median(latencies) if latencies else 0.0, p99, errors
+
+
+def check_shared_state(workers, tmp, repeats):
+    # One LLM request per second with a burst of 5, refused rather than queued
+    process, url = start_server(workers, tmp, LLM_RATE_PER_MINUTE="60", LLM_RATE_BURST="5", LLM_RATE_MAX_WAIT="0")
+    try:
+        pids = worker_pids(url, 20 * workers)
+        print(f"\n{workers} workers: 20 x {workers} new connections answered by {len(pids)} worker processes")
+
+        payload = {"syllabus": "The Krebs cycle releases stored energy.", "num_questions": 5, "difficulty": "easy"}
+        upstream = 0
+        for _ in range(repeats):
+            response = fresh("POST", f"{url}/generate-mcq/", json=payload)
+            response.raise_for_status()
+            upstream += "upstream" in response.headers.get("Server-Timing", "")
+        print(f"identical request sent {repeats} times: {upstream} reached the LLM, "
+              f"{repeats - upstream} served from the shared cache")
+
+        job = fresh("POST", f"{url}/jobs/", files={"file": ("notes.txt", b"Mitochondria make ATP.")}).json()
+        time.sleep(0.5)
+        polls = [fresh("GET", f"{url}/jobs/{job['job_id']}") for _ in range(5 * workers)]
+        found = sum(poll.status_code == 200 and poll.json()["status"] == "succeeded" for poll in polls)
+        print(f"background job polled {len(polls)} times: {found} found it finished")
+
+        async def burst():
+            async with httpx.AsyncClient(timeout=60) as client:
+                return await asyncio.gather(*(
+                    client.post(f"{url}/generate-mcq/", json=dict(payload, syllabus=f"Topic {i}: enzymes."))
+                    for i in range(30)
+                ))
+
+        start = time.perf_counter()
+        responses = asyncio.run(burst())
+        elapsed = time.perf_counter() - start
+        allowed = sum(response.status_code == 200 for response in responses)
+        refused = sum(response.status_code == 429 for response in responses)
+        print(f"30 concurrent new requests against 60/min, burst 5: {allowed} generated, {refused} refused"
+              f" (one shared quota allows about {5 + int(elapsed)}; one per worker would allow {5 * workers})")
+    finally:
+        stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cores = os.cpu_count() or 1
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, max(1, cores // 2), cores})),
+                        help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--repeats", type=int, default=20, help="identical requests for the shared cache check")
+    args = parser.parse_args()
+    counts = [int(value) for value in args.workers.split(",")]
+
+    print(f"{cores} CPU cores; {args.concurrency} requests in flight from {args.clients} client processes")
+    print(f"{'workers':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'errors':>7s} {'speedup':>8s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for workers in counts:
+            process, url = start_server(workers, tmp)
+            try:
+                throughput, p50, p99, errors = measure(url, args.duration, args.concurrency, args.clients)
+            finally:
+                stop_server(process)
+            baseline = baseline or throughput
+            print(f"{workers:7d} {throughput:8.1f} {p50 * 1000:8.1f} {p99 * 1000:8.1f} {errors:7d}"
+                  f" {throughput / baseline:7.2f}x")
+        check_shared_state(max(counts), tmp, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Reproducible load test of the API with the offline fake LLM backend.
+
+Starts the FastAPI app in-process on a local port with LLM_BACKEND=fake, plus
+a stub translation API, then drives the endpoints open-loop at a fixed
+request rate (requests start on schedule whether or not earlier ones have
+finished) and reports p50/p95/p99 latency and throughput per endpoint.
+The request mix and payloads come from a seeded RNG, so runs are repeatable.
+
+    python benchmarks/load_test.py --rps 20 --duration 10
+    python benchmarks/load_test.py --rps 50 --duration 30 --endpoints generate-mcq,generate-quiz --fake-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _TranslateHandler(BaseHTTPRequestHandler):
+    # Google Translate v2 shape: POST with form-encoded "q" values, GET /languages
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        target = form.get("target", ["xx"])[0]
+        self._send({"data": {"translations": [{"translatedText": f"[{target}] {q}"} for q in form.get("q", [])]}})
+
+    def do_GET(self):
+        self._send({"data": {"languages": [{"language": "fr", "name": "French"}, {"language": "es", "name": "Spanish"}]}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+TOPICS = ["photosynthesis", "the water cycle", "plate tectonics", "cell division", "the French revolution",
+          "supply and demand", "Newton's laws", "the immune system", "volcanoes", "ancient Rome"]
+
+
+def _syllabus(rng):
+    return f"{rng.choice(TOPICS).capitalize()} (unit {rng.randrange(10 ** 6)}). " * rng.randint(5, 40)
+
+
+def _bank_generation(rng):
+    # A few recurring syllabi, so after their first request most are served from the question bank
+    syllabus = f"{rng.choice(TOPICS).capitalize()} (revision sheet). " * 10
+    return "POST", "/generate-mcq/", {"json": {"syllabus": syllabus, "num_questions": rng.randint(3, 10),
+                                               "difficulty": "medium", "from_bank": True}}
+
+
+def _generation(path, rng):
+    return "POST", path, {"json": {"syllabus": _syllabus(rng), "num_questions": rng.randint(3, 10),
+                                   "difficulty": rng.choice(["easy", "medium", "hard"])}}
+
+
+# name -> (weight, builder(rng) -> (method, path, httpx request kwargs))
+ENDPOINTS = {
+    "generate-mcq": (4, lambda rng: _generation("/generate-mcq/", rng)),
+    "generate-mcq-bank": (2, _bank_generation),
+    "generate-fill-in-the-blanks": (2, lambda rng: _generation("/generate-fill-in-the-blanks/", rng)),
+    "generate-true-false": (2, lambda rng: _generation("/generate-true-false/", rng)),
+    "generate-matching-questions": (1, lambda rng: _generation("/generate-matching-questions/", rng)),
+    "generate-mcq-stream": (1, lambda rng: _generation("/generate-mcq/stream", rng)),
+    "generate-fill-in-the-blanks-stream": (1, lambda rng: _generation("/generate-fill-in-the-blanks/stream", rng)),
+    "generate-true-false-stream": (1, lambda rng: _generation("/generate-true-false/stream", rng)),
+    "generate-quiz": (2, lambda rng: ("POST", "/generate-quiz/", {"json": {
+        "syllabus": _syllabus(rng), "difficulty": "medium", "mcq": rng.randint(2, 8),
+        "true_false": rng.randint(0, 5), "fill_in_the_blanks": rng.randint(0, 5), "matching_sets": rng.randint(0, 1),
+    }})),
+    "process-text": (2, lambda rng: ("POST", "/process-text/", {"json": {"text": _syllabus(rng)}})),
+    "process-file": (1, lambda rng: ("POST", "/process-file/", {
+        "files": {"file": ("notes.txt", _syllabus(rng).encode(), "text/plain")}})),
+    "jobs": (1, lambda rng: ("POST", "/jobs/", {
+        "files": {"file": ("notes.txt", _syllabus(rng).encode(), "text/plain")}})),
+    "translate": (1, lambda rng: ("POST", "/translate/", {
+        "data": {"text": _syllabus(rng), "target_language": "fr"}})),
+    "translate-quiz": (1, lambda rng: ("POST", "/translate-quiz/", {"json": {
+        "questions": [{"id": str(i), "question": f"Question {rng.randrange(1000)}?", "options": "A. x\nB. y",
+                       "answer": "A", "explanation": "Because."} for i in range(5)],
+        "target_language": "es"}})),
+    "supported-languages": (1, lambda rng: ("GET", "/supported-languages/", {})),
+    "stats": (1, lambda rng: ("GET", rng.choice(["/worker-stats/", "/cache-stats/", "/coalescing-stats/",
+                                                   "/topup-stats/", "/upstream-stats/", "/bank-stats/",
+                                                   "/metrics"]), {})),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _one(client, name, method, path, kwargs, results):
+    start = time.perf_counter()
+    try:
+        if path.endswith("/stream"):
+            # A streamed request is done when the last event has arrived
+            async with client.stream(method, path, **kwargs) as response:
+                async for _ in response.aiter_bytes():
+                    pass
+        else:
+            response = await client.request(method, path, **kwargs)
+            if name == "jobs" and response.status_code == 202:
+                job_path = f"/jobs/{response.json()['job_id']}"
+                while (await client.get(job_path)).json().get("status") in ("queued", "running"):
+                    await asyncio.sleep(0.02)
+        ok = response.status_code < 400
+    except Exception:
+        ok = False
+    results[name].append((time.perf_counter() - start, ok))
+
+
+async def drive(base_url, names, rps, duration, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    weights = [ENDPOINTS[name][0] for name in names]
+    results = defaultdict(list)
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rps * duration)):
+            delay = start + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = ENDPOINTS[name][1](rng)
+            tasks.append(asyncio.create_task(_one(client, name, method, path, kwargs, results)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(results, elapsed):
+    print(f"{'endpoint':36s} {'count':>6s} {'errors':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'req/s':>7s}")
+    everything = []
+    for name in sorted(results):
+        rows = results[name]
+        everything.extend(rows)
+        _row(name, rows, elapsed)
+    _row("all", everything, elapsed)
+
+
+def _row(name, rows, elapsed):
+    latencies = np.array([latency for latency, _ in rows]) * 1000
+    errors = sum(1 for _, ok in rows if not ok)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:36s} {len(rows):6d} {errors:6d} {p50:8.1f} {p95:8.1f} {p99:8.1f} {len(rows) / elapsed:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20, help="requests started per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to generate load for")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="fake LLM base latency in seconds")
+    parser.add_argument("--fake-per-question", type=float, default=0.02)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    args = parser.parse_args()
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    translate = ThreadingHTTPServer(("127.0.0.1", 0), _TranslateHandler)
+    translate.daemon_threads = True
+    threading.Thread(target=translate.serve_forever, daemon=True).start()
+
+    # Configuration is read at import time, so set it before importing the app
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.fake_latency),
+        "FAKE_LLM_PER_QUESTION": str(args.fake_per_question),
+        "FAKE_LLM_ERROR_RATE": str(args.fake_error_rate),
+        "FAKE_LLM_SEED": str(args.seed),
+        "RESPONSE_CACHE_ENABLED": "1" if args.cache else "0",
+        "TRANSLATE_API_URL": f"http://127.0.0.1:{translate.server_address[1]}",
+        "GOOGLE_TRANSLATE_API_KEY": "load-test",
+        "QUESTION_BANK_ENABLED": "1",
+        "QUESTION_BANK_DB": os.path.join(tempfile.mkdtemp(), "question_bank.db"),
+    })
+    import uvicorn
+    import main as app_module
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        results, elapsed = asyncio.run(drive(f"http://127.0.0.1:{port}", names, args.rps, args.duration, args.seed))
+    finally:
+        server.should_exit = True
+        thread.join()
+        translate.shutdown()
+    print(f"{sum(len(rows) for rows in results.values())} requests at {args.rps:g} rps over {elapsed:.1f}s\n")
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Local stand-in for the Perplexity chat-completions API, used by the benchmarks.
+
+Runs a threaded HTTP server on localhost that sleeps for a fixed latency and
+returns a well-formed MCQ completion in the OpenAI/Perplexity response shape.
+Latency can grow with the number of questions requested and the prompt size,
+which roughly models output- and input-token cost of a real model.
+Requests with "stream": true get the same completion as Server-Sent Events,
+one line per chunk, with the latency spread across the chunks.
+A fraction of questions can be returned malformed (no answer line) and a
+fraction of requests can fail with 503, to exercise top-ups and retries.
+"""
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def sample_mcq_text(num_questions=5, topic="sample"):
+    blocks = []
+    for i in range(1, num_questions + 1):
+        blocks.append(
+            f"Q{i}. What is {topic} fact number {i}?\n"
+            f"A. Option {i}a\n"
+            f"B. Option {i}b\n"
+            f"C. Option {i}c\n"
+            f"D. Option {i}d\n"
+            f"Answer: A - Explanation: {topic.capitalize()} fact {i} is option {i}a."
+        )
+    return "\n\n".join(blocks)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.calls += 1
+        with self.server.lock:
+            fail = self.server.random.random() < self.server.error_rate
+        if fail:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        requested = re.search(r"Generate (\d+)", prompt)
+        num_questions = int(requested.group(1)) if requested else 5
+        topic = "topic " + hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        text = sample_mcq_text(num_questions, topic)
+        if self.server.malformed:
+            with self.server.lock:
+                blocks = [
+                    block.rsplit("\nAnswer:", 1)[0] if self.server.random.random() < self.server.malformed else block
+                    for block in text.split("\n\n")
+                ]
+            text = "\n\n".join(blocks)
+        if payload.get("stream"):
+            self._stream(text)
+            return
+        time.sleep(
+            self.server.latency
+            + self.server.per_question * num_questions
+            + self.server.per_kchar * len(prompt) / 1000
+        )
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": text}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        pieces = text.splitlines(keepends=True)
+        for piece in pieces:
+            time.sleep(self.server.latency / len(pieces))
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that hang up mid-response (cancelled or interrupted runs) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubLLMServer:
+    def __init__(self, latency=0.2, per_question=0.0, per_kchar=0.0, malformed=0.0, error_rate=0.0,
+                 seed=0, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.per_question = per_question
+        self._server.per_kchar = per_kchar
+        self._server.malformed = malformed
+        self._server.error_rate = error_rate
+        self._server.random = random.Random(seed)
+        self._server.lock = threading.Lock()
+        self._server.calls = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/chat/completions"
+
+    @property
+    def calls(self):
+        return self._server.calls
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import re
+
+from fastapi import HTTPException
+
+from dedup import dedupe, remember
+from topup import generate_with_topup
+
+
+# Syllabi above the threshold are split into chunks and generated map-reduce style
+CHUNK_THRESHOLD_TOKENS = int(os.getenv("CHUNK_THRESHOLD_TOKENS", "6000"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "3000"))
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", "4"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def needs_chunking(syllabus, threshold=CHUNK_THRESHOLD_TOKENS):
+    return estimate_tokens(syllabus) > threshold
+
+
+def _pieces(text, max_tokens):
+    # Paragraphs first, then sentences, then hard splits for run-on text
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            step = max_tokens * 4
+            for start in range(0, len(sentence), step):
+                yield sentence[start:start + step]
+
+
+def split_into_chunks(text, max_tokens=CHUNK_MAX_TOKENS):
+    """Split text into sections of at most `max_tokens` estimated tokens."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in _pieces(text, max_tokens):
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def allocate_questions(chunks, num_questions):
+    """
+    Distribute `num_questions` across chunks in proportion to their size,
+    using the largest-remainder method so the counts add up exactly.
+    """
+    sizes = [estimate_tokens(chunk) for chunk in chunks]
+    total = sum(sizes)
+    if not total or num_questions <= 0:
+        return [0] * len(chunks)
+    quotas = [num_questions * size / total for size in sizes]
+    counts = [int(quota) for quota in quotas]
+    by_remainder = sorted(range(len(chunks)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_remainder[:num_questions - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def merge_questions(batches, num_questions):
+    """Concatenate per-chunk results in document order, dropping near-duplicate questions."""
+    merged = dedupe([item for batch in batches for item in batch], commit=False)
+    return merged[:num_questions]
+
+
+async def generate_chunked(generate, parse, syllabus, num_questions, difficulty,
+                           max_tokens=CHUNK_MAX_TOKENS, concurrency=CHUNK_CONCURRENCY, chunks=None,
+                           history_index=None, initial=None):
+    """
+    Map-reduce generation for long syllabi.
+    `generate` is one of the generate_* coroutines from b.py and `parse` the
+    matching parser from question_parser.py. Chunks are generated concurrently,
+    at most `concurrency` at a time, each topped up if some of its questions
+    fail to parse, and merged into one list. Callers generating several
+    question types from one syllabus can pass the `chunks` they already split.
+    A chunk whose generation fails upstream is left out; the error is raised
+    only if every chunk fails. Questions repeating `history_index` are
+    skipped, and the merged result is added to it. `initial` items (from the
+    question bank) come first and only the rest are generated.
+    """
+    initial = initial or []
+    if chunks is None:
+        chunks = split_into_chunks(syllabus, max_tokens)
+    counts = allocate_questions(chunks, num_questions - len(initial))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk, count):
+        async with semaphore:
+            return await generate_with_topup(
+                generate, parse, chunk, count, difficulty, history_index=history_index, commit=False
+            )
+
+    results = await asyncio.gather(*(
+        run(chunk, count) for chunk, count in zip(chunks, counts) if count > 0
+    ), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, HTTPException):
+            raise result
+    batches = [result for result in results if not isinstance(result, HTTPException)]
+    if results and not batches and not initial:
+        raise results[0]
+    merged = merge_questions([initial, *batches], num_questions)
+    remember(merged, history_index)
+    return merged
@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_state import SharedStateError, get_shared_store
+
+
+# Questions whose Jaccard similarity (over the words and adjacent word pairs
+# of the normalized text) reaches this are treated as duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+# An LSH bucket shared by this many texts only says they follow a common
+# phrasing ("Which of the following..."), so it stops growing and is not used
+# for lookups; near-duplicates still meet in their other bands
+DEDUP_BUCKET_CAP = int(os.getenv("DEDUP_BUCKET_CAP", "64"))
+# Bounds of the per-syllabus history of served questions (syllabi, and
+# questions across all of them)
+DEDUP_HISTORY_SYLLABI = int(os.getenv("DEDUP_HISTORY_SYLLABI", "1000"))
+DEDUP_HISTORY_MAX_ITEMS = int(os.getenv("DEDUP_HISTORY_MAX_ITEMS", "200000"))
+# With a shared state backend, served questions are also kept there for this
+# many seconds, so every worker process avoids them
+DEDUP_HISTORY_SHARED_TTL = float(os.getenv("DEDUP_HISTORY_SHARED_TTL", str(7 * 86400)))
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+# Function words that make short questions look alike ("the capital of
+# France" / "the capital of Spain") or different ("of a cell" / "of the cell");
+# negations are kept since they change the question
+_STOP_WORDS = frozenset(
+    "a an the of in on at to for from by with and or is are was were be been it its this that these those".split()
+)
+
+# Counters for the stats endpoint
+stats = {"checked": 0, "duplicates": 0, "history_duplicates": 0}
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def item_text(item):
+    """Text that identifies a generated question (or matching pair)."""
+    return item.get("question") or item.get("term") or ""
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of question texts.
+    Each text becomes the set of its words and adjacent word pairs, hashed
+    to 32-bit integers, and a signature of `num_perm` minimum hashes
+    (multiply-shift hashing, vectorized across all permutations at once).
+    Signatures are split into `bands` bands; texts sharing any band are
+    candidates, and a candidate is a duplicate when the exact Jaccard
+    similarity of the two shingle sets reaches `threshold`. Only the band
+    keys and the shingles are kept, so lookups cost one signature, a few
+    dict probes and a vectorized overlap count over the candidates,
+    independent of the index size.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=DEDUP_NUM_PERM, bands=DEDUP_BANDS,
+                 bucket_cap=DEDUP_BUCKET_CAP, seed=1):
+        import numpy as np
+
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.bucket_cap = bucket_cap
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, size=(1, self.rows), dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        # Shingles of every indexed text, concatenated; row i is _shingles[_offsets[i]:_offsets[i + 1]]
+        self._shingles = np.empty(1024, dtype=np.uint32)
+        self._offsets = np.zeros(65, dtype=np.int64)
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sketch(self, text):
+        """(shingles, band keys) of a text: what `query` and `add` need, computed once."""
+        import numpy as np
+
+        tokens = [token for token in normalize(text).split() if token not in _STOP_WORDS] or [""]
+        words = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64,
+                            count=len(tokens))
+        pairs = ((words[:-1] * np.uint64(0x9E3779B1)) ^ words[1:]) & np.uint64(0xFFFFFFFF)
+        shingles = np.unique(np.concatenate([words, pairs]))
+        # (a * x + b) >> 32 with wrapping 64-bit arithmetic, for every permutation and shingle
+        signature = ((np.multiply.outer(self._a, shingles) + self._b[:, None]) >> np.uint64(32)).min(axis=1)
+        # One 64-bit key per band; a collision only adds a candidate, which the overlap check rejects
+        keys = (signature.reshape(self.bands, self.rows) * self._band_mix).sum(axis=1).tolist()
+        return shingles.astype(np.uint32), keys
+
+    def query(self, text=None, sketch=None):
+        """Return (id, similarity) of the most similar indexed text at or above the threshold, or None."""
+        import numpy as np
+
+        shingles, keys = sketch if sketch is not None else self.sketch(text)
+        candidates = set()
+        for buckets, key in zip(self._buckets, keys):
+            rows = buckets.get(key)
+            if rows is None:
+                continue
+            if isinstance(rows, int):
+                candidates.add(rows)
+            elif len(rows) < self.bucket_cap:
+                candidates.update(rows)
+        if not candidates:
+            return None
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        starts = self._offsets[rows]
+        lengths = self._offsets[rows + 1] - starts
+        # Gather all candidate shingles at once and count each candidate's overlap with the query
+        firsts = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(starts - firsts, lengths)
+        shared = np.add.reduceat(np.isin(self._shingles[positions], shingles), firsts)
+        similarity = shared / (len(shingles) + lengths - shared)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return self.ids[rows[best]], float(similarity[best])
+
+    def add(self, text=None, item_id=None, sketch=None):
+        """Index a text under `item_id` (its position by default)."""
+        import numpy as np
+
+        shingles, keys = sketch if sketch is not None else self.sketch(text)
+        row = len(self.ids)
+        start = self._offsets[row]
+        end = start + len(shingles)
+        if end > len(self._shingles):
+            self._shingles = np.resize(self._shingles, max(2 * len(self._shingles), end))
+        if row + 2 > len(self._offsets):
+            self._offsets = np.resize(self._offsets, 2 * len(self._offsets))
+        self._shingles[start:end] = shingles
+        self._offsets[row + 1] = end
+        self.ids.append(row if item_id is None else item_id)
+        # Most buckets hold a single row, stored bare to keep large indexes small
+        for buckets, key in zip(self._buckets, keys):
+            rows = buckets.get(key)
+            if rows is None:
+                buckets[key] = row
+            elif isinstance(rows, int):
+                buckets[key] = [rows, row]
+            elif len(rows) < self.bucket_cap:
+                rows.append(row)
+        return row
+
+    def add_if_new(self, text):
+        """Index `text` unless a near-duplicate is already indexed; returns whether it was added."""
+        sketch = self.sketch(text)
+        if self.query(sketch=sketch) is not None:
+            return False
+        self.add(sketch=sketch)
+        return True
+
+
+# Writes served questions to the shared store in order, without making requests wait
+_publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedup-history")
+
+
+class HistoryIndex(NearDuplicateIndex):
+    """
+    NearDuplicateIndex of served questions that, given a shared store, also
+    publishes each added text there under `prefix`, so other worker processes
+    can pull it into their own index (see QuestionHistory.aindex_for).
+    """
+
+    def __init__(self, store=None, prefix="", ttl=DEDUP_HISTORY_SHARED_TTL):
+        super().__init__()
+        self.store = store
+        self.prefix = prefix
+        self.ttl = ttl
+        # Shared keys already in this index
+        self.seen = set()
+        self.store_errors = 0
+
+    def add(self, text=None, item_id=None, sketch=None):
+        row = super().add(text, item_id, sketch)
+        if self.store is not None and text is not None:
+            key = self.prefix + uuid.uuid4().hex
+            self.seen.add(key)
+            _publisher.submit(self._publish, key, text)
+        return row
+
+    def _publish(self, key, text):
+        try:
+            self.store.set(key, text, self.ttl)
+        except SharedStateError:
+            self.store_errors += 1
+
+    def merge(self, entries):
+        """Add (key, text) pairs from the shared store that this index has not seen."""
+        for key, text in entries:
+            if key not in self.seen:
+                self.seen.add(key)
+                super().add(text)
+
+
+class QuestionHistory:
+    """
+    Questions already served per syllabus, so later requests for the same
+    syllabus can skip near-repeats. Keeps an index for at most `max_syllabi`
+    syllabi and `max_items` questions in total (about 1.4 KB each); the least
+    recently used syllabi are dropped first, and a syllabus that alone
+    reaches `max_items` starts over. With a shared `store`, questions served
+    by any worker process are pulled in before an index is used.
+    """
+
+    def __init__(self, max_syllabi=DEDUP_HISTORY_SYLLABI, max_items=DEDUP_HISTORY_MAX_ITEMS, store=None):
+        self.max_syllabi = max_syllabi
+        self.max_items = max_items
+        self.store = store
+        self._indexes = OrderedDict()
+        self.store_errors = 0
+
+    @staticmethod
+    def key(syllabus, kind):
+        return hashlib.sha256(syllabus.encode("utf-8")).hexdigest(), kind
+
+    def index_for(self, syllabus, kind):
+        """The history index for a syllabus and question type, created on first use."""
+        key = self.key(syllabus, kind)
+        index = self._indexes.get(key)
+        if index is None or len(index) >= self.max_items:
+            digest, kind = key
+            index = self._indexes[key] = HistoryIndex(self.store, f"history:{kind}:{digest}:")
+        self._indexes.move_to_end(key)
+        total = sum(len(index) for index in self._indexes.values())
+        while len(self._indexes) > 1 and (len(self._indexes) > self.max_syllabi or total > self.max_items):
+            _, evicted = self._indexes.popitem(last=False)
+            total -= len(evicted)
+        return index
+
+    async def aindex_for(self, syllabus, kind):
+        """index_for() after pulling in what other workers served; the store is read on a thread."""
+        index = self.index_for(syllabus, kind)
+        if self.store is not None:
+            try:
+                entries = await asyncio.to_thread(self.store.items, index.prefix)
+            except SharedStateError:
+                # Fall back to what this worker has seen
+                self.store_errors += 1
+            else:
+                index.merge(entries)
+        return index
+
+    def stats(self):
+        stats = {"syllabi": len(self._indexes), "items": sum(len(index) for index in self._indexes.values())}
+        if self.store is not None:
+            stats["store_errors"] = self.store_errors + sum(index.store_errors for index in self._indexes.values())
+        return stats
+
+
+history = QuestionHistory(store=get_shared_store())
+
+
+class Deduplicator:
+    """
+    Filters one response: rejects items that repeat an earlier item of the
+    same response or, when a `history` index is given, a question already
+    served for the syllabus. `accept(item)` returns whether to keep it;
+    `commit()` records the kept items in the history.
+    """
+
+    def __init__(self, history_index=None):
+        self.index = NearDuplicateIndex()
+        self.history_index = history_index
+        self._kept = []
+
+    def accept(self, item):
+        sketch = self.index.sketch(item_text(item))
+        stats["checked"] += 1
+        if self.index.query(sketch=sketch) is not None:
+            stats["duplicates"] += 1
+            return False
+        if self.history_index is not None and self.history_index.query(sketch=sketch) is not None:
+            stats["history_duplicates"] += 1
+            return False
+        self.index.add(sketch=sketch)
+        self._kept.append((item_text(item), sketch))
+        return True
+
+    def commit(self):
+        if self.history_index is not None:
+            # The text goes along so a shared history can publish it
+            for text, sketch in self._kept:
+                self.history_index.add(text, sketch=sketch)
+        self._kept = []
+
+
+def dedupe(items, history_index=None, commit=True):
+    """
+    Items with near-duplicates (within the list, or in `history_index`)
+    removed, first occurrence kept. With `commit` the kept items are added to
+    the history.
+    """
+    deduplicator = Deduplicator(history_index)
+    kept = [item for item in items if deduplicator.accept(item)]
+    if commit:
+        deduplicator.commit()
+    return kept
+
+
+def remember(items, history_index):
+    """Add served items to a history index."""
+    if history_index is not None:
+        for item in items:
+            history_index.add(item_text(item))
@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+
+from shared_state import SharedStateError, get_shared_store
+
+
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
+EXTRACTION_CACHE_MEMORY_BYTES = int(os.getenv("EXTRACTION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+# Path of the SQLite file for the on-disk tier; empty keeps the cache in memory
+# only. With a shared state backend (see shared_state.py) that tier is used instead
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")
+EXTRACTION_CACHE_DISK_BYTES = int(os.getenv("EXTRACTION_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+# The shared store is not bounded by size, so entries there expire instead
+EXTRACTION_CACHE_SHARED_TTL = float(os.getenv("EXTRACTION_CACHE_SHARED_TTL", str(7 * 86400)))
+
+# Bump when an extractor's output changes for the same input; old entries
+# then stop matching and age out of the LRU tiers
+# document 2: PDF pages joined with "\f"; audio 2: non-WAV decoded by ffmpeg
+EXTRACTOR_VERSIONS = {"document": 2, "audio": 2, "video": 1}
+
+# Installed libraries whose upgrade can change the extracted text
+_DISTRIBUTIONS = {
+    ".pdf": ("PyPDF2",),
+    ".docx": ("python-docx",),
+    ".txt": (),
+    "audio": ("pydub", "SpeechRecognition"),
+    "video": ("imageio-ffmpeg", "pydub", "SpeechRecognition"),
+}
+
+
+def _installed(distribution):
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return "-"
+
+
+def _media_settings():
+    # Imported here so document-only workers never load the audio stack
+    from media import MEDIA_SAMPLE_RATE
+    from transcription import STT_BACKEND, STT_OVERLAP_SECONDS, STT_SEGMENT_SECONDS, STT_SPLIT_MODE
+
+    return [STT_BACKEND, STT_SEGMENT_SECONDS, STT_OVERLAP_SECONDS, STT_SPLIT_MODE, MEDIA_SAMPLE_RATE]
+
+
+def extraction_key(content_hash, kind, extension, pages=None, language="en-US"):
+    """
+    Content address of an extraction: the upload's SHA-256 plus everything
+    that can change the text for the same bytes (extractor version, library
+    versions, page selection, recognizer settings). `kind` is "document",
+    "audio" or "video".
+    """
+    parts = [kind, EXTRACTOR_VERSIONS[kind], extension]
+    parts += [_installed(name) for name in _DISTRIBUTIONS[extension if kind == "document" else kind]]
+    if kind == "document":
+        parts.append(pages or "")
+    else:
+        parts += [language] + _media_settings()
+    digest = hashlib.sha256(content_hash.encode("ascii"))
+    digest.update("\0".join(str(part) for part in parts).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed tier bounded by total text size; evicts least recently used rows."""
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_access ON extractions(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, value, size):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()
+            if total > self.max_bytes:
+                evict = []
+                for old_key, old_size in self._conn.execute(
+                    "SELECT key, size FROM extractions ORDER BY last_access"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((old_key,))
+                    total -= old_size
+                self._conn.executemany("DELETE FROM extractions WHERE key = ?", evict)
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.commit()
+
+
+class _SharedTier:
+    """Tier in the shared state store, seen by every worker process; store errors count as misses."""
+
+    _PREFIX = "extraction:"
+
+    def __init__(self, store, ttl):
+        self._store = store
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            return self._store.get(self._PREFIX + key)
+        except SharedStateError:
+            return None
+
+    def set(self, key, value, size):
+        try:
+            self._store.set(self._PREFIX + key, value, self.ttl)
+        except SharedStateError:
+            pass
+
+    def stats(self):
+        # Sizes are not tracked in the shared store
+        try:
+            return self._store.count(self._PREFIX), 0
+        except SharedStateError:
+            return 0, 0
+
+    def clear(self):
+        self._store.delete_prefix(self._PREFIX)
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of extracted and transcribed text.
+    An in-memory LRU tier sits in front of an optional SQLite tier; both are
+    bounded by the total size of the text they hold. Entries never expire:
+    the same bytes extracted by the same extractor give the same text. When a
+    shared store is given it replaces the SQLite tier, with entries expiring
+    after `shared_ttl` seconds.
+    """
+
+    def __init__(self, memory_bytes=EXTRACTION_CACHE_MEMORY_BYTES, db_path=EXTRACTION_CACHE_DB,
+                 disk_bytes=EXTRACTION_CACHE_DISK_BYTES, shared=None, shared_ttl=EXTRACTION_CACHE_SHARED_TTL):
+        self.memory_bytes = memory_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        if shared is not None:
+            self._disk = _SharedTier(shared, shared_ttl)
+        else:
+            self._disk = _DiskTier(db_path, disk_bytes) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key][0]
+        return None
+
+    def _get_disk(self, key):
+        value = self._disk.get(key) if self._disk is not None else None
+        if value is not None:
+            self._remember(key, value, len(value.encode("utf-8")))
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+        return value
+
+    def _missed(self):
+        with self._lock:
+            self.misses += 1
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_disk(key)
+        if value is None:
+            self._missed()
+        return value
+
+    def set(self, key, value):
+        size = len(value.encode("utf-8"))
+        self._remember(key, value, size)
+        if self._disk is not None:
+            self._disk.set(key, value, size)
+
+    # For coroutines: the memory tier inline, the SQLite or shared tier on a thread
+    async def aget(self, key):
+        value = self._get_memory(key)
+        if value is None and self._disk is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            self._missed()
+        return value
+
+    async def aset(self, key, value):
+        size = len(value.encode("utf-8"))
+        self._remember(key, value, size)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, size)
+
+    def _remember(self, key, value, size):
+        # Texts larger than the whole memory tier only go to disk
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= self._memory.pop(key)[1]
+            self._memory[key] = (value, size)
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        disk_entries, disk_bytes = self._disk.stats() if self._disk is not None else (0, 0)
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+
+_cache = None
+
+
+def get_extraction_cache():
+    """Return the process-wide extraction cache, or None when disabled."""
+    global _cache
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ExtractionCache(shared=get_shared_store())
+    return _cache
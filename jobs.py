@@ -0,0 +1,311 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+
+from shared_state import SharedStateError, get_shared_store
+
+
+JOB_STORE = os.getenv("JOB_STORE", "memory")  # "memory", "sqlite" or "shared"
+JOB_DB = os.getenv("JOB_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs allowed to wait for a worker before submissions are refused with 429;
+# each one holds its spooled upload until it runs
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "64"))
+# Finished jobs (and their results) are dropped after this many seconds
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+
+# Raised by the job stores when their backing file or server fails
+STORE_ERRORS = (SharedStateError, sqlite3.Error)
+
+
+def _store_unavailable():
+    return HTTPException(status_code=503, detail="The job store is unavailable. Please retry shortly.",
+                         headers={"Retry-After": "5"})
+
+
+def _new_job(kind):
+    now = time.time()
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "status": "queued",
+        "stage": "queued",
+        "progress": 0.0,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": None,
+    }
+
+
+class InMemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge_expired(self, now):
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job["expires_at"] is not None and job["expires_at"] <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    _COLUMNS = ("id", "kind", "status", "stage", "progress", "result", "error",
+                "created_at", "updated_at", "expires_at")
+
+    def __init__(self, path=JOB_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT,"
+            " progress REAL NOT NULL, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs(expires_at)")
+        self._conn.commit()
+
+    def create(self, job):
+        row = dict(job, result=json.dumps(job["result"]))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+                [row[column] for column in self._COLUMNS],
+            )
+            self._conn.commit()
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self._COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def purge_expired(self, now):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class SharedJobStore:
+    """
+    Jobs in the shared state store (see shared_state.py), so any worker
+    process can answer a poll for a job another one is running. A job is
+    only written by the worker that runs it. Unfinished jobs expire after
+    `pending_ttl` seconds in case that worker dies.
+    """
+
+    _PREFIX = "job:"
+
+    def __init__(self, store, pending_ttl=86400):
+        self._store = store
+        self.pending_ttl = pending_ttl
+
+    def _write(self, job):
+        ttl = job["expires_at"] - time.time() if job["expires_at"] is not None else self.pending_ttl
+        self._store.set(self._PREFIX + job["id"], json.dumps(job), max(ttl, 1))
+
+    def create(self, job):
+        self._write(job)
+
+    def update(self, job_id, **fields):
+        job = self.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+            self._write(job)
+
+    def get(self, job_id):
+        value = self._store.get(self._PREFIX + job_id)
+        return json.loads(value) if value is not None else None
+
+    def purge_expired(self, now):
+        # The store drops expired jobs itself
+        return 0
+
+
+def make_job_store(kind=JOB_STORE):
+    if kind == "sqlite":
+        return SQLiteJobStore()
+    if kind == "shared":
+        store = get_shared_store()
+        if store is None:
+            raise ValueError("JOB_STORE=shared needs SHARED_STATE_BACKEND to be set.")
+        return SharedJobStore(store)
+    if kind == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+class JobManager:
+    """
+    Runs long jobs in the background.
+    submit() stores a queued job and returns its id immediately; a fixed set
+    of worker tasks take jobs off the queue and record stage, progress and the
+    result (or error) in the job store. Handlers are coroutines called as
+    handler(report, *args), where report(stage, progress) updates the job.
+    Once `max_queued` jobs are waiting, submit() refuses new ones with 429.
+    Store calls run on a thread, since the SQLite and shared stores may
+    block. A job store failure loses that update (and is counted) but never
+    stops a worker; submit() and get() answer it with 503.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL, max_queued=JOB_MAX_QUEUED):
+        self.store = store if store is not None else make_job_store()
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.max_queued = max_queued
+        self._queue = None
+        self._tasks = []
+        self.store_errors = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._expire()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def check_capacity(self):
+        """Raise 429 if a job submitted now would be refused, e.g. before spooling its upload."""
+        if self.queue_depth() >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Too many background jobs are queued. Please retry shortly.",
+                                headers={"Retry-After": "5"})
+
+    async def submit(self, kind, handler, *args, cleanup=None):
+        try:
+            self.check_capacity()
+        except HTTPException:
+            if cleanup is not None:
+                cleanup()
+            raise
+        job = _new_job(kind)
+        try:
+            await asyncio.to_thread(self.store.create, job)
+        except STORE_ERRORS as e:
+            self.store_errors += 1
+            if cleanup is not None:
+                cleanup()
+            raise _store_unavailable() from e
+        self._queue.put_nowait((job["id"], handler, args, cleanup))
+        return job
+
+    async def get(self, job_id):
+        try:
+            job = await asyncio.to_thread(self.store.get, job_id)
+        except STORE_ERRORS as e:
+            self.store_errors += 1
+            raise _store_unavailable() from e
+        if job is not None and job["expires_at"] is not None and job["expires_at"] <= time.time():
+            return None
+        return job
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {"workers": self.workers, "queue_depth": self.queue_depth(), "max_queued": self.max_queued,
+                "rejected": self.rejected, "store_errors": self.store_errors}
+
+    def _write(self, job_id, **fields):
+        # Blocking store write; a failure loses the update and is counted
+        try:
+            self.store.update(job_id, **fields)
+        except STORE_ERRORS:
+            self.store_errors += 1
+
+    async def _update(self, job_id, **fields):
+        await asyncio.to_thread(self._write, job_id, **fields)
+
+    async def _worker(self):
+        while True:
+            job_id, handler, args, cleanup = await self._queue.get()
+
+            reports = []
+
+            def report(stage, progress=None, job_id=job_id, reports=reports):
+                fields = {"stage": stage}
+                if progress is not None:
+                    fields["progress"] = progress
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    # Called from a pool thread, which can wait for the store itself
+                    self._write(job_id, **fields)
+                else:
+                    reports.append(asyncio.ensure_future(self._update(job_id, **fields)))
+
+            try:
+                await self._update(job_id, status="running", stage="running")
+                try:
+                    result = await handler(report, *args)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Stage reports must land before the final status, not overwrite it
+                    await asyncio.gather(*reports)
+                    await self._update(job_id, status="failed", stage="failed", error=getattr(e, "detail", str(e)),
+                                       expires_at=time.time() + self.result_ttl)
+                else:
+                    await asyncio.gather(*reports)
+                    await self._update(job_id, status="succeeded", stage="done", progress=1.0, result=result,
+                                       expires_at=time.time() + self.result_ttl)
+            finally:
+                try:
+                    if cleanup is not None:
+                        cleanup()
+                finally:
+                    self._queue.task_done()
+
+    async def _expire(self):
+        while True:
+            await asyncio.sleep(min(self.result_ttl, 60))
+            try:
+                await asyncio.to_thread(self.store.purge_expired, time.time())
+            except STORE_ERRORS:
+                self.store_errors += 1
@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+from llm_client import get_client, upstream
+
+
+# API keys usually come from .env
+load_dotenv()
+
+# Which LLM answers generation prompts: "perplexity", "openai" (any
+# OpenAI-compatible chat-completions endpoint) or "fake" (offline, deterministic)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "perplexity")
+LLM_MODEL = os.getenv("LLM_MODEL")
+
+PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
+PERPLEXITY_MODEL = "llama-3.1-sonar-small-128k-online"
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+OPENAI_MODEL = "gpt-4o-mini"
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAKE_LLM_PER_QUESTION = float(os.getenv("FAKE_LLM_PER_QUESTION", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+SYSTEM_PROMPT = "You are a helpful assistant for generating educational questions."
+
+
+class ChatCompletionsBackend:
+    """
+    Backend for an OpenAI-style /chat/completions API. Calls go through the
+    shared pooled client from llm_client (with its retries and concurrency cap).
+    """
+
+    name = "OpenAI-compatible"
+
+    def __init__(self, url, api_key, model, key_variable="OPENAI_API_KEY", extra_payload=None):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.key_variable = key_variable
+        self.extra_payload = extra_payload or {}
+
+    def request(self, prompt, model=None):
+        """Headers and JSON payload for one completion."""
+        if not self.api_key:
+            raise ValueError(f"{self.name} API key is missing. Please set the {self.key_variable} variable in your .env file.")
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": model or self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0,  # Set temperature to 0 for deterministic responses
+            **self.extra_payload,
+        }
+        return headers, payload
+
+    @staticmethod
+    def content(result):
+        if 'choices' in result and len(result['choices']) > 0:
+            return result['choices'][0]['message']['content']
+        return None
+
+    async def complete(self, prompt, model=None, timeout=None):
+        """Return the completion text, or None if the API returned no choices."""
+        headers, payload = self.request(prompt, model)
+        return self.content(await get_client().post_json(self.url, headers, payload, timeout=timeout))
+
+    async def stream(self, prompt, model=None, timeout=None):
+        """Yield the completion text piece by piece as it is generated."""
+        headers, payload = self.request(prompt, model)
+        payload["stream"] = True
+        async for line in get_client().stream_lines(self.url, headers, payload, timeout=timeout):
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+    def complete_blocking(self, prompt, model=None, timeout=30):
+        """Synchronous completion for the Streamlit app."""
+        headers, payload = self.request(prompt, model)
+        response = requests.post(self.url, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return self.content(response.json())
+
+
+class PerplexityBackend(ChatCompletionsBackend):
+    name = "Perplexity"
+
+    def __init__(self, url=PERPLEXITY_API_URL, api_key=PERPLEXITY_API_KEY, model=None):
+        super().__init__(
+            url, api_key, model or LLM_MODEL or PERPLEXITY_MODEL, key_variable="PERPLEXITY_API_KEY",
+            extra_payload={
+                "max_tokens": 10000,  # Ensure an appropriate max token limit
+                "seed": 12345,  # Optional seed for deterministic responses (if supported by the API)
+            },
+        )
+
+
+def openai_backend():
+    return ChatCompletionsBackend(
+        OPENAI_API_BASE.rstrip("/") + "/chat/completions", OPENAI_API_KEY, LLM_MODEL or OPENAI_MODEL,
+    )
+
+
+class FakeBackend:
+    """
+    Offline backend for tests and load tests. Answers every prompt with
+    well-formed questions of the requested type and count (JSON for
+    structured prompts, the legacy text format otherwise), sleeping
+    `latency + per_question * count` seconds. The content depends only on the
+    prompt; a seeded `error_rate` fraction of calls fail like an upstream 503.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=FAKE_LLM_LATENCY, per_question=FAKE_LLM_PER_QUESTION,
+                 error_rate=FAKE_LLM_ERROR_RATE, seed=FAKE_LLM_SEED, model=None):
+        self.latency = latency
+        self.per_question = per_question
+        self.error_rate = error_rate
+        self.model = model or "fake"
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _fail(self):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.error_rate
+        if failed:
+            request = httpx.Request("POST", "http://fake-llm/chat/completions")
+            raise httpx.HTTPStatusError("Fake upstream error", request=request,
+                                        response=httpx.Response(503, request=request))
+
+    @staticmethod
+    def _count(prompt):
+        requested = re.search(r"Generate (\d+)", prompt)
+        return int(requested.group(1)) if requested else 5
+
+    def respond(self, prompt):
+        """Completion text for a prompt."""
+        count = self._count(prompt)
+        topic = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        kind = _prompt_kind(prompt)
+        items = [_FAKE_ITEMS[kind](topic, i) for i in range(1, count + 1)]
+        if '"type": "array"' in prompt:
+            return json.dumps([item for item, _ in items], indent=1)
+        return "\n\n".join(text for _, text in items)
+
+    def _delay(self, prompt):
+        return self.latency + self.per_question * self._count(prompt)
+
+    async def complete(self, prompt, model=None, timeout=None):
+        async def attempt():
+            await asyncio.sleep(self._delay(prompt))
+            self._fail()
+            return self.respond(prompt)
+
+        # Failures are retried like real upstream errors
+        return await get_client().retrying(attempt)
+
+    async def stream(self, prompt, model=None, timeout=None):
+        await upstream.limiter.acquire(upstream.name)
+        self._fail()
+        pieces = self.respond(prompt).splitlines(keepends=True)
+        for piece in pieces:
+            await asyncio.sleep(self._delay(prompt) / len(pieces))
+            yield piece
+
+    def complete_blocking(self, prompt, model=None, timeout=30):
+        time.sleep(self._delay(prompt))
+        self._fail()
+        return self.respond(prompt)
+
+
+def _prompt_kind(prompt):
+    for marker, kind in (("MCQItem", "mcq"), ("FillInTheBlankItem", "fill_in_the_blanks"),
+                         ("TrueFalseItem", "true_false"), ("MatchingPair", "matching"),
+                         ("multiple-choice", "mcq"), ("Fill in the Blank", "fill_in_the_blanks"),
+                         ("True/False", "true_false"), ("matching pairs", "matching")):
+        if marker in prompt:
+            return kind
+    return "mcq"
+
+
+# (JSON item, legacy text) for fake question `i` of each type
+_FAKE_ITEMS = {
+    "mcq": lambda topic, i: (
+        {"question": f"What is {topic} fact number {i}?",
+         "options": [f"Option {i}a", f"Option {i}b", f"Option {i}c", f"Option {i}d"],
+         "answer": "A", "explanation": f"Fact {i} of {topic} is option {i}a."},
+        f"Q{i}. What is {topic} fact number {i}?\nA. Option {i}a\nB. Option {i}b\nC. Option {i}c\n"
+        f"D. Option {i}d\nAnswer: A - Explanation: Fact {i} of {topic} is option {i}a.",
+    ),
+    "fill_in_the_blanks": lambda topic, i: (
+        {"question": f"Fact {i} of {topic} is __________.", "answer": f"answer {i}",
+         "explanation": f"Fact {i} of {topic} is answer {i}."},
+        f"{i}. Fill in the blank: Fact {i} of {topic} is __________.\nAnswer: answer {i}\n"
+        f"Explanation: Fact {i} of {topic} is answer {i}.",
+    ),
+    "true_false": lambda topic, i: (
+        {"question": f"Fact {i} of {topic} is true?", "answer": "True" if i % 2 else "False",
+         "explanation": f"Fact {i} of {topic} is {'true' if i % 2 else 'false'}."},
+        f"Q{i}. Fact {i} of {topic} is true? (True/False)\nAnswer: {'True' if i % 2 else 'False'}\n"
+        f"Explanation: Fact {i} of {topic} is {'true' if i % 2 else 'false'}.",
+    ),
+    "matching": lambda topic, i: (
+        {"term": f"{topic} term {i}", "match": f"{topic} definition {i}"},
+        f"{i}. {topic} term {i} | {topic} definition {i}",
+    ),
+}
+
+
+def make_backend(kind=LLM_BACKEND):
+    if kind == "perplexity":
+        return PerplexityBackend()
+    if kind == "openai":
+        return openai_backend()
+    if kind == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the process-wide backend selected by LLM_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = make_backend()
+        # Upstream errors name the configured API
+        upstream.name = _backend.name
+    return _backend
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import random
+
+import httpx
+
+from resilience import Upstream
+from shared_state import get_shared_store
+
+
+# Connection pool / concurrency settings for the async generation client
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# Transient upstream failures (connection errors, timeouts, 429/5xx) are retried
+# with exponential backoff and jitter, at most LLM_MAX_RETRIES times per call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+# Client-side quota for the LLM API (0 disables the limiter): requests per
+# minute, burst size, and how long a call may wait for a slot before it is
+# refused with 429
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
+LLM_RATE_MAX_WAIT = float(os.getenv("LLM_RATE_MAX_WAIT", "5"))
+# The circuit opens after this many consecutive failed calls (0 disables it)
+# and lets a trial call through after LLM_BREAKER_RESET seconds
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Rate limiter and circuit breaker shared by every LLM call in the process (the
+# rate limit by every worker process when a shared state backend is configured)
+upstream = Upstream(
+    "LLM", LLM_RATE_PER_MINUTE, LLM_RATE_BURST, LLM_RATE_MAX_WAIT, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET,
+    store=get_shared_store(),
+)
+
+
+def backoff_delay(attempt, base=LLM_BACKOFF_BASE, maximum=LLM_BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def _is_retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+def _retry_after(error):
+    # Honour a numeric Retry-After from a 429/503 when the server sends one
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return float(error.response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class GenerationClient:
+    """
+    Shared asyncio HTTP client for the LLM API.
+    Keeps a pooled httpx.AsyncClient alive between requests and caps the
+    number of upstream calls in flight with a semaphore.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive=LLM_MAX_KEEPALIVE,
+        timeout=LLM_TIMEOUT,
+        connect_timeout=LLM_CONNECT_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client = None
+        self._semaphore = None
+        self.in_flight = 0
+        self.retries = 0
+
+    def _ensure_started(self):
+        # Created lazily so the client binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def post_json(self, url, headers, payload, timeout=None):
+        """
+        POST a JSON payload and return the decoded JSON response, retrying
+        transient failures with exponential backoff.
+        """
+        self._ensure_started()
+        request_timeout = self._timeout if timeout is None else httpx.Timeout(timeout, connect=self._timeout.connect)
+
+        async def attempt():
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    response = await self._client.post(url, headers=headers, json=payload, timeout=request_timeout)
+                    response.raise_for_status()
+                    return response.json()
+                finally:
+                    self.in_flight -= 1
+
+        return await self.retrying(attempt)
+
+    async def retrying(self, attempt):
+        """
+        Await `attempt()` until it succeeds, retrying retryable httpx errors up
+        to max_retries times. The backoff sleep happens between attempts, so a
+        waiting retry does not hold a concurrency slot. Every attempt takes a
+        token from the rate limiter first.
+        """
+        retries = 0
+        while True:
+            await upstream.limiter.acquire(upstream.name)
+            try:
+                return await attempt()
+            except httpx.HTTPError as e:
+                if retries >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+            await asyncio.sleep(min(delay, LLM_BACKOFF_MAX) if delay is not None else backoff_delay(retries))
+            retries += 1
+            self.retries += 1
+
+    async def stream_lines(self, url, headers, payload, timeout=None):
+        """POST a JSON payload and yield the response body line by line as it arrives."""
+        self._ensure_started()
+        request_timeout = self._timeout if timeout is None else httpx.Timeout(timeout, connect=self._timeout.connect)
+        await upstream.limiter.acquire(upstream.name)
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with self._client.stream("POST", url, headers=headers, json=payload, timeout=request_timeout) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        yield line
+            finally:
+                self.in_flight -= 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+
+_client = None
+
+
+def get_client() -> GenerationClient:
+    """Return the process-wide generation client."""
+    global _client
+    if _client is None:
+        _client = GenerationClient()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
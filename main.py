@@ -1,12 +1,48 @@
 from fastapi import FastAPI, File, UploadFile, Form, Request, HTTPException
-from pydantic import BaseModel
-import shutil
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+import asyncio
+import functools
+import json
 import os
+import time
 import uuid
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+from jobs import JobManager
+from llm_client import close_client, get_client, upstream as llm_upstream
+from llm_backends import get_backend
+import metrics
+from metrics import span
+from pdf_extraction import shutdown_executor
+from translation import memory as translation_memory, translate_quiz, upstream as translation_upstream
+from uploads import UploadLimitMiddleware, read_upload
+from worker_pools import cpu_pool, io_pool, pool_stats, shutdown_pools
+from response_cache import cache_bypass, get_cache
+from singleflight import get_singleflight
+from extraction_cache import extraction_key, get_extraction_cache
+from shared_state import get_shared_store
 
+
+job_manager = JobManager()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+    # Release pooled upstream connections and worker processes on shutdown
+    await close_client()
+    shutdown_executor()
+    shutdown_pools()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Oversized uploads are refused before their body is read (inside CORS, so refusals carry its headers)
+app.add_middleware(UploadLimitMiddleware)
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -18,19 +54,77 @@ app.add_middleware(
 
 from b import (
     load_text,
-    transcribe_audio,
-    convert_video_to_text,
+    extract_text_from_file,
+    transcribe_audio_file,
+    convert_temporary_video_to_text,
+    spool_to_path,
+    is_extraction_error,
     translate_text,
     get_supported_languages,
     generate_mcq,
     generate_fill_in_the_blanks,
     generate_true_false,
     generate_matching_questions,
+    stream_mcq,
+    stream_fill_in_the_blanks,
+    stream_true_false,
+    usage as llm_usage,
+)
+from topup import stats as topup_stats
+from dedup import Deduplicator, history as question_history, stats as dedup_stats
+from quiz import generate_quiz
+from question_bank import QUESTION_BANK_ENABLED, bank_snapshot, generate_questions, stats as bank_stats, store_questions
+from prompt_budget import prepare_syllabus
+from question_parser import (
+    StreamingQuestionParser,
+    parse_mcq,
+    parse_fill_in_the_blanks,
+    parse_true_false,
 )
 
-# Temporary directory for storing uploaded files
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+def _cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _extraction_cache_stats():
+    cache = get_extraction_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _shared_state_stats():
+    store = get_shared_store()
+    return {"backend": store.name, "errors": store.errors} if store is not None else {"backend": "none"}
+
+
+def _coalescing_stats():
+    singleflight = get_singleflight()
+    return singleflight.stats() if singleflight is not None else {}
+
+
+# Existing stats counters, exported on /metrics
+metrics.stats_collector.add("response_cache", _cache_stats, counters=("hits", "disk_hits", "misses", "bypassed"))
+metrics.stats_collector.add("extraction_cache", _extraction_cache_stats, counters=("hits", "disk_hits", "misses"))
+metrics.stats_collector.add("coalescing", _coalescing_stats, counters=("leaders", "deduplicated", "failures"))
+metrics.stats_collector.add("translation_memory", translation_memory.stats, counters=("hits", "misses", "upstream_calls"))
+metrics.stats_collector.add("worker_pool", pool_stats, counters=tuple(
+    f"{pool}_{key}" for pool in ("io", "cpu") for key in ("completed", "failed", "rejected", "timed_out")
+))
+metrics.stats_collector.add("topup", lambda: topup_stats, counters=tuple(topup_stats))
+metrics.stats_collector.add("question_bank", lambda: bank_stats, counters=tuple(bank_stats))
+metrics.stats_collector.add("dedup", lambda: dict(dedup_stats, history=question_history.stats()),
+                            counters=tuple(dedup_stats))
+metrics.stats_collector.add("llm", lambda: dict(llm_upstream.stats(), in_flight=get_client().in_flight,
+                                                retries=get_client().retries),
+                            counters=("retries", "rate_limit_throttled", "rate_limit_refused",
+                                      "rate_limit_store_errors", "circuit_opened", "circuit_rejected"))
+metrics.stats_collector.add("llm_usage", lambda: llm_usage, counters=tuple(llm_usage))
+metrics.stats_collector.add("shared_state", _shared_state_stats, counters=("errors",))
+metrics.stats_collector.add("jobs", lambda: job_manager.stats(), counters=("rejected", "store_errors"))
+metrics.stats_collector.add("translation", translation_upstream.stats,
+                            counters=("rate_limit_throttled", "rate_limit_refused", "rate_limit_store_errors",
+                                      "circuit_opened", "circuit_rejected"))
 
 
 class TextInput(BaseModel):
@@ -41,6 +135,27 @@ class MCQInput(BaseModel):
     syllabus: str
     num_questions: int
     difficulty: str
+    # Skip questions near-identical to ones already served for this syllabus
+    avoid_repeats: bool = False
+    # Fill the request from the question bank first; only the shortfall is generated
+    from_bank: bool = False
+
+
+class QuizInput(BaseModel):
+    syllabus: str
+    difficulty: str
+    mcq: int = Field(0, ge=0)
+    true_false: int = Field(0, ge=0)
+    fill_in_the_blanks: int = Field(0, ge=0)
+    matching_sets: int = Field(0, ge=0)
+    matching_pairs: int = Field(5, ge=1)
+    avoid_repeats: bool = False
+    from_bank: bool = False
+
+
+class QuizTranslationInput(BaseModel):
+    questions: list
+    target_language: str
 
 
 @app.middleware("http")
@@ -49,41 +164,158 @@ async def assign_request_id(request: Request, call_next):
     Middleware to assign a unique request ID to each incoming request.
     """
     request.state.request_id = str(uuid.uuid4())
-    response = await call_next(request)
+    # Clients can force a fresh generation with "X-Cache-Bypass: 1" or "Cache-Control: no-cache"
+    cache_bypass.set(
+        request.headers.get("x-cache-bypass", "").lower() in ("1", "true", "yes")
+        or "no-cache" in request.headers.get("cache-control", "").lower()
+    )
+    # Stage timings recorded while handling the request go into the Server-Timing header
+    spans = metrics.start_request()
+    start = time.perf_counter()
+    status = 500
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+        # Label by route template, not raw path, to keep the series count bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_SECONDS.labels(request.method, route, str(status)).observe(elapsed)
     response.headers["X-Request-ID"] = request.state.request_id
+    response.headers["Server-Timing"] = metrics.server_timing(spans, elapsed)
     return response
 
 
 @app.post("/process-text/")
 async def process_text(input: TextInput, request: Request):
-    processed_text = load_text(input.text)
+    processed_text = await io_pool.run(load_text, input.text)
     return {
         "request_id": request.state.request_id,
         "processed_text": processed_text,
     }
 
 
+TEXT_EXTENSIONS = (".pdf", ".docx", ".txt")
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi")
+
+
+def upload_kind(filename):
+    if filename.endswith(TEXT_EXTENSIONS):
+        return "document"
+    if filename.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    if filename.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    raise HTTPException(status_code=400, detail="Unsupported file format.")
+
+
+async def extract_upload(upload, filename, pages=None, report=None):
+    """
+    Extract text from an uploaded document, or transcribe audio/video.
+    Runs on the worker pools so the event loop stays free; `report` receives
+    stage updates when called from a background job. Results are cached by
+    the upload's content hash, so a file that was processed before is
+    returned without running the extractor.
+    """
+    if report is None:
+        report = lambda stage, progress=None: None
+
+    kind = upload_kind(filename)
+    cache = get_extraction_cache()
+    key = None
+    if cache is not None:
+        key = extraction_key(upload.sha256, kind, os.path.splitext(filename)[1].lower(), pages)
+        with span("extraction_cache"):
+            cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+
+    text = await _extract(upload, filename, kind, pages, report)
+    if cache is not None and not is_extraction_error(text):
+        await cache.aset(key, text)
+    return text
+
+
+async def _extract(upload, filename, kind, pages, report):
+    if kind == "document":
+        report("extracting")
+        try:
+            return await io_pool.run(extract_text_from_file, upload, filename, pages)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    report("transcribing")
+    if kind == "audio":
+        progress = lambda fraction: report("transcribing", fraction)
+        return await io_pool.run(transcribe_audio_file, upload, filename, "en-US", progress)
+    # Video decoding is CPU-bound; the worker process reads a temporary copy,
+    # made off the event loop, and deletes it when it is done with it
+    video_path = await io_pool.run(spool_to_path, upload, filename)
+    # Transcoding and transcription happen in the worker process, so they are timed as one stage
+    try:
+        with span("video_transcription"):
+            return await cpu_pool.run(convert_temporary_video_to_text, video_path)
+    except HTTPException as e:
+        # A refused job never reached a worker, so the copy is still ours
+        if e.status_code == 429:
+            os.remove(video_path)
+        raise
+
+
 @app.post("/process-file/")
-async def process_file(request: Request, file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+async def process_file(request: Request, file: UploadFile = File(...), pages: str = Form(None)):
+    """
+    Extract text from an uploaded document, or transcribe audio/video.
+    - Input: the file, plus an optional 1-based page selection for PDFs (e.g. "1-10,15")
+    - Output: Extracted text
+    """
+    if not file.filename.endswith(TEXT_EXTENSIONS + AUDIO_EXTENSIONS + VIDEO_EXTENSIONS):
+        return {"error": "Unsupported file format."}
 
+    # The spooled upload is handed straight to the extractors, never written to a fixed path
+    upload = await read_upload(file)
     try:
-        if file.filename.endswith((".pdf", ".docx", ".txt")):
-            result = load_text(file_path)
-        elif file.filename.endswith((".mp3", ".wav", ".m4a")):
-            result = transcribe_audio(file_path)
-        elif file.filename.endswith((".mp4", ".mkv", ".avi")):
-            result = convert_video_to_text(file_path)
-        else:
-            return {"error": "Unsupported file format."}
+        result = await extract_upload(upload, file.filename, pages)
     finally:
-        os.remove(file_path)  # Clean up
+        upload.close()
 
     return {"request_id": request.state.request_id, "result": result}
 
 
+@app.post("/jobs/", status_code=202)
+async def submit_job(request: Request, file: UploadFile = File(...), pages: str = Form(None)):
+    """
+    Queue a file for background extraction/transcription.
+    - Input: same as /process-file/
+    - Output: Job ID to poll at /jobs/{job_id}
+    """
+    if not file.filename.endswith(TEXT_EXTENSIONS + AUDIO_EXTENSIONS + VIDEO_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format.")
+
+    # Refuse before the upload is spooled; submit() checks again
+    job_manager.check_capacity()
+    upload = await read_upload(file)
+    job = await job_manager.submit(
+        "process-file",
+        lambda report: extract_upload(upload, file.filename, pages, report),
+        cleanup=upload.close,
+    )
+    return {"request_id": request.state.request_id, "job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """
+    Status, progress and (once finished) result of a background job.
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return {"request_id": request.state.request_id, **job}
+
+
 
 @app.post("/translate/")
 async def translate(
@@ -95,16 +327,40 @@ async def translate(
     - Output: Translated text
     """
     try:
-        translated_text = translate_text(text, target_language)
+        translated_text = await io_pool.run(translate_text, text, target_language)
         return {
             "request_id": request.state.request_id,
             "translated_text": translated_text,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in translation: {str(e)}")
 
 
 
+@app.post("/translate-quiz/")
+async def translate_quiz_endpoint(input: QuizTranslationInput, request: Request):
+    """
+    Translate generated questions into the target language.
+    - Input: questions as returned by the /generate-* endpoints, and a target language code
+    - Output: The same questions with their text fields translated
+    Each question, option, answer and explanation is translated separately and
+    remembered, so repeated translations of the same quiz hit the cache.
+    """
+    try:
+        questions = await io_pool.run(translate_quiz, input.questions, input.target_language)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in translation: {str(e)}")
+    return {
+        "request_id": request.state.request_id,
+        "questions": questions,
+        "translation_memory": translation_memory.stats(),
+    }
+
+
 @app.get("/supported-languages/")
 async def supported_languages(request: Request):
     """
@@ -112,112 +368,154 @@ async def supported_languages(request: Request):
     - Output: Dictionary with language names and their codes
     """
     try:
-        languages = get_supported_languages()
+        languages = await io_pool.run(get_supported_languages)
         return {
             "request_id": request.state.request_id,
             "languages": languages,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching languages: {str(e)}")
 
 
+@app.get("/worker-stats/")
+async def worker_stats(request: Request):
+    """
+    Utilization and back-pressure counters of the extraction worker pools.
+    """
+    return {
+        "request_id": request.state.request_id,
+        # Each worker process has its own pools; this tells which one answered
+        "pid": os.getpid(),
+        "pools": pool_stats(),
+        "jobs": job_manager.stats(),
+    }
+
+
+@app.get("/cache-stats/")
+async def cache_stats(request: Request):
+    """
+    Hit/miss counters of the generation response cache and the extracted-text cache.
+    """
+    cache = get_cache()
+    extraction = get_extraction_cache()
+    # Tier sizes are counted in the SQLite or shared store, off the event loop
+    return {
+        "request_id": request.state.request_id,
+        "enabled": cache is not None,
+        "stats": await asyncio.to_thread(_cache_stats),
+        "extraction": {
+            "enabled": extraction is not None,
+            "stats": await asyncio.to_thread(_extraction_cache_stats),
+        },
+    }
+
+
+@app.get("/coalescing-stats/")
+async def coalescing_stats(request: Request):
+    """
+    How many identical in-flight generation calls were deduplicated.
+    """
+    singleflight = get_singleflight()
+    return {
+        "request_id": request.state.request_id,
+        "enabled": singleflight is not None,
+        "stats": singleflight.stats() if singleflight is not None else {},
+    }
+
+
+@app.get("/topup-stats/")
+async def topup_stats_endpoint(request: Request):
+    """
+    How often generations came back short and how many follow-up requests filled them.
+    """
+    return {
+        "request_id": request.state.request_id,
+        "stats": dict(topup_stats, llm_retries=get_client().retries),
+        "dedup": dict(dedup_stats, history=question_history.stats()),
+    }
+
+
+@app.get("/bank-stats/")
+async def bank_stats_endpoint(request: Request):
+    """
+    Questions stored in the question bank, and how many requests were filled from it.
+    """
+    return {
+        "request_id": request.state.request_id,
+        "enabled": QUESTION_BANK_ENABLED,
+        "stats": bank_stats,
+        "bank": await bank_snapshot(),
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus metrics: request and per-stage latency histograms, in-flight
+    counts, and the cache, coalescing, pool and upstream counters.
+    """
+    # Cache sizes may come from the SQLite or shared store, which can block
+    body, content_type = await asyncio.to_thread(metrics.render)
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/upstream-stats/")
+async def upstream_stats(request: Request):
+    """
+    Rate limiter and circuit breaker state of the LLM and translation APIs.
+    """
+    return {
+        "request_id": request.state.request_id,
+        "llm": dict(llm_upstream.stats(), backend=get_backend().name),
+        "translation": translation_upstream.stats(),
+        "shared_state": _shared_state_stats(),
+    }
+
+
+async def repeat_filter(input, syllabus, kind):
+    """History of questions served for this syllabus (by any worker), when the request asks to avoid repeats."""
+    return await question_history.aindex_for(syllabus, kind) if input.avoid_repeats else None
+
+
 @app.post("/generate-mcq/")
 async def generate_mcq_endpoint(input: MCQInput, request: Request):
-    # Generate the MCQ response
-    mcq_response = generate_mcq(input.syllabus, input.num_questions, input.difficulty)
-
-    # Split the response into individual questions
-    mcq_items = mcq_response.split("\n\n")
-
-    mcq_with_ids = []
-    for question in mcq_items:
-        parts = question.split("\n")
-        
-        # Ensure we have at least 6 parts (question, options, answer, explanation)
-        if len(parts) < 6:
-            continue  # Skip this question if it doesn't have enough parts
-
-        question_text = parts[0]  # First line is the question text
-        options = "\n".join(parts[1:5])  # Next 4 lines are options
-        answer_and_explanation = parts[5]  # Last line has the answer and explanation
-        
-        # Split answer and explanation
-        if "Answer:" in answer_and_explanation and "- Explanation:" in answer_and_explanation:
-            answer, explanation = answer_and_explanation.split(" - Explanation: ")
-            answer = answer.split(":")[1].strip()  # Extract the correct option (e.g., A)
-            explanation = explanation.strip()  # Clean the explanation
-        else:
-            continue  # Skip if the format is not as expected
-
-        # Add the MCQ with unique ID
-        mcq_with_ids.append({
-            "id": str(uuid.uuid4()),
-            "question": question_text,
-            "options": options,
-            "answer": answer,
-            "explanation": explanation
-        })
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    # Generate and parse the MCQs, each with a unique ID (chunk by chunk for
+    # large syllabi); questions that fail to parse or repeat another are
+    # replaced by small follow-up requests
+    mcq_with_ids = await generate_questions(
+        generate_mcq, parse_mcq, "mcq", syllabus, input.num_questions, input.difficulty,
+        history_index=await repeat_filter(input, syllabus, "mcq"), from_bank=input.from_bank,
+    )
 
     # Return the MCQ response with unique IDs
-    return {"request_id": request.state.request_id, "mcq": mcq_with_ids}
+    return {"request_id": request.state.request_id, "mcq": mcq_with_ids, "prompt_stats": prompt_stats}
 
 @app.post("/generate-fill-in-the-blanks/")
 async def generate_fill_in_blanks_endpoint(input: MCQInput, request: Request):
-    # Generate the questions using the refined prompt
-    blanks = generate_fill_in_the_blanks(
-        input.syllabus, input.num_questions, input.difficulty
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    # Generate the questions using the refined prompt, topping up any that fail to parse
+    blanks_with_details = await generate_questions(
+        generate_fill_in_the_blanks, parse_fill_in_the_blanks, "fill_in_the_blanks",
+        syllabus, input.num_questions, input.difficulty,
+        history_index=await repeat_filter(input, syllabus, "fill_in_the_blanks"), from_bank=input.from_bank,
     )
-    
-    # Log the raw output for debugging purposes
-    print("Raw Output from Generator:\n", blanks)
-    
-    blanks_with_details = []
-    
-    # Ensure there is content to process
-    if not blanks.strip():
-        return {
-            "request_id": request.state.request_id,
-            "fill_in_the_blanks": [],
-            "error": "No questions were generated. Please retry with a clearer syllabus or adjusted difficulty."
-        }
-    
-    # Split the output into individual questions
-    question_blocks = blanks.strip().split("\n\n")
-    
-    # Process each block
-    for idx, question_block in enumerate(question_blocks):
-        try:
-            # Split the question into its components
-            lines = question_block.strip().split("\n")
-            
-            # If there are 3 parts (question, answer, explanation), process them
-            if len(lines) == 3:
-                question_text = lines[0].replace("Fill in the blank:", "").strip()
-                answer = lines[1].replace("Answer:", "").strip()
-                explanation = lines[2].replace("Explanation:", "").strip()
-
-                blanks_with_details.append({
-                    "id": str(uuid.uuid4()),
-                    "question": question_text,
-                    "answer": answer,
-                    "explanation": explanation,
-                })
-            else:
-                print(f"Unexpected format for question block {idx + 1}: {question_block}")
-        except Exception as e:
-            print(f"Error processing question block {idx + 1}: {question_block} - {e}")
-    
+
     # Return error if no valid questions were found
     if not blanks_with_details:
         return {
             "request_id": request.state.request_id,
+            "prompt_stats": prompt_stats,
             "fill_in_the_blanks": [],
-            "error": "Generated questions were improperly formatted. Please retry."
+            "error": "No questions were generated. Please retry with a clearer syllabus or adjusted difficulty."
         }
 
     # Return valid questions
     return {
         "request_id": request.state.request_id,
+        "prompt_stats": prompt_stats,
         "fill_in_the_blanks": blanks_with_details,
     }
 
@@ -225,53 +523,106 @@ async def generate_fill_in_blanks_endpoint(input: MCQInput, request: Request):
 
 @app.post("/generate-true-false/")
 async def generate_true_false_endpoint(input: MCQInput, request: Request):
-    tf_questions = generate_true_false(
-        input.syllabus, input.num_questions, input.difficulty
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    tf_questions_with_details = await generate_questions(
+        generate_true_false, parse_true_false, "true_false",
+        syllabus, input.num_questions, input.difficulty,
+        history_index=await repeat_filter(input, syllabus, "true_false"), from_bank=input.from_bank,
     )
 
-    tf_questions_with_details = []
-    if not tf_questions.strip():
-        return {
-            "request_id": request.state.request_id,
-            "true_false_questions": [],
-            "error": "No questions were generated. Please check the syllabus and retry.",
-        }
-
-    for question_block in tf_questions.split("\n\n"):
-        lines = question_block.split("\n")
-        if len(lines) == 3:
-            question_line = lines[0].strip()
-            answer_line = lines[1].strip()
-            explanation_line = lines[2].strip()
-
-            if question_line.startswith("Q") and "?" in question_line:
-                question_text = question_line.split(". ", 1)[1].strip()
-                correct_answer = answer_line.replace("Answer:", "").strip()
-                explanation_text = explanation_line.replace("Explanation:", "").strip()
-
-                tf_questions_with_details.append({
-                    "id": str(uuid.uuid4()),
-                    "question": question_text,
-                    "answer": correct_answer,
-                    "explanation": explanation_text,
-                })
-
     if not tf_questions_with_details:
         return {
             "request_id": request.state.request_id,
+            "prompt_stats": prompt_stats,
             "true_false_questions": [],
-            "error": "Generated questions were improperly formatted. Please retry.",
+            "error": "No questions were generated. Please check the syllabus and retry.",
         }
 
     return {
         "request_id": request.state.request_id,
+        "prompt_stats": prompt_stats,
         "true_false_questions": tf_questions_with_details,
     }
 
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_questions(chunks, kind, prompt_stats=None, history_index=None, store=None):
+    """
+    Turn a streamed completion into Server-Sent Events, emitting one
+    "question" event per question as soon as it is complete. Questions that
+    repeat an earlier one of the same stream, or one in `history_index`, are
+    skipped. `store(items)` is called with the streamed questions once the
+    stream completes.
+    """
+    parser = StreamingQuestionParser(kind)
+    deduplicator = Deduplicator(history_index)
+    streamed = []
+    try:
+        async for chunk in chunks:
+            for item in parser.feed(chunk):
+                if deduplicator.accept(item):
+                    streamed.append(item)
+                    yield sse_event("question", item)
+        for item in parser.finish():
+            if deduplicator.accept(item):
+                streamed.append(item)
+                yield sse_event("question", item)
+    except HTTPException as e:
+        # Headers are already sent, so upstream failures are reported in-band
+        yield sse_event("error", {"status": e.status_code, "detail": e.detail})
+        return
+    deduplicator.commit()
+    if store is not None:
+        await store(streamed)
+    yield sse_event("done", {"count": len(streamed), "prompt_stats": prompt_stats})
+
+
+@app.post("/generate-mcq/stream")
+async def stream_mcq_endpoint(input: MCQInput):
+    """
+    Stream MCQs over Server-Sent Events as the model produces them.
+    """
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    chunks = stream_mcq(syllabus, input.num_questions, input.difficulty)
+    history_index = await repeat_filter(input, syllabus, "mcq")
+    store = functools.partial(store_questions, syllabus, "mcq", input.difficulty)
+    return StreamingResponse(stream_questions(chunks, "mcq", prompt_stats, history_index, store),
+                             media_type="text/event-stream")
+
+
+@app.post("/generate-fill-in-the-blanks/stream")
+async def stream_fill_in_blanks_endpoint(input: MCQInput):
+    """
+    Stream fill-in-the-blank questions over Server-Sent Events.
+    """
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    chunks = stream_fill_in_the_blanks(syllabus, input.num_questions, input.difficulty)
+    history_index = await repeat_filter(input, syllabus, "fill_in_the_blanks")
+    store = functools.partial(store_questions, syllabus, "fill_in_the_blanks", input.difficulty)
+    return StreamingResponse(stream_questions(chunks, "fill_in_the_blanks", prompt_stats, history_index, store),
+                             media_type="text/event-stream")
+
+
+@app.post("/generate-true-false/stream")
+async def stream_true_false_endpoint(input: MCQInput):
+    """
+    Stream true/false questions over Server-Sent Events.
+    """
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    chunks = stream_true_false(syllabus, input.num_questions, input.difficulty)
+    history_index = await repeat_filter(input, syllabus, "true_false")
+    store = functools.partial(store_questions, syllabus, "true_false", input.difficulty)
+    return StreamingResponse(stream_questions(chunks, "true_false", prompt_stats, history_index, store),
+                             media_type="text/event-stream")
+
 @app.post("/generate-matching-questions/")
 async def generate_matching_questions_endpoint(input: MCQInput, request: Request):
-    column1, column2, answers = generate_matching_questions(
-        input.syllabus, input.num_questions, input.difficulty
+    syllabus, prompt_stats = prepare_syllabus(input.syllabus)
+    column1, column2, answers = await generate_matching_questions(
+        syllabus, input.num_questions, input.difficulty
     )
 
     # Create a unique question ID
@@ -279,6 +630,7 @@ async def generate_matching_questions_endpoint(input: MCQInput, request: Request
 
     return {
         "request_id": request.state.request_id,
+        "prompt_stats": prompt_stats,
         "questions": [
             {
                 "question_id": question_id,
@@ -290,6 +642,40 @@ async def generate_matching_questions_endpoint(input: MCQInput, request: Request
     }
 
 
+@app.post("/generate-quiz/")
+async def generate_quiz_endpoint(input: QuizInput, request: Request):
+    """
+    Generate a mixed quiz (MCQ, true/false, fill-in-the-blank and matching
+    sets) in one request. The sections are generated concurrently from one
+    prepared syllabus, so the request takes about as long as its slowest section.
+    """
+    counts = {
+        "mcq": input.mcq,
+        "true_false": input.true_false,
+        "fill_in_the_blanks": input.fill_in_the_blanks,
+    }
+    if not any(counts.values()) and not input.matching_sets:
+        raise HTTPException(status_code=400, detail="Request at least one question.")
+
+    start = time.perf_counter()
+    sections, timings, errors, prompt_stats = await generate_quiz(
+        input.syllabus, input.difficulty, counts,
+        matching_sets=input.matching_sets, matching_pairs=input.matching_pairs,
+        avoid_repeats=input.avoid_repeats, from_bank=input.from_bank,
+    )
+    timings["total"] = round(time.perf_counter() - start, 3)
+
+    response = {
+        "request_id": request.state.request_id,
+        "quiz": sections,
+        "timings": timings,
+        "prompt_stats": prompt_stats,
+    }
+    if errors:
+        response["errors"] = errors
+    return response
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import tempfile
+import wave
+
+
+# Speech recognizers want 16 kHz mono 16-bit PCM; ffmpeg produces it directly
+MEDIA_SAMPLE_RATE = int(os.getenv("MEDIA_SAMPLE_RATE", "16000"))
+# Decoded audio stays in memory up to this size, then spills to an anonymous temp file
+MEDIA_SPOOL_BYTES = int(os.getenv("MEDIA_SPOOL_BYTES", str(64 * 1024 * 1024)))
+_READ_BYTES = 256 * 1024
+
+
+def ffmpeg_binary():
+    """ffmpeg from FFMPEG_BINARY, the imageio-ffmpeg bundle, or the PATH, in that order."""
+    binary = os.getenv("FFMPEG_BINARY")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return "ffmpeg"
+
+
+def extract_audio_wav(media_path, sample_rate=MEDIA_SAMPLE_RATE):
+    """
+    Decode only the audio track of a video (or audio) file with ffmpeg and
+    return it as mono 16-bit PCM WAV in a spooled file positioned at the start.
+    ffmpeg skips the video stream entirely and its PCM output is written
+    straight into the WAV as it arrives, with no intermediate files.
+    Raises ValueError if ffmpeg cannot decode the input.
+    """
+    command = [
+        ffmpeg_binary(), "-nostdin", "-v", "error",
+        "-i", media_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-",
+    ]
+    output = tempfile.SpooledTemporaryFile(max_size=MEDIA_SPOOL_BYTES)
+    try:
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+            with wave.open(output, "wb") as writer:
+                writer.setnchannels(1)
+                writer.setsampwidth(2)
+                writer.setframerate(sample_rate)
+                while True:
+                    chunk = process.stdout.read(_READ_BYTES)
+                    if not chunk:
+                        break
+                    writer.writeframesraw(chunk)
+            errors = process.stderr.read().decode("utf-8", "replace").strip()
+        if process.returncode != 0:
+            raise ValueError(f"ffmpeg could not extract audio: {errors or process.returncode}")
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def extract_audio_to_file(media_path, output_path, sample_rate=MEDIA_SAMPLE_RATE):
+    """Write the audio track of `media_path` to `output_path` as mono PCM WAV."""
+    command = [
+        ffmpeg_binary(), "-nostdin", "-v", "error", "-y",
+        "-i", media_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-acodec", "pcm_s16le", output_path,
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg could not extract audio: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return output_path
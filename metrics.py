@@ -0,0 +1,110 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+# Upstream LLM calls and video transcription run far past the default 10 s bucket
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, float("inf"))
+
+REQUEST_SECONDS = Histogram(
+    "quen_gen_request_duration_seconds", "Time to produce a response, by route.",
+    ["method", "route", "status"], buckets=BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "quen_gen_stage_duration_seconds", "Time spent in each processing stage.",
+    ["stage"], buckets=BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge("quen_gen_requests_in_flight", "HTTP requests being handled.")
+
+# Spans recorded during the current request: a list of (stage, seconds).
+# Worker-pool threads run in a copy of the request's context, so their spans
+# land in the same list.
+_spans = ContextVar("spans", default=None)
+
+
+def start_request():
+    """Begin collecting spans for the current request; returns the list they go into."""
+    spans = []
+    _spans.set(spans)
+    return spans
+
+
+@contextmanager
+def span(stage):
+    """Time a block as `stage`: observed in the histogram and added to the request's spans."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def server_timing(spans, total=None):
+    """
+    Server-Timing header value for a request's spans. Stages that ran
+    several times (chunks, top-ups, translation batches) are summed, with the
+    count in the description.
+    """
+    totals = {}
+    for stage, elapsed in spans:
+        duration, count = totals.get(stage, (0.0, 0))
+        totals[stage] = (duration + elapsed, count + 1)
+    entries = []
+    for stage, (duration, count) in totals.items():
+        entry = f"{stage};dur={duration * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class StatsCollector:
+    """
+    Exposes the service's existing stats() dicts (caches, pools, upstreams)
+    at scrape time. Each source maps to a callable returning a possibly
+    nested dict of numbers; keys listed in `counters` are cumulative, the
+    rest are exported as gauges. Non-numeric values are skipped.
+    """
+
+    def __init__(self):
+        self._sources = {}
+
+    def add(self, name, stats, counters=()):
+        self._sources[name] = (stats, set(counters))
+
+    def collect(self):
+        for name, (stats, counters) in self._sources.items():
+            for key, value in _flatten(stats()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"quen_gen_{name}_{key}"
+                if key in counters:
+                    yield CounterMetricFamily(metric, f"{name} {key}", value=value)
+                else:
+                    yield GaugeMetricFamily(metric, f"{name} {key}", value=value)
+
+
+def _flatten(stats, prefix=""):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        else:
+            yield f"{prefix}{key}", value
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def render():
+    """Prometheus text exposition of every registered metric; returns (body, content type)."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,107 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Documents with fewer pages than this are extracted in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Separates pages in extracted text
+PAGE_BREAK = "\f"
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def _open(source):
+    # PyPDF2 is imported on first use so processes that never read a PDF skip it
+    from PyPDF2 import PdfReader
+
+    # Workers receive either a path or the raw bytes of the document
+    if isinstance(source, (bytes, bytearray)):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(source)
+
+
+def _extract_pages(source, page_numbers):
+    reader = _open(source)
+    return [reader.pages[number].extract_text() or "" for number in page_numbers]
+
+
+def parse_page_range(spec, page_count):
+    """
+    Turn a 1-based page selection such as "1-5,8,10-" into 0-based page numbers.
+    An empty spec selects every page.
+    """
+    if not spec:
+        return list(range(page_count))
+    selected = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, _, last = part.partition("-")
+            first = int(first) if first.strip() else 1
+            last = int(last) if last.strip() else page_count
+        else:
+            first = last = int(part)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part}")
+        selected.extend(range(first - 1, min(last, page_count)))
+    return selected
+
+
+def iter_pdf_pages(source, pages=None, workers=None):
+    """
+    Yield the text of each selected page, in order, extracting every page once.
+    `source` is a path, raw bytes or a binary file object; `pages` is a page
+    range string (see parse_page_range) or a list of 0-based page numbers.
+    Large documents are split into page batches that are extracted across a
+    process pool; pages are yielded as soon as their batch is done, so callers
+    can start on the first pages before the whole document is read.
+    """
+    if hasattr(source, "read"):
+        source = source.read()
+    reader = _open(source)
+    page_count = len(reader.pages)
+    if pages is None or isinstance(pages, str):
+        page_numbers = parse_page_range(pages, page_count)
+    else:
+        page_numbers = [number for number in pages if 0 <= number < page_count]
+
+    workers = PDF_WORKERS if workers is None else workers
+    if workers <= 1 or len(page_numbers) < PDF_PARALLEL_MIN_PAGES:
+        for number in page_numbers:
+            yield reader.pages[number].extract_text() or ""
+        return
+
+    # Small batches keep the first pages coming quickly; the pool keeps every core busy
+    batch_size = max(4, -(-len(page_numbers) // (workers * 4)))
+    batches = [page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)]
+    executor = _get_executor()
+    futures = [executor.submit(_extract_pages, source, batch) for batch in batches]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_text_from_pdf(source, pages=None, workers=None):
+    # Pages are separated by form feeds so prompt_budget.clean_syllabus can find their headers and footers
+    return PAGE_BREAK.join(text for text in iter_pdf_pages(source, pages, workers) if text)
@@ -0,0 +1,175 @@
+import os
+import re
+from collections import Counter
+
+from chunking import estimate_tokens
+from metrics import span
+
+
+# Syllabi still above this many estimated tokens after cleaning are condensed
+# to it by extractive sentence selection; 0 disables condensation
+SYLLABUS_MAX_TOKENS = int(os.getenv("SYLLABUS_MAX_TOKENS", "24000"))
+# Short lines at the top or bottom of at least this many pages are treated as
+# running headers/footers
+BOILERPLATE_MIN_REPEATS = int(os.getenv("BOILERPLATE_MIN_REPEATS", "3"))
+
+_PAGE_NUMBER = re.compile(r"^(?:page\s*)?[-–—\s]*\d+(?:\s*(?:of|/)\s*\d+)?[-–—\s]*$", re.IGNORECASE)
+_HYPHENATED_BREAK = re.compile(r"(\w)-\n(\w)")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with"
+    .split()
+)
+
+
+def _line_shape(line):
+    # Running headers often differ only in their page number
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _page_noise(lines, boilerplate):
+    # Peel page numbers and running headers/footers off both ends of one page
+    filled = [index for index, line in enumerate(lines) if line]
+    dropped = set()
+    for end in (filled, filled[::-1]):
+        for position, index in enumerate(end):
+            line = lines[index]
+            if index in dropped or not (
+                (position == 0 and _PAGE_NUMBER.match(line)) or _line_shape(line) in boilerplate
+            ):
+                break
+            dropped.add(index)
+    return dropped
+
+
+def clean_syllabus(text):
+    """
+    Remove whitespace and layout noise left by PDF/DOCX extraction: words
+    hyphenated across line breaks, runs of spaces and blank lines. Text with
+    page breaks (form feeds, as extract_text_from_pdf emits) also loses the
+    page numbers, running headers and footers at the top and bottom of its
+    pages. Content is otherwise left untouched.
+    """
+    text = _HYPHENATED_BREAK.sub(r"\1\2", text.replace("\r\n", "\n").replace("\r", "\n"))
+    pages = [[" ".join(line.split()) for line in page.split("\n")] for page in text.split("\f")]
+
+    noise = [set() for _ in pages]
+    if len(pages) > 1:
+        # Only the first and last line of a page are header/footer candidates;
+        # each page counts once, however often the line appears on it
+        shapes = Counter()
+        for lines in pages:
+            filled = [line for line in lines if line]
+            shapes.update({_line_shape(line) for line in filled[:1] + filled[-1:] if len(line) <= 80})
+        boilerplate = {
+            shape for shape, count in shapes.items()
+            if count >= BOILERPLATE_MIN_REPEATS and not shape.endswith((".", "?", "!", ":"))
+        }
+        noise = [_page_noise(lines, boilerplate) for lines in pages]
+
+    kept = []
+    for lines, dropped in zip(pages, noise):
+        for index, line in enumerate(lines):
+            if index in dropped:
+                continue
+            if line or (kept and kept[-1]):
+                kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _sentences(text):
+    # (paragraph index, sentence) pairs, so the selection can keep paragraph breaks
+    for index, paragraph in enumerate(re.split(r"\n\s*\n", text)):
+        for sentence in _SENTENCE_END.split(" ".join(paragraph.split())):
+            if sentence:
+                yield index, sentence
+
+
+def rank_sentences(sentences):
+    """
+    Score sentences by TF-IDF cosine similarity to the whole document, so
+    sentences about its main topics rank highest. Returns a NumPy array of
+    scores aligned with `sentences`.
+    """
+    # NumPy is only needed once a syllabus is over budget, so it loads on first use
+    import numpy as np
+
+    vocabulary = {}
+    rows, columns = [], []
+    for row, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            if word not in _STOPWORDS:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)))
+    if not rows:
+        return np.zeros(len(sentences))
+
+    # Collapse repeated (sentence, term) pairs into term frequencies
+    pairs = np.unique(np.array(rows, dtype=np.int64) * len(vocabulary) + np.array(columns), return_counts=True)
+    rows, columns = np.divmod(pairs[0], len(vocabulary))
+    tf = pairs[1].astype(float)
+
+    df = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1.0
+    weights = tf * idf[columns]
+    centroid = np.bincount(columns, weights=weights, minlength=len(vocabulary))
+
+    dot = np.bincount(rows, weights=weights * centroid[columns], minlength=len(sentences))
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(sentences)))
+    norms[norms == 0] = 1.0
+    return dot / (norms * np.linalg.norm(centroid))
+
+
+def condense(text, max_tokens):
+    """
+    Extractive summary of `text` within `max_tokens` estimated tokens: the
+    highest-ranked distinct sentences are kept, in their original order and
+    paragraphs.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    import numpy as np
+
+    sentences = list(_sentences(text))
+    scores = rank_sentences([sentence for _, sentence in sentences])
+
+    chosen = []
+    seen = set()
+    budget = max_tokens
+    for index in np.argsort(-scores, kind="stable"):
+        sentence = sentences[index][1]
+        key = " ".join(_WORD.findall(sentence.lower()))
+        cost = estimate_tokens(sentence)
+        # Repeated sentences add tokens but no content
+        if key not in seen and cost <= budget:
+            seen.add(key)
+            chosen.append(index)
+            budget -= cost
+
+    paragraphs = {}
+    for index in sorted(chosen):
+        paragraph, sentence = sentences[index]
+        paragraphs.setdefault(paragraph, []).append(sentence)
+    return "\n\n".join(" ".join(parts) for parts in paragraphs.values())
+
+
+def prepare_syllabus(syllabus, max_tokens=SYLLABUS_MAX_TOKENS):
+    """
+    Clean the syllabus and, if it is still over budget, condense it.
+    Returns (text, stats) where stats reports the estimated tokens before and
+    after and the tokens saved, for the response metadata.
+    """
+    original_tokens = estimate_tokens(syllabus)
+    with span("prompt_build"):
+        text = clean_syllabus(syllabus)
+        condensed = bool(max_tokens) and estimate_tokens(text) > max_tokens
+        if condensed:
+            text = condense(text, max_tokens)
+    syllabus_tokens = estimate_tokens(text)
+    return text, {
+        "original_tokens": original_tokens,
+        "syllabus_tokens": syllabus_tokens,
+        "tokens_saved": original_tokens - syllabus_tokens,
+        "condensed": condensed,
+    }
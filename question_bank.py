@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from chunking import generate_chunked, needs_chunking
+from dedup import item_text
+from metrics import span
+from topup import generate_with_topup
+
+
+# Off unless asked for, so the service writes nothing to its working directory by default
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "0") == "1"
+QUESTION_BANK_DB = os.getenv("QUESTION_BANK_DB", "question_bank.db")
+# Seconds a call waits for another process's write lock before failing
+QUESTION_BANK_TIMEOUT = float(os.getenv("QUESTION_BANK_TIMEOUT", "1"))
+
+logger = logging.getLogger(__name__)
+
+# Counters for the stats endpoint
+stats = {"requests": 0, "filled": 0, "served": 0, "generated": 0, "stored": 0, "errors": 0}
+
+
+def syllabus_hash(syllabus):
+    return hashlib.sha256(syllabus.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    """
+    Every parsed question, keyed by the hash of the (prepared) syllabus, the
+    question type and the difficulty. Identical question texts are stored
+    once. `take` returns the least served questions first, so repeated
+    requests for one syllabus rotate through the bank.
+    """
+
+    def __init__(self, path=QUESTION_BANK_DB, timeout=QUESTION_BANK_TIMEOUT):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id TEXT PRIMARY KEY, syllabus_hash TEXT NOT NULL, kind TEXT NOT NULL,"
+            " difficulty TEXT NOT NULL, question TEXT NOT NULL, item TEXT NOT NULL,"
+            " served INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_served REAL)"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS questions_text"
+            " ON questions(syllabus_hash, kind, difficulty, question)"
+        )
+        # Matches the WHERE and ORDER BY of `take`, so a lookup reads only the rows it returns
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS questions_lookup"
+            " ON questions(syllabus_hash, kind, difficulty, served, created_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(syllabus, kind, difficulty):
+        return syllabus_hash(syllabus), kind, difficulty.strip().lower()
+
+    def add(self, syllabus, kind, difficulty, items):
+        """Store parsed items; returns how many were new."""
+        key = self._key(syllabus, kind, difficulty)
+        now = time.time()
+        rows = [(item["id"], *key, item_text(item), json.dumps(item), now) for item in items if item.get("id")]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO questions (id, syllabus_hash, kind, difficulty, question, item, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def take(self, syllabus, kind, difficulty, count, history_index=None):
+        """
+        Up to `count` stored items, least served first, skipping any that
+        repeat a question in `history_index`. The returned items are counted
+        as served.
+        """
+        if count <= 0:
+            return []
+        items, ids = [], []
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, item FROM questions WHERE syllabus_hash = ? AND kind = ? AND difficulty = ?"
+                " ORDER BY served, created_at",
+                self._key(syllabus, kind, difficulty),
+            )
+            for item_id, item in cursor:
+                item = json.loads(item)
+                if history_index is not None and history_index.query(item_text(item)) is not None:
+                    continue
+                items.append(item)
+                ids.append((now, item_id))
+                if len(items) == count:
+                    break
+            cursor.close()
+            if ids:
+                self._conn.executemany(
+                    "UPDATE questions SET served = served + 1, last_served = ? WHERE id = ?", ids
+                )
+                self._conn.commit()
+        return items
+
+    def count(self, syllabus, kind, difficulty):
+        with self._lock:
+            (total,) = self._conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE syllabus_hash = ? AND kind = ? AND difficulty = ?",
+                self._key(syllabus, kind, difficulty),
+            ).fetchone()
+        return total
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM questions GROUP BY kind").fetchall()
+        return {"questions": dict(rows)}
+
+
+_bank = None
+
+
+def get_question_bank():
+    """Return the process-wide question bank, or None when disabled."""
+    global _bank
+    if not QUESTION_BANK_ENABLED:
+        return None
+    if _bank is None:
+        _bank = QuestionBank()
+    return _bank
+
+
+def _add(syllabus, kind, difficulty, items):
+    return get_question_bank().add(syllabus, kind, difficulty, items)
+
+
+def _take(syllabus, kind, difficulty, count, history_index):
+    return get_question_bank().take(syllabus, kind, difficulty, count, history_index)
+
+
+async def store_questions(syllabus, kind, difficulty, items):
+    """
+    Add freshly generated items to the bank (when enabled). Best effort: the
+    questions are already generated, so a bank failure is logged, not raised.
+    """
+    if not QUESTION_BANK_ENABLED or not items:
+        return
+    try:
+        stats["stored"] += await asyncio.to_thread(_add, syllabus, kind, difficulty, items)
+    except sqlite3.Error as e:
+        stats["errors"] += 1
+        logger.warning("Could not store %d %s questions in the question bank: %s", len(items), kind, e)
+
+
+async def bank_snapshot():
+    """bank.stats() read on a thread, or {} when the bank is disabled or unreadable."""
+    if not QUESTION_BANK_ENABLED:
+        return {}
+    try:
+        return await asyncio.to_thread(lambda: get_question_bank().stats())
+    except sqlite3.Error as e:
+        stats["errors"] += 1
+        logger.warning("Could not read the question bank: %s", e)
+        return {}
+
+
+async def generate_questions(generate, parse, kind, syllabus, num_questions, difficulty,
+                             history_index=None, from_bank=False, chunks=None):
+    """
+    Questions of one type for a prepared syllabus. With `from_bank`, stored
+    questions are served first and only the shortfall is generated (top-ups,
+    or chunk by chunk for long syllabi; `chunks` may be passed pre-split).
+    Newly generated questions are added to the bank. The bank is read and
+    written on a thread; if it fails, everything is generated.
+    """
+    banked = []
+    if from_bank and QUESTION_BANK_ENABLED:
+        stats["requests"] += 1
+        with span("question_bank"):
+            try:
+                banked = await asyncio.to_thread(_take, syllabus, kind, difficulty, num_questions, history_index)
+            except sqlite3.Error as e:
+                stats["errors"] += 1
+                logger.warning("Could not read the question bank, generating instead: %s", e)
+        stats["served"] += len(banked)
+        if len(banked) >= num_questions:
+            stats["filled"] += 1
+
+    if chunks is not None or needs_chunking(syllabus):
+        items = await generate_chunked(
+            generate, parse, syllabus, num_questions, difficulty,
+            chunks=chunks, history_index=history_index, initial=banked,
+        )
+    else:
+        items = await generate_with_topup(
+            generate, parse, syllabus, num_questions, difficulty, history_index=history_index, initial=banked,
+        )
+
+    served = {item["id"] for item in banked}
+    generated = [item for item in items if item["id"] not in served]
+    stats["generated"] += len(generated)
+    await store_questions(syllabus, kind, difficulty, generated)
+    return items
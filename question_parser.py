@@ -0,0 +1,357 @@
+import json
+import re
+import uuid
+from typing import List
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+# One parser for every question type. Completions are read as JSON when the
+# model followed the structured-output prompt, and otherwise through a tolerant
+# line-based reader of the legacy text format ("Q1. ...", "A. ...",
+# "Answer: ...", "Explanation: ...", "Term | Match").
+
+QUESTION_KINDS = ("mcq", "fill_in_the_blanks", "true_false", "matching")
+
+
+class MCQItem(BaseModel):
+    question: str = Field(min_length=1)
+    options: List[str] = Field(min_length=2, max_length=6)
+    answer: str = Field(min_length=1, description="Letter of the correct option, e.g. \"A\"")
+    explanation: str = ""
+
+
+class FillInTheBlankItem(BaseModel):
+    question: str = Field(min_length=1, description="Sentence containing a blank written as __________")
+    answer: str = Field(min_length=1)
+    explanation: str = ""
+
+
+class TrueFalseItem(BaseModel):
+    question: str = Field(min_length=1)
+    answer: str = Field(pattern="^(True|False)$")
+    explanation: str = ""
+
+
+class MatchingPair(BaseModel):
+    term: str = Field(min_length=1)
+    match: str = Field(min_length=1)
+
+
+ITEM_MODELS = {
+    "mcq": MCQItem,
+    "fill_in_the_blanks": FillInTheBlankItem,
+    "true_false": TrueFalseItem,
+    "matching": MatchingPair,
+}
+
+JSON_EXAMPLES = {
+    "mcq": [{
+        "question": "What is the population of Dubai as of 2024?",
+        "options": ["3.79 million", "3.295 million", "4.1 million", "5 million"],
+        "answer": "A",
+        "explanation": "The population of Dubai as of 2024 is approximately 3.79 million.",
+    }],
+    "fill_in_the_blanks": [{
+        "question": "The capital of France is __________.",
+        "answer": "Paris",
+        "explanation": "Paris has been the capital of France since the 10th century.",
+    }],
+    "true_false": [{
+        "question": "A cricket team consists of 15 players?",
+        "answer": "False",
+        "explanation": "A cricket team consists of 11 players, not 15.",
+    }],
+    "matching": [{"term": "Photosynthesis", "match": "Converts light energy into chemical energy"}],
+}
+
+
+def json_instructions(kind):
+    """Prompt text asking for a JSON array of items of the given kind."""
+    schema = {"type": "array", "items": ITEM_MODELS[kind].model_json_schema()}
+    return (
+        "Respond with JSON only: an array of objects matching this JSON schema, "
+        "with no text before or after it.\n"
+        f"Schema: {json.dumps(schema)}\n"
+        f"Example: {json.dumps(JSON_EXAMPLES[kind])}"
+    )
+
+
+_NUMBERING = re.compile(r"^(?:Q(?:uestion)?\s*)?\d+\s*[.):]\s*", re.IGNORECASE)
+_OPTION = re.compile(r"^\(?([A-Fa-f])[.)]\s+(.*)$")
+_ANSWER = re.compile(r"^(?:Correct\s+)?Answer\s*:\s*(.*)$", re.IGNORECASE)
+_EXPLANATION = re.compile(r"^Explanation\s*:\s*(.*)$", re.IGNORECASE)
+_FILL_PREFIX = re.compile(r"^Fill in the blank\s*:\s*", re.IGNORECASE)
+_OPTION_LABEL = re.compile(r"^\(?[A-Fa-f][.)]\s+")
+
+
+def _clean_line(line):
+    # Drop markdown emphasis/headings the model sometimes adds
+    return line.replace("**", "").strip().lstrip("#").strip()
+
+
+def _clean_question(text):
+    text = _NUMBERING.sub("", text, count=1)
+    text = _FILL_PREFIX.sub("", text, count=1)
+    return text.strip().strip('"').strip()
+
+
+class _LegacyRecordReader:
+    """
+    Line-by-line reader for the legacy text format. A question starts at a
+    numbered line ("Q1.", "2)"), a "Fill in the blank:" line, a "Term | Match"
+    line, or any untagged line after the previous question's answer; option,
+    answer and explanation lines attach to the current question. Blank lines
+    are not required between questions.
+    """
+
+    def __init__(self):
+        self._current = None
+
+    def line(self, raw):
+        """Consume one line; return a finished record if this line completed one."""
+        line = _clean_line(raw)
+        current = self._current
+        if not line:
+            if current is not None and current["answer"] is not None and current["explanation"] is not None:
+                return self.close()
+            return None
+
+        answer = _ANSWER.match(line)
+        if answer and current is not None:
+            text, _, explanation = answer.group(1).partition(" - Explanation:")
+            current["answer"] = text.strip()
+            if explanation:
+                current["explanation"] = explanation.strip()
+            return None
+
+        explanation = _EXPLANATION.match(line)
+        if explanation and current is not None:
+            current["explanation"] = explanation.group(1).strip()
+            return None
+
+        option = _OPTION.match(line)
+        if option and current is not None and current["answer"] is None:
+            current["options"].append(option.group(2).strip())
+            return None
+
+        starts_question = bool(_NUMBERING.match(line) or _FILL_PREFIX.match(line)) or "|" in line
+        if current is None or current["answer"] is not None or starts_question:
+            finished = self.close()
+            self._current = {"question": line, "options": [], "answer": None, "explanation": None, "pair": None}
+            if "|" in line:
+                term, _, match = line.partition("|")
+                self._current["pair"] = (_clean_question(term), match.strip())
+            return finished
+
+        # A question spread over several lines
+        if not current["options"]:
+            current["question"] += " " + line
+        return None
+
+    def close(self):
+        finished, self._current = self._current, None
+        return finished
+
+
+def _record_to_fields(kind, record):
+    if kind == "matching":
+        if record["pair"] is None:
+            return None
+        term, match = record["pair"]
+        return {"term": term, "match": match}
+    fields = {
+        "question": _clean_question(record["question"]),
+        "answer": record["answer"] or "",
+        "explanation": record["explanation"] or "",
+    }
+    if kind == "mcq":
+        fields["options"] = record["options"]
+    return fields
+
+
+def _normalize(kind, fields):
+    if kind == "mcq":
+        options = [_OPTION_LABEL.sub("", str(option)).strip() for option in fields.get("options") or []]
+        answer = str(fields.get("answer", "")).strip()
+        label = re.match(r"^\(?([A-Fa-f])(?:[.)]|$|\s)", answer)
+        if label:
+            answer = label.group(1).upper()
+        elif answer in options:
+            answer = "ABCDEF"[options.index(answer)]
+        fields = dict(fields, options=options, answer=answer)
+    elif kind == "true_false":
+        answer = str(fields.get("answer", "")).strip().rstrip(".").lower()
+        if answer in ("true", "false"):
+            fields = dict(fields, answer=answer.capitalize())
+    return fields
+
+
+def build_item(kind, fields):
+    """Validate one parsed item and convert it to the API response shape, or return None."""
+    try:
+        item = ITEM_MODELS[kind].model_validate(_normalize(kind, fields))
+    except (ValidationError, TypeError):
+        return None
+    if kind == "matching":
+        return {"term": item.term, "match": item.match}
+    result = {"id": str(uuid.uuid4()), "question": item.question}
+    if kind == "mcq":
+        # Options keep their "A. ..." labels, one per line
+        result["options"] = "\n".join(f"{'ABCDEF'[i]}. {option}" for i, option in enumerate(item.options))
+    result["answer"] = item.answer
+    result["explanation"] = item.explanation
+    return result
+
+
+class _JsonObjectScanner:
+    """
+    Finds complete top-level JSON objects in text that may still be arriving,
+    e.g. the items of a streamed (or truncated) JSON array.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+        self._text = ""
+        self._position = 0
+
+    def feed(self, text):
+        self._text += text
+        objects = []
+        for index in range(self._position, len(self._text)):
+            char = self._text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = index
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads(self._text[self._start:index + 1]))
+                    except json.JSONDecodeError:
+                        pass
+        self._position = len(self._text)
+        # Drop consumed text so long streams are not rescanned
+        if self._depth == 0:
+            self._text, self._position = "", 0
+        return objects
+
+
+def _unwrap(objects):
+    # Accept {"questions": [...]}-style wrappers as well as bare items
+    for obj in objects:
+        nested = [value for value in obj.values() if isinstance(value, list) and value and isinstance(value[0], dict)]
+        if nested and not {"question", "term"} & obj.keys():
+            for value in nested:
+                yield from value
+        else:
+            yield obj
+
+
+def _looks_like_json(text):
+    stripped = text.lstrip()
+    return stripped[:1] in ("[", "{") or stripped.startswith("```")
+
+
+def parse_questions(kind, text):
+    """Parse a whole completion into response-shaped items, skipping malformed ones."""
+    if _looks_like_json(text) or "{" in text:
+        items = [build_item(kind, obj) for obj in _unwrap(_JsonObjectScanner().feed(text))]
+        items = [item for item in items if item is not None]
+        if items or _looks_like_json(text):
+            return items
+
+    reader = _LegacyRecordReader()
+    records = [reader.line(line) for line in text.splitlines()] + [reader.close()]
+    items = [build_item(kind, _record_to_fields(kind, record)) for record in records if record is not None]
+    return [item for item in items if item is not None]
+
+
+def parse_mcq(text):
+    return parse_questions("mcq", text)
+
+
+def parse_fill_in_the_blanks(text):
+    return parse_questions("fill_in_the_blanks", text)
+
+
+def parse_true_false(text):
+    return parse_questions("true_false", text)
+
+
+def parse_matching(text):
+    return parse_questions("matching", text)
+
+
+class StreamingQuestionParser:
+    """
+    Incremental version of parse_questions for streamed completions.
+    Text is fed in as it arrives and each question is returned as soon as it
+    is complete: when its JSON object closes, or, for the legacy format, when
+    the next question starts or a blank line follows its explanation.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._mode = None
+        self._received = []
+        self._emitted = 0
+        self._scanner = _JsonObjectScanner()
+        self._reader = _LegacyRecordReader()
+        self._partial_line = ""
+
+    def feed(self, text):
+        self._received.append(text)
+        if self._mode is None:
+            received = "".join(self._received)
+            if not received.strip():
+                return []
+            self._mode = "json" if _looks_like_json(received) else "text"
+            text = received
+        return self._items(text)
+
+    def _items(self, text):
+        if self._mode == "json":
+            fields = list(_unwrap(self._scanner.feed(text)))
+        else:
+            lines = (self._partial_line + text).split("\n")
+            self._partial_line = lines.pop()
+            records = [self._reader.line(line) for line in lines]
+            fields = [_record_to_fields(self.kind, record) for record in records if record is not None]
+        items = [build_item(self.kind, value) for value in fields if value is not None]
+        items = [item for item in items if item is not None]
+        self._emitted += len(items)
+        return items
+
+    def finish(self):
+        """Return whatever is left once the stream has ended."""
+        if self._mode == "text":
+            items = []
+            for record in (self._reader.line(self._partial_line), self._reader.close()):
+                if record is not None:
+                    item = build_item(self.kind, _record_to_fields(self.kind, record))
+                    if item is not None:
+                        items.append(item)
+            self._partial_line = ""
+            self._emitted += len(items)
+            if self._emitted:
+                return items
+        if self._emitted:
+            return []
+        # Nothing recognised incrementally (e.g. JSON after a preamble): parse the whole text
+        items = parse_questions(self.kind, "".join(self._received))
+        self._emitted += len(items)
+        return items
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import uuid
+
+from b import (
+    generate_fill_in_the_blanks,
+    generate_matching_pairs,
+    generate_mcq,
+    generate_true_false,
+    matching_columns,
+)
+from chunking import needs_chunking, split_into_chunks
+from dedup import history
+from prompt_budget import prepare_syllabus
+from question_bank import generate_questions
+from question_parser import parse_fill_in_the_blanks, parse_matching, parse_mcq, parse_true_false
+from topup import generate_with_topup
+
+
+# Question types a quiz can mix, with their generator and parser
+QUIZ_SECTIONS = {
+    "mcq": (generate_mcq, parse_mcq),
+    "true_false": (generate_true_false, parse_true_false),
+    "fill_in_the_blanks": (generate_fill_in_the_blanks, parse_fill_in_the_blanks),
+}
+
+
+def prepare_quiz_syllabus(syllabus):
+    """
+    Prepare the syllabus once for every section of a quiz: clean and budget it,
+    and split it into chunks if it is long enough to need them.
+    Returns (syllabus, chunks or None, prompt stats).
+    """
+    text, stats = prepare_syllabus(syllabus)
+    return text, (split_into_chunks(text) if needs_chunking(text) else None), stats
+
+
+async def _questions(kind, syllabus, chunks, count, difficulty, avoid_repeats=False, from_bank=False):
+    generate, parse = QUIZ_SECTIONS[kind]
+    history_index = await history.aindex_for(syllabus, kind) if avoid_repeats else None
+    return await generate_questions(
+        generate, parse, kind, syllabus, count, difficulty,
+        history_index=history_index, from_bank=from_bank, chunks=chunks,
+    )
+
+
+async def _matching(syllabus, sets, pairs_per_set, difficulty):
+    # One upstream request for all pairs, split into sets afterwards
+    pairs = await generate_with_topup(
+        generate_matching_pairs, parse_matching, syllabus, sets * pairs_per_set, difficulty
+    )
+    questions = []
+    for start in range(0, len(pairs), pairs_per_set):
+        column1, column2, answers = matching_columns(pairs[start:start + pairs_per_set])
+        questions.append({
+            "question_id": str(uuid.uuid4()),
+            "column1": column1,
+            "column2": column2,
+            "answers": answers,
+        })
+    return questions
+
+
+async def generate_quiz(syllabus, difficulty, counts, matching_sets=0, matching_pairs=5, avoid_repeats=False,
+                        from_bank=False):
+    """
+    Generate every requested section of a quiz concurrently from one prepared
+    syllabus. `counts` maps question type ("mcq", "true_false",
+    "fill_in_the_blanks") to the number of questions wanted.
+    Returns (sections, timings, errors, prompt stats): a section that fails is
+    reported in `errors` without discarding the others; timings are seconds
+    per section. With `avoid_repeats`, questions already served for this
+    syllabus are skipped (see dedup.history); with `from_bank`, sections are
+    filled from the question bank first.
+    """
+    syllabus, chunks, prompt_stats = prepare_quiz_syllabus(syllabus)
+    jobs = {
+        kind: _questions(kind, syllabus, chunks, count, difficulty, avoid_repeats, from_bank)
+        for kind, count in counts.items() if count > 0
+    }
+    if matching_sets > 0:
+        jobs["matching"] = _matching(syllabus, matching_sets, matching_pairs, difficulty)
+
+    async def timed(job):
+        start = time.perf_counter()
+        try:
+            return await job, None, time.perf_counter() - start
+        except Exception as e:
+            return None, getattr(e, "detail", str(e)), time.perf_counter() - start
+
+    results = await asyncio.gather(*(timed(job) for job in jobs.values()))
+    sections, timings, errors = {}, {}, {}
+    for kind, (result, error, elapsed) in zip(jobs, results):
+        sections[kind] = result if result is not None else []
+        timings[kind] = round(elapsed, 3)
+        if error is not None:
+            errors[kind] = error
+    return sections, timings, errors, prompt_stats
@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import requests
+from fastapi import HTTPException
+
+from shared_state import SharedStateError
+
+
+class UpstreamError(HTTPException):
+    """
+    An upstream API (LLM or translation) failed or is unavailable.
+    Raised instead of returning an error string, so endpoints answer with a
+    proper status: 429 when our own quota is exhausted, 503 while the circuit
+    is open, 502 when the upstream call itself failed.
+    """
+
+    def __init__(self, status_code, detail, retry_after=None):
+        headers = {"Retry-After": str(max(1, int(retry_after + 0.999)))} if retry_after is not None else None
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` requests per second on average with
+    bursts of up to `burst`. Callers reserve a token and wait until it is
+    due; a caller that would wait longer than `max_wait` is refused instead.
+    Thread-safe, with both async and blocking waits.
+    """
+
+    def __init__(self, rate, burst, max_wait):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_wait = max_wait
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.refused = 0
+
+    def _reserve(self, name):
+        # Returns how long to wait for the reserved token
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > self.max_wait:
+                self.refused += 1
+                raise UpstreamError(429, f"{name} rate limit reached; try again shortly.", retry_after=wait)
+            self._tokens -= 1
+            if wait:
+                self.throttled += 1
+            return wait
+
+    async def acquire(self, name="Upstream"):
+        wait = self._reserve(name)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, name="Upstream"):
+        wait = self._reserve(name)
+        if wait:
+            time.sleep(wait)
+
+    def stats(self):
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "throttled": self.throttled,
+            "refused": self.refused,
+        }
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state lives in the shared store, so every worker
+    process draws from one quota instead of each getting the full rate.
+    If the store cannot be reached the worker falls back to its own bucket.
+    Async reservations run on a thread, since the store may block.
+    """
+
+    def __init__(self, store, key, rate, burst, max_wait):
+        super().__init__(rate, burst, max_wait)
+        self.store = store
+        self.key = key
+        self.store_errors = 0
+
+    def _reserve(self, name):
+        if not self.rate:
+            return 0.0
+        try:
+            granted, wait = self.store.reserve(self.key, self.rate, self.burst, self.max_wait)
+        except SharedStateError:
+            self.store_errors += 1
+            return super()._reserve(name)
+        if not granted:
+            self.refused += 1
+            raise UpstreamError(429, f"{name} rate limit reached; try again shortly.", retry_after=wait)
+        if wait:
+            self.throttled += 1
+        return wait
+
+    async def acquire(self, name="Upstream"):
+        wait = await asyncio.to_thread(self._reserve, name)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        return dict(super().stats(), shared=self.store.name, store_errors=self.store_errors)
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream is down. After `failure_threshold`
+    consecutive failures the circuit opens and calls are refused for
+    `reset_timeout` seconds; then it half-opens and lets one trial call
+    through. A successful trial closes the circuit, a failed one reopens it.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    def before_call(self, name="Upstream"):
+        with self._lock:
+            if self.state == "closed" or not self.failure_threshold:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+            self.rejected += 1
+            raise UpstreamError(503, f"{name} is unavailable; failing fast while it recovers.",
+                                retry_after=max(remaining, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.failure_threshold and self._failures >= self.failure_threshold):
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about the upstream's health (cancelled, bad input)."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_outage(error):
+    """Whether an exception means the upstream is struggling (as opposed to a bad request)."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class Upstream:
+    """
+    Rate limiter plus circuit breaker for one upstream service. `call` and
+    `call_blocking` run a request through both and turn httpx/requests errors
+    into UpstreamError. With a shared `store` the rate limit applies across
+    worker processes; the breaker is always per process.
+    """
+
+    def __init__(self, name, rate_per_minute=0.0, burst=1, max_wait=5.0, failure_threshold=5, reset_timeout=30.0,
+                 store=None):
+        self.name = name
+        if store is not None:
+            # One quota for all worker processes (see shared_state.py)
+            self.limiter = SharedTokenBucket(store, f"rate:{name}", rate_per_minute / 60.0, burst, max_wait)
+        else:
+            self.limiter = TokenBucket(rate_per_minute / 60.0, burst, max_wait)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def failed(self, error):
+        """Record a failed request and return the UpstreamError to raise for it."""
+        if is_outage(error):
+            self.breaker.record_failure()
+        else:
+            # The service answered; only this request was bad
+            self.breaker.record_success()
+        status = _status_code(error)
+        detail = f"Error querying {self.name} API: {error}"
+        return UpstreamError(429 if status == 429 else 502, detail)
+
+    async def call(self, fn):
+        """Await `fn()` under the breaker; `fn` should acquire the limiter per attempt."""
+        self.breaker.before_call(self.name)
+        try:
+            result = await fn()
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            raise self.failed(e) from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def call_blocking(self, fn):
+        self.breaker.before_call(self.name)
+        try:
+            result = fn()
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            raise self.failed(e) from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stats(self):
+        return {"rate_limit": self.limiter.stats(), "circuit": self.breaker.stats()}
@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from shared_state import SharedStateError, get_shared_store
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+# Path of the SQLite file for the on-disk tier; empty keeps the cache in memory
+# only. With a shared state backend (see shared_state.py) that tier is used instead
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "")
+RESPONSE_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# Set per request (see the X-Cache-Bypass header in main.py) to skip cache reads
+cache_bypass = contextvars.ContextVar("cache_bypass", default=False)
+
+
+def cache_key(prompt, model):
+    """Content address of a completion: hash of the model name and final prompt."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed tier that survives restarts; evicts least recently used rows."""
+
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN"
+                    " (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class _SharedTier:
+    """Tier in the shared state store, seen by every worker process; store errors count as misses."""
+
+    _PREFIX = "response:"
+
+    def __init__(self, store):
+        self._store = store
+
+    def get(self, key):
+        try:
+            return self._store.get(self._PREFIX + key)
+        except SharedStateError:
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self._store.set(self._PREFIX + key, value, ttl)
+        except SharedStateError:
+            pass
+
+    def __len__(self):
+        try:
+            return self._store.count(self._PREFIX)
+        except SharedStateError:
+            return 0
+
+    def clear(self):
+        self._store.delete_prefix(self._PREFIX)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM completions.
+    An in-memory LRU tier sits in front of an optional SQLite tier, or of the
+    shared store when one is given; entries expire after `ttl` seconds in both.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL,
+                 db_path=RESPONSE_CACHE_DB, disk_max_entries=RESPONSE_CACHE_DISK_MAX_ENTRIES, shared=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if shared is not None:
+            self._disk = _SharedTier(shared)
+        else:
+            self._disk = _DiskTier(db_path, disk_max_entries) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.time():
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+        return None
+
+    def _get_disk(self, key):
+        value = self._disk.get(key) if self._disk is not None else None
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+        return value
+
+    def _missed(self):
+        with self._lock:
+            self.misses += 1
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_disk(key)
+        if value is None:
+            self._missed()
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value, self.ttl)
+
+    # The SQLite and shared tiers block on file locks or the network, so
+    # coroutines use these: the memory tier inline, the other tier on a thread
+    async def aget(self, key):
+        value = self._get_memory(key)
+        if value is None and self._disk is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            self._missed()
+        return value
+
+    async def aset(self, key, value):
+        self._remember(key, value)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, self.ttl)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+        }
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(shared=get_shared_store())
+    return _cache
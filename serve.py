@@ -0,0 +1,56 @@
+"""
+Production launcher: runs the API in several worker processes.
+
+Uvicorn starts --workers processes that accept connections on one socket.
+Each process keeps its own in-memory state, so whatever the workers must
+agree on goes through the shared state backend (see shared_state.py): the
+second tier of the response and extraction caches, the LLM and translation
+rate limits, and background jobs. With more than one worker and no backend
+configured, a SQLite file on this host is used; use Redis when workers run
+on several hosts.
+
+The process pools each worker starts (PDF extraction, video decoding)
+are sized to split the host's cores between the workers, unless
+PDF_WORKERS and WORKER_PROCESSES are set.
+
+    python serve.py --workers 4
+    SHARED_STATE_BACKEND=redis SHARED_STATE_URL=redis://cache:6379/0 python serve.py --workers 8 --host 0.0.0.0
+"""
+import argparse
+import os
+import sys
+
+BACKENDS = ("none", "memory", "sqlite", "redis")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+                        help="worker processes (default: WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backend", choices=BACKENDS, default=os.getenv("SHARED_STATE_BACKEND"),
+                        help="shared state backend (default: SHARED_STATE_BACKEND, or sqlite with several workers)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    backend = args.backend or ("sqlite" if args.workers > 1 else "none")
+    if args.workers > 1 and backend in ("none", "memory"):
+        parser.error(f"{args.workers} workers need a shared state backend (sqlite or redis), not {backend!r}")
+
+    # Configuration is read at import time, so set it before the workers import the app
+    os.environ["SHARED_STATE_BACKEND"] = backend
+    if backend != "none":
+        os.environ.setdefault("JOB_STORE", "shared")
+    cores = max(1, (os.cpu_count() or 1) // args.workers)
+    os.environ.setdefault("PDF_WORKERS", str(cores))
+    os.environ.setdefault("WORKER_PROCESSES", str(cores))
+
+    import uvicorn
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
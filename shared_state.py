@@ -0,0 +1,323 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Where state shared by every worker process lives: "none" keeps caches, rate
+# limits and jobs private to each process (a single worker), "memory" is an
+# in-process stand-in with the same interface (tests, one worker), "sqlite"
+# shares a file between the workers of one host and "redis" uses a
+# Redis-protocol server for workers on any number of hosts
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "none")
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "shared_state.db")
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "redis://localhost:6379/0")
+# Prepended to every Redis key, so one server can hold several deployments
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "quen_gen:")
+# Calls are made while requests wait, so a locked file or unreachable server must
+# fail fast: callers then fall back (cache miss, per-process rate limit)
+SHARED_STATE_TIMEOUT = float(os.getenv("SHARED_STATE_TIMEOUT", "1"))
+
+
+class SharedStateError(Exception):
+    """The shared store could not be reached or failed to answer."""
+
+
+def _take_token(state, now, rate, burst, max_wait):
+    """
+    One token-bucket reservation (see resilience.TokenBucket) against a
+    stored {"tokens", "updated"} state, or None for a full bucket. Returns
+    the new state, whether the token was granted and the wait for it.
+    """
+    tokens, updated = (state["tokens"], state["updated"]) if state else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    wait = max(0.0, (1 - tokens) / rate)
+    if wait > max_wait:
+        return state, False, wait
+    return {"tokens": tokens - 1, "updated": now}, True, wait
+
+
+def _bucket_ttl(rate, burst, max_wait):
+    # After this long an untouched bucket is full again, so dropping it changes nothing
+    return burst / rate + max_wait + 1
+
+
+class MemoryStore:
+    """Shared-store interface backed by a dict; state is private to this process."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def count(self, prefix):
+        now = time.time()
+        with self._lock:
+            return sum(1 for key in list(self._entries) if key.startswith(prefix) and self._live(key, now))
+
+    def items(self, prefix):
+        """(key, value) pairs of the live keys starting with `prefix`."""
+        now = time.time()
+        with self._lock:
+            entries = [(key, self._live(key, now)) for key in list(self._entries) if key.startswith(prefix)]
+        return [(key, entry[0]) for key, entry in entries if entry is not None]
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def reserve(self, key, rate, burst, max_wait):
+        """Take a token from the bucket at `key`: (granted, seconds to wait for it)."""
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            state, granted, wait = _take_token(json.loads(entry[0]) if entry else None, now, rate, burst, max_wait)
+            if granted:
+                self._entries[key] = (json.dumps(state), now + _bucket_ttl(rate, burst, max_wait))
+        return granted, wait
+
+
+class SQLiteStore:
+    """
+    Shared store in a SQLite file, for worker processes on one host. Each
+    process opens its own connection; token reservations run in an
+    immediate transaction so concurrent workers serialize on the file lock.
+    A call that cannot get the lock within `timeout` seconds fails.
+    Expired rows are skipped on read and purged every few hundred writes.
+    """
+
+    name = "sqlite"
+    _PURGE_EVERY = 256
+
+    def __init__(self, path=SHARED_STATE_DB, timeout=SHARED_STATE_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self.errors = 0
+
+    def _connection(self):
+        # Reconnect after a fork: a connection must not be shared between processes
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS state_expires_at ON state(expires_at)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _run(self, fn):
+        with self._lock:
+            try:
+                return fn(self._connection())
+            except sqlite3.Error as e:
+                self.errors += 1
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise SharedStateError(f"Shared state file {self.path}: {e}") from e
+
+    def get(self, key):
+        row = self._run(lambda conn: conn.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone())
+        return row[0] if row is not None else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+
+        def write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None),
+            )
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+        self._run(write)
+
+    def delete(self, key):
+        self._run(lambda conn: conn.execute("DELETE FROM state WHERE key = ?", (key,)))
+
+    def count(self, prefix):
+        (total,) = self._run(lambda conn: conn.execute(
+            "SELECT COUNT(*) FROM state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        ).fetchone())
+        return total
+
+    def items(self, prefix):
+        """(key, value) pairs of the live keys starting with `prefix`."""
+        return self._run(lambda conn: conn.execute(
+            "SELECT key, value FROM state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        ).fetchall())
+
+    def delete_prefix(self, prefix):
+        self._run(lambda conn: conn.execute(
+            "DELETE FROM state WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff")
+        ))
+
+    def reserve(self, key, rate, burst, max_wait):
+        """Take a token from the bucket at `key`: (granted, seconds to wait for it)."""
+
+        def take(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            state, granted, wait = _take_token(json.loads(row[0]) if row else None, now, rate, burst, max_wait)
+            if granted:
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(state), now + _bucket_ttl(rate, burst, max_wait)),
+                )
+            conn.execute("COMMIT")
+            return granted, wait
+
+        return self._run(take)
+
+
+# Same reservation as _take_token, atomic on the server and timed by its clock
+_RESERVE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate, burst, max_wait = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = math.max(0, (1 - tokens) / rate)
+if wait > max_wait then
+    return {0, tostring(wait)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {1, tostring(wait)}
+"""
+
+
+class RedisStore:
+    """
+    Shared store on a Redis-protocol server (Redis, Valkey, KeyDB, ...), for
+    workers on any number of hosts. Token reservations run as a server-side
+    script. Every key is prefixed with SHARED_STATE_PREFIX.
+    """
+
+    name = "redis"
+
+    def __init__(self, url=SHARED_STATE_URL, prefix=SHARED_STATE_PREFIX, timeout=SHARED_STATE_TIMEOUT):
+        # Imported here so the redis package is only needed for this backend
+        import redis
+
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=timeout, socket_connect_timeout=timeout,
+        )
+        self._reserve = self._redis.register_script(_RESERVE_SCRIPT)
+        self._error = redis.RedisError
+        self.errors = 0
+
+    def _run(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except self._error as e:
+            self.errors += 1
+            raise SharedStateError(f"Shared state server: {e}") from e
+
+    def get(self, key):
+        return self._run(self._redis.get, self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self._run(self._redis.set, self.prefix + key, value, px=max(1, int(ttl * 1000)) if ttl else None)
+
+    def delete(self, key):
+        self._run(self._redis.delete, self.prefix + key)
+
+    def _keys(self, prefix):
+        return self._redis.scan_iter(match=self.prefix + prefix + "*", count=1000)
+
+    def count(self, prefix):
+        """Walks the matching keys, so it is slow for large namespaces; used by the stats endpoints."""
+        return self._run(lambda: sum(1 for _ in self._keys(prefix)))
+
+    def items(self, prefix):
+        """(key, value) pairs of the keys starting with `prefix`; walks them like count()."""
+        def fetch():
+            keys = list(self._keys(prefix))
+            pairs = []
+            for start in range(0, len(keys), 1000):
+                batch = keys[start:start + 1000]
+                pairs.extend(zip(batch, self._redis.mget(batch)))
+            # Keys that expired between the scan and the read come back as None
+            return [(key[len(self.prefix):], value) for key, value in pairs if value is not None]
+
+        return self._run(fetch)
+
+    def delete_prefix(self, prefix):
+        def delete():
+            keys = list(self._keys(prefix))
+            for start in range(0, len(keys), 1000):
+                self._redis.unlink(*keys[start:start + 1000])
+
+        self._run(delete)
+
+    def reserve(self, key, rate, burst, max_wait):
+        """Take a token from the bucket at `key`: (granted, seconds to wait for it)."""
+        ttl_ms = int(_bucket_ttl(rate, burst, max_wait) * 1000)
+        granted, wait = self._run(self._reserve, keys=[self.prefix + key], args=[rate, burst, max_wait, ttl_ms])
+        return bool(int(granted)), float(wait)
+
+
+def make_store(kind=SHARED_STATE_BACKEND):
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "sqlite":
+        return SQLiteStore()
+    if kind == "redis":
+        return RedisStore()
+    raise ValueError(f"Unknown shared state backend: {kind}")
+
+
+_store = None
+
+
+def get_shared_store():
+    """Return the process-wide shared store, or None when state is kept per process."""
+    global _store
+    if SHARED_STATE_BACKEND == "none":
+        return None
+    if _store is None:
+        _store = make_store()
+    return _store
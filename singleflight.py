@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1") == "1"
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+    The first caller (the leader) starts the work as a task; callers that
+    arrive while it is in flight await the same task instead of starting their
+    own. The key is released as soon as the task finishes, so a failed or timed
+    out call is never reused by later callers.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.deduplicated = 0
+        self.failures = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.deduplicated += 1
+        # Shielded so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so it is not reported as unhandled when every
+        # waiter has already gone away
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "deduplicated": self.deduplicated,
+            "failures": self.failures,
+        }
+
+
+_singleflight = None
+
+
+def get_singleflight():
+    """Return the process-wide coalescing group, or None when disabled."""
+    global _singleflight
+    if not SINGLEFLIGHT_ENABLED:
+        return None
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
@@ -0,0 +1,91 @@
+import streamlit as st
+from fastapi import HTTPException
+
+from b import (
+    convert_video_file_to_text,
+    extract_text_from_pdf,
+    extract_text_from_word,
+    get_supported_languages,
+    query_llm,
+    transcribe_audio_file,
+    translate_text,
+)
+
+
+# Streamlit front end: streamlit run streamlit_app.py
+def main():
+    st.title("Multilingual Question Generator")
+
+    # Input Type Selection
+    input_type = st.sidebar.selectbox("Select Input Type", ["Text", "File", "Video", "Audio"])
+    syllabus = None
+
+    # Handle different input types
+    if input_type == "Text":
+        syllabus = st.text_area("Enter Syllabus or Content")
+
+    elif input_type == "File":
+        uploaded_file = st.file_uploader("Upload a PDF, Word, or Text file", type=["pdf", "docx", "txt"])
+        if uploaded_file is not None:
+            if uploaded_file.name.endswith('.pdf'):
+                syllabus = extract_text_from_pdf(uploaded_file)
+            elif uploaded_file.name.endswith('.docx'):
+                syllabus = extract_text_from_word(uploaded_file)
+            elif uploaded_file.name.endswith('.txt'):
+                syllabus = uploaded_file.read().decode("utf-8")
+
+    elif input_type == "Video":
+        uploaded_video = st.file_uploader("Upload a Video file", type=["mp4", "mkv", "avi"])
+        if uploaded_video is not None:
+            syllabus = convert_video_file_to_text(uploaded_video, uploaded_video.name, "en-US")
+
+    elif input_type == "Audio":
+        uploaded_audio = st.file_uploader("Upload an Audio file", type=["wav", "mp3", "m4a"])
+        if uploaded_audio is not None:
+            syllabus = transcribe_audio_file(uploaded_audio, uploaded_audio.name, "en-US")
+
+    # Display extracted content
+    if syllabus:
+        st.subheader("Extracted Syllabus:")
+        st.text_area("Extracted Content", syllabus, height=200)
+
+        # Question Generator Section
+        st.subheader("Question Generator")
+        question_type = st.selectbox("Select Question Type", ["MCQ", "Fill in the Blanks", "True/False", "Matching"])
+        num_questions = st.number_input("Number of Questions", min_value=1, max_value=20, step=1)
+        difficulty = st.selectbox("Difficulty Level", ["Easy", "Medium", "Hard"]).lower()
+
+        # Fetch Supported Languages
+        languages = get_supported_languages()
+        if "Error" in languages:
+            st.error("Could not fetch language options.")
+            return
+        selected_language = st.selectbox("Select Language", list(languages.keys()))
+        target_language_code = languages[selected_language]
+
+        # Generate Questions and Translate
+        if st.button("Generate Questions"):
+            with st.spinner("Generating questions..."):
+                # Generate questions (dummy logic, replace with actual implementation)
+                try:
+                    if question_type == "MCQ":
+                        result = query_llm(f"Generate {num_questions} MCQs based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
+                    elif question_type == "Fill in the Blanks":
+                        result = query_llm(f"Generate {num_questions} 'Fill in the Blanks' questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
+                    elif question_type == "True/False":
+                        result = query_llm(f"Generate {num_questions} True/False questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
+                    elif question_type == "Matching":
+                        result = query_llm(f"Generate {num_questions} matching questions based on the following syllabus:\n\n{syllabus}\n\nDifficulty: {difficulty}.")
+                    else:
+                        st.error("Invalid Question Type Selected.")
+                        return
+
+                    # Translate the output
+                    translated_result = translate_text(result, target_language_code)
+                    st.text_area("Translated Questions", translated_result, height=300)
+                except HTTPException as e:
+                    st.error(e.detail)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Configuration is read at import time, so pin it before any app module loads:
+# the offline LLM and speech backends, no latency, and no state outside this process
+os.environ.update({
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_LATENCY": "0",
+    "FAKE_LLM_ERROR_RATE": "0",
+    "RESPONSE_CACHE_ENABLED": "1",
+    "RESPONSE_CACHE_DB": "",
+    "EXTRACTION_CACHE_DB": "",
+    "QUESTION_BANK_ENABLED": "0",
+    "SHARED_STATE_BACKEND": "none",
+    "JOB_STORE": "memory",
+    "STT_BACKEND": "stub",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
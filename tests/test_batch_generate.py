@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import batch_generate
+
+
+def run(tmp_path, manifest_lines, *extra):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("\n".join(manifest_lines) + "\n")
+    output = tmp_path / "quizzes.jsonl"
+    status = batch_generate.main([str(manifest), "--output", str(output), "--mcq", "2",
+                                  "--extract-workers", "1", *extra])
+    records = [json.loads(line) for line in output.read_text().splitlines() if line.strip()]
+    return status, {record["id"]: record for record in records}
+
+
+def test_missing_document_is_reported_as_failed(tmp_path):
+    (tmp_path / "notes.txt").write_text("Enzymes lower the activation energy of reactions.")
+
+    status, records = run(tmp_path, ["notes.txt", "missing_doc.txt"])
+
+    assert status == 1
+    assert records["notes.txt"]["status"] == "ok"
+    assert records["missing_doc.txt"]["status"] == "failed"
+    assert "No such file" in records["missing_doc.txt"]["errors"]["extraction"]
+
+
+def test_resume_skips_done_documents_but_retries_missing_ones(tmp_path):
+    (tmp_path / "notes.txt").write_text("Osmosis moves water across a membrane.")
+    run(tmp_path, ["notes.txt", "missing_doc.txt"])
+
+    status, records = run(tmp_path, ["notes.txt", "missing_doc.txt"])
+
+    lines = (tmp_path / "quizzes.jsonl").read_text().splitlines()
+    assert status == 1
+    assert [json.loads(line)["id"] for line in lines].count("notes.txt") == 1
+    assert [json.loads(line)["id"] for line in lines].count("missing_doc.txt") == 2
+
+
+def test_report_every_must_be_positive(tmp_path):
+    with pytest.raises(SystemExit):
+        batch_generate.main([str(tmp_path), "--output", str(tmp_path / "out.jsonl"), "--report-every", "0"])
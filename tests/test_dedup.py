@@ -0,0 +1,129 @@
+import pytest
+
+from dedup import NearDuplicateIndex, QuestionHistory, dedupe, normalize
+
+
+def test_normalize_drops_case_and_punctuation():
+    assert normalize("  What is  ATP's role?! ") == "what is atp s role"
+
+
+def test_rephrased_question_is_a_near_duplicate():
+    index = NearDuplicateIndex()
+    index.add("Which organelle produces most of the ATP in a eukaryotic cell?", item_id="q1")
+    match = index.query("Which organelle produces most of the ATP in the eukaryotic cell")
+    assert match is not None and match[0] == "q1" and match[1] >= index.threshold
+
+
+def test_different_questions_are_not_duplicates():
+    index = NearDuplicateIndex()
+    index.add("What is the capital of France?")
+    assert index.query("What is the capital of Spain?") is None
+    assert index.query("Which gas do plants absorb during photosynthesis?") is None
+
+
+def test_negation_is_not_a_duplicate():
+    index = NearDuplicateIndex()
+    index.add("Mitochondria contain their own DNA.")
+    assert index.query("Mitochondria do not contain their own DNA.") is None
+
+
+def test_best_match_is_returned():
+    index = NearDuplicateIndex(threshold=0.3)
+    index.add("Photosynthesis converts light energy into chemical energy stored in glucose", item_id="close")
+    index.add("Photosynthesis converts light energy into heat", item_id="far")
+    assert index.query("Photosynthesis converts light energy into chemical energy stored in sugar")[0] == "close"
+
+
+def test_add_if_new_and_ids():
+    index = NearDuplicateIndex()
+    assert index.add_if_new("Define osmosis.")
+    assert not index.add_if_new("Define osmosis")
+    assert index.add_if_new("Define diffusion.")
+    assert len(index) == 2 and index.ids == [0, 1]
+
+
+def test_index_grows_past_its_initial_buffers():
+    index = NearDuplicateIndex()
+    texts = [f"Question {i} about enzyme number {i * 7919} and substrate {i * 104729}" for i in range(300)]
+    for text in texts:
+        index.add(text)
+    assert len(index) == 300
+    assert index.query(texts[0])[0] == 0 and index.query(texts[-1])[0] == 299
+
+
+def test_common_phrasing_buckets_stop_growing():
+    index = NearDuplicateIndex(bucket_cap=4)
+    for topic in ("mitosis", "meiosis", "osmosis", "diffusion", "respiration", "photosynthesis"):
+        index.add(f"Which of the following best describes {topic}?")
+    assert index.query("Which of the following best describes mitosis?")[0] == 0
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
+
+
+def test_dedupe_keeps_first_occurrence_and_checks_history():
+    history = NearDuplicateIndex()
+    history.add("What is the powerhouse of the cell?")
+    items = [
+        {"question": "Define osmosis."},
+        {"question": "Define osmosis!"},
+        {"question": "What is the powerhouse of the cell"},
+        {"term": "Diffusion", "match": "Movement down a gradient"},
+    ]
+    kept = dedupe(items, history_index=history)
+    assert kept == [items[0], items[3]]
+    assert len(history) == 3
+
+
+def test_question_history_evicts_least_recently_used_syllabi():
+    history = QuestionHistory(max_syllabi=2)
+    first = history.index_for("syllabus one", "mcq")
+    history.index_for("syllabus two", "mcq")
+    assert history.index_for("syllabus one", "mcq") is first
+    history.index_for("syllabus three", "mcq")
+    assert history.index_for("syllabus one", "mcq") is first
+    assert history.stats()["syllabi"] == 2
+
+
+def test_shared_history_is_seen_by_every_worker():
+    import asyncio
+
+    from dedup import _publisher
+    from shared_state import MemoryStore
+
+    store = MemoryStore()
+    # Two worker processes, each with its own history, sharing one store
+    first, second = QuestionHistory(store=store), QuestionHistory(store=store)
+
+    async def scenario():
+        index = await first.aindex_for("Cell biology", "mcq")
+        dedupe([{"question": "Which organelle makes ATP?"}], history_index=index)
+        _publisher.submit(lambda: None).result()
+        other = await second.aindex_for("Cell biology", "mcq")
+        kept = dedupe([{"question": "Which organelle makes ATP"}, {"question": "Define osmosis."}],
+                      history_index=other)
+        _publisher.submit(lambda: None).result()
+        # Pulling again adds only what this worker has not seen
+        again = await first.aindex_for("Cell biology", "mcq")
+        return kept, len(other), len(again)
+
+    kept, second_items, first_items = asyncio.run(scenario())
+    assert kept == [{"question": "Define osmosis."}]
+    assert second_items == 2 and first_items == 2
+    assert len(store.items("history:")) == 2
+
+
+@pytest.mark.parametrize("kind, marker", [
+    ("mcq", "multiple-choice"), ("fill_in_the_blanks", "Fill in the Blank"), ("true_false", "True/False"),
+])
+def test_fake_backend_questions_are_not_near_duplicates(kind, marker):
+    import question_parser
+    from llm_backends import FakeBackend
+
+    # Numbered fake questions must all survive the filter, without per-item tricks in the backend
+    text = FakeBackend().respond(f"Generate 30 {marker} questions on the water cycle.")
+    items = getattr(question_parser, f"parse_{kind}")(text)
+    assert len(items) == 30
+    assert len(dedupe(items)) == 30
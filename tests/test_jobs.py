@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from jobs import InMemoryJobStore, JobManager
+from shared_state import SharedStateError
+
+
+class FlakyStore(InMemoryJobStore):
+    """Job store whose next `failures[method]` calls raise like an unreachable shared store."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = {}
+
+    def _maybe_fail(self, method):
+        if self.failures.get(method):
+            self.failures[method] -= 1
+            raise SharedStateError("store down")
+
+    def create(self, job):
+        self._maybe_fail("create")
+        super().create(job)
+
+    def update(self, job_id, **fields):
+        self._maybe_fail("update")
+        super().update(job_id, **fields)
+
+    def get(self, job_id):
+        self._maybe_fail("get")
+        return super().get(job_id)
+
+
+async def echo(report, value):
+    report("working", 0.5)
+    return value
+
+
+def test_store_failure_does_not_stop_the_worker():
+    async def scenario():
+        store = FlakyStore()
+        manager = JobManager(store=store, workers=1)
+        await manager.start()
+        cleaned = []
+        try:
+            store.failures["update"] = 1
+            first = await manager.submit("test", echo, 1, cleanup=lambda: cleaned.append("first"))
+            second = await manager.submit("test", echo, 2, cleanup=lambda: cleaned.append("second"))
+            await asyncio.wait_for(manager._queue.join(), 5)
+            return manager, cleaned, await manager.get(first["id"]), await manager.get(second["id"])
+        finally:
+            await manager.stop()
+
+    manager, cleaned, first, second = asyncio.run(scenario())
+    assert cleaned == ["first", "second"]
+    assert first["status"] == "succeeded"
+    assert second["status"] == "succeeded" and second["result"] == 2
+    assert manager.stats()["store_errors"] == 1
+
+
+def test_store_failure_on_submit_and_get_is_503():
+    async def scenario():
+        store = FlakyStore()
+        manager = JobManager(store=store, workers=1)
+        await manager.start()
+        cleaned = []
+        try:
+            store.failures["create"] = 1
+            with pytest.raises(HTTPException) as submitted:
+                await manager.submit("test", echo, 1, cleanup=lambda: cleaned.append(True))
+            store.failures["get"] = 1
+            with pytest.raises(HTTPException) as polled:
+                await manager.get("some-job")
+            return submitted.value, polled.value, cleaned
+        finally:
+            await manager.stop()
+
+    submitted, polled, cleaned = asyncio.run(scenario())
+    assert submitted.status_code == polled.status_code == 503
+    assert submitted.headers["Retry-After"]
+    # The refused job's upload is released straight away
+    assert cleaned == [True]
+
+
+def test_full_queue_refuses_with_429_and_cleans_up():
+    async def scenario():
+        manager = JobManager(store=InMemoryJobStore(), workers=0, max_queued=2)
+        await manager.start()
+        cleaned = []
+        try:
+            await manager.submit("test", echo, 1)
+            await manager.submit("test", echo, 2)
+            with pytest.raises(HTTPException) as refused:
+                await manager.submit("test", echo, 3, cleanup=lambda: cleaned.append(True))
+            return manager, refused.value, cleaned
+        finally:
+            await manager.stop()
+
+    manager, refused, cleaned = asyncio.run(scenario())
+    assert refused.status_code == 429 and refused.headers["Retry-After"] == "5"
+    assert cleaned == [True]
+    assert manager.stats()["rejected"] == 1 and manager.stats()["queue_depth"] == 2
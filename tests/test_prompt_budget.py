@@ -0,0 +1,28 @@
+from prompt_budget import clean_syllabus
+
+
+def test_clean_syllabus_keeps_repeated_content_lines_in_pasted_text():
+    syllabus = "\n".join([
+        "Course outline",
+        "Week 1", "Cell structure",
+        "Week 2", "Cell membranes",
+        "Week 3", "Respiration",
+        "Week 4", "Photosynthesis",
+        "Key dates",
+        "2024",
+        "12",
+    ])
+    assert clean_syllabus(syllabus) == syllabus
+
+
+def test_clean_syllabus_strips_headers_footers_and_page_numbers_of_pages():
+    pages = [
+        f"BIOLOGY 101 Chapter 4\nWeek {page}\nPhotosyn-\nthesis makes sugar.\n2024\nPage {page} of 4"
+        for page in range(1, 5)
+    ]
+    cleaned = clean_syllabus("\f".join(pages))
+    assert "BIOLOGY" not in cleaned and "Page" not in cleaned
+    assert cleaned.count("Photosynthesis makes sugar.") == 4
+    # Lines inside a page are content, however often they repeat
+    assert all(f"Week {page}" in cleaned for page in range(1, 5))
+    assert cleaned.count("2024") == 4
@@ -0,0 +1,43 @@
+import asyncio
+import sqlite3
+
+import question_bank
+from question_bank import QuestionBank, generate_questions, store_questions
+
+
+def _locked_bank(tmp_path, monkeypatch):
+    path = str(tmp_path / "question_bank.db")
+    bank = QuestionBank(path, timeout=0.05)
+    monkeypatch.setattr(question_bank, "QUESTION_BANK_ENABLED", True)
+    monkeypatch.setattr(question_bank, "_bank", bank)
+    # Another process holding the write lock
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN EXCLUSIVE")
+    return holder
+
+
+def test_locked_bank_write_is_logged_not_raised(tmp_path, monkeypatch, caplog):
+    holder = _locked_bank(tmp_path, monkeypatch)
+    errors = question_bank.stats["errors"]
+    try:
+        asyncio.run(store_questions("Syllabus", "mcq", "medium", [{"id": "1", "question": "What is DNA?"}]))
+    finally:
+        holder.execute("ROLLBACK")
+    assert question_bank.stats["errors"] == errors + 1
+    assert "question bank" in caplog.text
+
+
+def test_locked_bank_read_generates_everything(tmp_path, monkeypatch):
+    holder = _locked_bank(tmp_path, monkeypatch)
+
+    async def generate(syllabus, count, difficulty, exclude=None):
+        return "\n".join(f"Q{i}" for i in range(count))
+
+    def parse(text):
+        return [{"id": line, "question": f"Question {line}?"} for line in text.splitlines()]
+
+    try:
+        items = asyncio.run(generate_questions(generate, parse, "mcq", "Syllabus", 3, "medium", from_bank=True))
+    finally:
+        holder.execute("ROLLBACK")
+    assert len(items) == 3
@@ -0,0 +1,125 @@
+import json
+
+from question_parser import StreamingQuestionParser, parse_mcq, parse_questions, parse_true_false
+
+MCQS = [
+    {"question": "Which organelle makes ATP?", "options": ["Nucleus", "Mitochondrion", "Ribosome", "Golgi body"],
+     "answer": "B", "explanation": "It runs cellular respiration."},
+    {"question": "Where does photosynthesis happen?", "options": ["Chloroplast", "Vacuole", "Nucleus", "Lysosome"],
+     "answer": "A", "explanation": "Chloroplasts hold chlorophyll."},
+]
+
+LEGACY_MCQ = """Q1. Which organelle makes ATP?
+A. Nucleus
+B. Mitochondrion
+C. Ribosome
+D. Golgi body
+Answer: B
+Explanation: It runs cellular respiration.
+Q2. Where does photosynthesis happen?
+A) Chloroplast
+B) Vacuole
+C) Nucleus
+D) Lysosome
+Correct Answer: A
+Explanation: Chloroplasts hold chlorophyll."""
+
+
+def questions(items):
+    return [(item["question"], item["answer"]) for item in items]
+
+
+EXPECTED = [("Which organelle makes ATP?", "B"), ("Where does photosynthesis happen?", "A")]
+
+
+def test_parse_plain_json():
+    items = parse_mcq(json.dumps(MCQS))
+    assert questions(items) == EXPECTED
+    assert items[0]["options"] == "A. Nucleus\nB. Mitochondrion\nC. Ribosome\nD. Golgi body"
+    assert all(item["id"] for item in items)
+
+
+def test_parse_fenced_json():
+    assert questions(parse_mcq(f"```json\n{json.dumps(MCQS, indent=2)}\n```")) == EXPECTED
+
+
+def test_parse_json_after_preamble():
+    assert questions(parse_mcq(f"Sure! Here are your questions:\n\n{json.dumps(MCQS)}\nGood luck!")) == EXPECTED
+
+
+def test_parse_truncated_json_keeps_complete_items():
+    text = json.dumps(MCQS)
+    truncated = text[:text.index('"explanation": "Chloroplasts')]
+    assert questions(parse_mcq(truncated)) == EXPECTED[:1]
+
+
+def test_parse_wrapped_json():
+    assert questions(parse_mcq(json.dumps({"questions": MCQS}))) == EXPECTED
+
+
+def test_parse_skips_invalid_items():
+    text = json.dumps([MCQS[0], {"question": "No options", "answer": "A"}, MCQS[1]])
+    assert questions(parse_mcq(text)) == EXPECTED
+
+
+def test_parse_legacy_blocks_without_blank_lines():
+    items = parse_mcq(LEGACY_MCQ)
+    assert questions(items) == EXPECTED
+    assert items[1]["options"] == "A. Chloroplast\nB. Vacuole\nC. Nucleus\nD. Lysosome"
+    assert items[1]["explanation"] == "Chloroplasts hold chlorophyll."
+
+
+def test_parse_legacy_true_false_without_numbering():
+    text = ("Plants need light.\nAnswer: true\nExplanation: For photosynthesis.\n"
+            "Mitochondria store DNA only in plants.\nAnswer: False.\nExplanation: Animal mitochondria have DNA too.")
+    assert questions(parse_true_false(text)) == [("Plants need light.", "True"),
+                                                  ("Mitochondria store DNA only in plants.", "False")]
+
+
+def stream(kind, text, size):
+    parser = StreamingQuestionParser(kind)
+    batches = [parser.feed(text[start:start + size]) for start in range(0, len(text), size)]
+    return batches, parser.finish()
+
+
+def test_streaming_json_matches_whole_parse_for_any_chunking():
+    text = f"```json\n{json.dumps(MCQS)}\n```"
+    for size in (1, 7, 64, len(text)):
+        batches, rest = stream("mcq", text, size)
+        assert questions([item for batch in batches for item in batch] + rest) == EXPECTED
+
+
+def test_streaming_json_emits_each_item_when_it_closes():
+    text = json.dumps(MCQS)
+    first_end = text.index("}") + 1
+    parser = StreamingQuestionParser("mcq")
+    assert questions(parser.feed(text[:first_end])) == EXPECTED[:1]
+    assert questions(parser.feed(text[first_end:])) == EXPECTED[1:]
+    assert parser.finish() == []
+
+
+def test_streaming_json_after_preamble_is_parsed_at_finish():
+    batches, rest = stream("mcq", f"Here you go:\n{json.dumps({'questions': MCQS})}", 16)
+    assert not any(batches)
+    assert questions(rest) == EXPECTED
+
+
+def test_streaming_legacy_emits_question_when_the_next_starts():
+    parser = StreamingQuestionParser("mcq")
+    head, tail = LEGACY_MCQ.split("Q2.")
+    assert parser.feed(head) == []
+    # Lines are read once their newline arrives
+    assert parser.feed("Q2. Where does photosynthesis happen?") == []
+    assert questions(parser.feed("\n")) == EXPECTED[:1]
+    assert questions(parser.feed(tail.split("\n", 1)[1]) + parser.finish()) == EXPECTED[1:]
+
+
+def test_streaming_truncated_json_keeps_complete_items():
+    text = json.dumps(MCQS)
+    batches, rest = stream("mcq", text[:text.rindex("{") + 20], 5)
+    assert questions([item for batch in batches for item in batch] + rest) == EXPECTED[:1]
+
+
+def test_parse_questions_matching_pairs():
+    text = json.dumps([{"term": "Osmosis", "match": "Water crossing a membrane"}, {"term": "Only a term"}])
+    assert parse_questions("matching", text) == [{"term": "Osmosis", "match": "Water crossing a membrane"}]
@@ -0,0 +1,137 @@
+import asyncio
+import types
+
+import httpx
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, SharedTokenBucket, TokenBucket, Upstream, UpstreamError
+from shared_state import MemoryStore, SharedStateError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace resilience's clock with one the test advances by hand."""
+    fake = types.SimpleNamespace(now=1000.0)
+    fake.monotonic = lambda: fake.now
+    fake.sleep = lambda seconds: None
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+
+def test_token_bucket_allows_a_burst_then_refuses(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, max_wait=0)
+    for _ in range(3):
+        assert bucket._reserve("LLM") == 0.0
+    with pytest.raises(UpstreamError) as refused:
+        bucket._reserve("LLM")
+    assert refused.value.status_code == 429 and refused.value.headers["Retry-After"] == "1"
+
+    clock.now += 0.5
+    assert bucket._reserve("LLM") == 0.0
+    assert bucket.stats()["refused"] == 1
+
+
+def test_token_bucket_queues_callers_within_max_wait(clock):
+    bucket = TokenBucket(rate=2.0, burst=1, max_wait=1.0)
+    assert bucket._reserve("LLM") == 0.0
+    assert bucket._reserve("LLM") == pytest.approx(0.5)
+    assert bucket._reserve("LLM") == pytest.approx(1.0)
+    with pytest.raises(UpstreamError):
+        bucket._reserve("LLM")
+    assert bucket.stats()["throttled"] == 2
+
+
+def test_token_bucket_without_rate_never_limits(clock):
+    bucket = TokenBucket(rate=0, burst=1, max_wait=0)
+    assert all(bucket._reserve("LLM") == 0.0 for _ in range(100))
+
+
+def test_shared_token_buckets_draw_from_one_quota():
+    store = MemoryStore()
+    workers = [SharedTokenBucket(store, "rate:llm", rate=0.001, burst=2, max_wait=0) for _ in range(2)]
+    workers[0]._reserve("LLM")
+    workers[1]._reserve("LLM")
+    with pytest.raises(UpstreamError):
+        workers[0]._reserve("LLM")
+
+
+def test_shared_token_bucket_falls_back_to_a_local_bucket():
+    class DownStore(MemoryStore):
+        def reserve(self, *args):
+            raise SharedStateError("store down")
+
+    bucket = SharedTokenBucket(DownStore(), "rate:llm", rate=0.001, burst=1, max_wait=0)
+    assert bucket._reserve("LLM") == 0.0
+    with pytest.raises(UpstreamError):
+        bucket._reserve("LLM")
+    assert bucket.stats()["store_errors"] == 2
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamError) as refused:
+        breaker.before_call("LLM")
+    assert refused.value.status_code == 503 and refused.value.headers["Retry-After"] == "30"
+
+
+def test_half_open_circuit_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(UpstreamError):
+        breaker.before_call()
+
+    # A failed trial reopens the circuit, a successful one closes it
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    assert breaker.stats() == {"state": "closed", "consecutive_failures": 0, "opened": 2, "rejected": 1}
+
+
+def test_released_trial_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_breaker_without_threshold_never_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=0, reset_timeout=30)
+    for _ in range(10):
+        breaker.record_failure()
+        breaker.before_call()
+
+
+def test_upstream_only_counts_outages_against_the_circuit(clock):
+    upstream = Upstream("LLM", failure_threshold=1)
+    request = httpx.Request("POST", "https://llm.invalid")
+
+    async def answer(status):
+        response = httpx.Response(status, request=request)
+        raise httpx.HTTPStatusError("failed", request=request, response=response)
+
+    with pytest.raises(UpstreamError) as bad_request:
+        asyncio.run(upstream.call(lambda: answer(400)))
+    assert bad_request.value.status_code == 502 and upstream.breaker.state == "closed"
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(upstream.call(lambda: answer(503)))
+    assert upstream.breaker.state == "open"
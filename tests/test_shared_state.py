@@ -0,0 +1,64 @@
+import asyncio
+import sqlite3
+import time
+
+from resilience import SharedTokenBucket
+from response_cache import ResponseCache
+from shared_state import SQLiteStore
+
+
+def locked_store(tmp_path):
+    """A SQLite store whose file another process holds the write lock on."""
+    path = str(tmp_path / "shared_state.db")
+    store = SQLiteStore(path, timeout=0.3)
+    store.set("warm", "up")
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN EXCLUSIVE")
+    return store, holder
+
+
+async def with_ticker(work):
+    """Run `work` while counting how often the event loop gets to run something else."""
+    ticks = 0
+    done = False
+
+    async def ticker():
+        nonlocal ticks
+        while not done:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    try:
+        result = await work
+    finally:
+        done = True
+        await task
+    return result, ticks
+
+
+def test_locked_store_fails_open_without_blocking_the_loop(tmp_path):
+    store, holder = locked_store(tmp_path)
+    cache = ResponseCache(shared=store)
+    limiter = SharedTokenBucket(store, "rate:llm", rate=1.0, burst=1, max_wait=0)
+
+    async def scenario():
+        start = time.perf_counter()
+        cached, ticks = await with_ticker(cache.aget("some-prompt"))
+        _, more_ticks = await with_ticker(limiter.acquire("LLM"))
+        await cache.aset("some-prompt", "completion")
+        return cached, ticks + more_ticks, time.perf_counter() - start
+
+    try:
+        cached, ticks, elapsed = asyncio.run(scenario())
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+    assert cached is None and cache.stats()["misses"] == 1
+    # The limiter fell back to its local bucket and the write was dropped
+    assert limiter.stats()["store_errors"] == 1 and limiter.stats()["refused"] == 0
+    assert cache.get("some-prompt") == "completion"
+    assert elapsed < 3
+    # About 0.6 s of lock waits, during which the loop kept running
+    assert ticks >= 20
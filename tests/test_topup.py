@@ -0,0 +1,47 @@
+import asyncio
+
+import b
+from llm_backends import get_backend
+from question_parser import parse_mcq
+from topup import generate_with_topup
+
+
+def junk_once(monkeypatch):
+    """Make the fake backend answer the first prompt with text that parses to nothing."""
+    backend = get_backend()
+    complete = backend.complete
+    prompts = []
+
+    async def fake_complete(prompt, model=None, timeout=None):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            return "Sorry, I can't help with that."
+        return await complete(prompt, model, timeout=timeout)
+
+    monkeypatch.setattr(backend, "complete", fake_complete)
+    return prompts
+
+
+def test_topup_after_unparseable_completion_asks_again(monkeypatch):
+    prompts = junk_once(monkeypatch)
+    syllabus = "Topup retry: the mitochondria releases energy from glucose."
+
+    items = asyncio.run(generate_with_topup(b.generate_mcq, parse_mcq, syllabus, 3, "easy"))
+
+    assert len(items) == 3
+    assert len(prompts) == 2
+    # The follow-up is a different prompt, so the response cache cannot answer it
+    assert prompts[1] != prompts[0]
+
+
+def test_unparseable_completion_is_not_cached(monkeypatch):
+    prompts = junk_once(monkeypatch)
+    syllabus = "Cache check: photosynthesis stores light energy as sugar."
+
+    asyncio.run(generate_with_topup(b.generate_mcq, parse_mcq, syllabus, 3, "easy", max_rounds=0))
+    items = asyncio.run(generate_with_topup(b.generate_mcq, parse_mcq, syllabus, 3, "easy", max_rounds=0))
+
+    # The second identical request went upstream again instead of replaying the junk
+    assert len(prompts) == 2
+    assert prompts[1] == prompts[0]
+    assert len(items) == 3
@@ -0,0 +1,42 @@
+import subprocess
+import tracemalloc
+
+import pytest
+
+import media
+from b import transcribe_audio_file
+
+MINUTES = 3
+
+
+@pytest.fixture(scope="module")
+def mp3(tmp_path_factory):
+    """A long 44.1 kHz stereo mp3: about 30 MB once fully decoded."""
+    path = tmp_path_factory.mktemp("audio") / "lecture.mp3"
+    try:
+        subprocess.run([
+            media.ffmpeg_binary(), "-v", "error", "-y",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={MINUTES * 60}",
+            "-ac", "2", "-c:a", "libmp3lame", "-b:a", "64k", str(path),
+        ], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        pytest.skip(f"ffmpeg cannot encode mp3 here: {e}")
+    return path
+
+
+def test_mp3_upload_is_transcribed_with_bounded_memory(mp3, monkeypatch):
+    # Spill the decoded PCM to disk early, as a long recording would
+    monkeypatch.setattr(media, "MEDIA_SPOOL_BYTES", 1024 * 1024)
+    fractions = []
+    with open(mp3, "rb") as upload:
+        tracemalloc.start()
+        try:
+            text = transcribe_audio_file(upload, "lecture.mp3", progress=fractions.append)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert text.startswith("[") and "s of speech]" in text
+    assert fractions[-1] == 1.0
+    # Decoding the whole file in memory (pydub) would need the 30 MB twice over
+    assert peak < 12 * 1024 * 1024, f"peak {peak / 1e6:.1f} MB"
@@ -0,0 +1,37 @@
+import translation
+
+
+def fake_translate(monkeypatch):
+    sent = []
+
+    def request(texts, target_language):
+        sent.extend(texts)
+        return [f"<{target_language}>{text}" for text in texts]
+
+    monkeypatch.setattr(translation, "_request_translations", request)
+    monkeypatch.setattr(translation, "memory", translation.TranslationMemory())
+    return sent
+
+
+def test_translate_quiz_keeps_answer_keys_and_option_labels(monkeypatch):
+    sent = fake_translate(monkeypatch)
+    quiz = {
+        "mcq": [{"id": "q1", "question": "Which organelle makes ATP?",
+                 "options": "A. Nucleus\nB. Mitochondrion\nC. Ribosome\nD. Golgi body",
+                 "answer": "B", "explanation": "It runs cellular respiration."}],
+        "true_false": [{"id": "q2", "question": "Plants photosynthesize.", "answer": "True", "explanation": ""}],
+        "fill_in_the_blanks": [{"id": "q3", "question": "Water moves by ____.", "answer": "osmosis",
+                                "explanation": "Across a membrane."}],
+    }
+
+    translated = translation.translate_quiz(quiz, "fr")
+
+    mcq = translated["mcq"][0]
+    assert mcq["id"] == "q1"
+    assert mcq["answer"] == "B"
+    assert mcq["options"].split("\n") == ["A. <fr>Nucleus", "B. <fr>Mitochondrion", "C. <fr>Ribosome",
+                                          "D. <fr>Golgi body"]
+    assert translated["true_false"][0]["answer"] == "True"
+    assert translated["fill_in_the_blanks"][0]["answer"] == "<fr>osmosis"
+    assert "B" not in sent and "True" not in sent
+    assert not any(text.startswith(("A. ", "B. ")) for text in sent)
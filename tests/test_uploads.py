@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import tempfile
+import time
+
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+import main
+from uploads import UploadLimitMiddleware, read_upload
+
+
+def limited_client(max_bytes):
+    return TestClient(UploadLimitMiddleware(main.app, max_bytes=max_bytes))
+
+
+def test_upload_over_the_content_length_limit_is_refused():
+    response = limited_client(1000).post("/process-file/", files={"file": ("notes.txt", b"x" * 5000)})
+    assert response.status_code == 413
+
+
+def test_streamed_body_over_the_limit_is_refused():
+    def body():
+        for _ in range(10):
+            yield b"x" * 500
+
+    response = limited_client(1000).post("/process-text/", content=body(),
+                                         headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_read_upload_hashes_the_spooled_file_without_copying():
+    content = b"Mitochondria make ATP. " * 1000
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+    spooled.write(content)
+    spooled.seek(0)
+    upload = UploadFile(spooled, filename="notes.txt")
+
+    file = asyncio.run(read_upload(upload))
+    asyncio.run(upload.close())
+
+    assert file is spooled and not file.closed
+    assert file.sha256 == hashlib.sha256(content).hexdigest()
+    assert file.read() == content
+    file.close()
+
+
+def test_job_upload_outlives_the_request():
+    content = b"Mitochondria make ATP. " * 1000
+    with TestClient(main.app) as client:
+        job = client.post("/jobs/", files={"file": ("notes.txt", content)}).json()
+        for _ in range(200):
+            result = client.get(f"/jobs/{job['job_id']}").json()
+            if result["status"] in ("succeeded", "failed"):
+                break
+            time.sleep(0.01)
+    assert result["status"] == "succeeded"
+    assert result["result"] == content.decode()
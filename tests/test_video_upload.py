@@ -0,0 +1,55 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import b
+import main
+from worker_pools import WorkerPool
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def copies(monkeypatch):
+    """Paths of the temporary video copies made by the endpoint."""
+    paths = []
+
+    def spool(file, filename):
+        paths.append(b.spool_to_path(file, filename))
+        return paths[-1]
+
+    monkeypatch.setattr(main, "spool_to_path", spool)
+    return paths
+
+
+def test_timed_out_worker_keeps_its_copy_until_done(monkeypatch, copies):
+    # A thread pool stands in for the process pool so the slow decoder can be patched in
+    monkeypatch.setattr(main, "cpu_pool", WorkerPool("cpu", ThreadPoolExecutor, 1, timeout=0.05))
+    seen = []
+
+    def slow_decode(video_path, language="en-US"):
+        time.sleep(0.3)
+        seen.append(os.path.exists(video_path))
+        return "transcript"
+
+    monkeypatch.setattr(b, "convert_video_to_text", slow_decode)
+    response = client.post("/process-file/", files={"file": ("lecture.mp4", b"\x00" * 4096)})
+    assert response.status_code == 504
+
+    for _ in range(100):
+        if seen:
+            break
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert seen == [True]
+    assert not os.path.exists(copies[0])
+
+
+def test_refused_job_removes_its_copy(monkeypatch, copies):
+    monkeypatch.setattr(main, "cpu_pool", WorkerPool("cpu", ThreadPoolExecutor, 1, max_pending=0))
+    response = client.post("/process-file/", files={"file": ("lecture.mp4", b"\x00" * 4096)})
+    assert response.status_code == 429
+    assert not os.path.exists(copies[0])
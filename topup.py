@@ -0,0 +1,96 @@
+import asyncio
+import os
+
+from fastapi import HTTPException
+
+from dedup import Deduplicator, item_text
+from llm_client import backoff_delay
+from metrics import span
+
+
+# Follow-up requests allowed per generation when some questions fail to parse
+TOPUP_MAX_ROUNDS = int(os.getenv("TOPUP_MAX_ROUNDS", "2"))
+
+# Counters for the stats endpoint
+stats = {"requests": 0, "short": 0, "topup_calls": 0, "topup_items": 0, "topup_errors": 0, "unfilled": 0}
+
+
+async def generate_with_topup(generate, parse, syllabus, num_questions, difficulty,
+                              max_rounds=TOPUP_MAX_ROUNDS, history_index=None, commit=True, initial=None):
+    """
+    Generate `num_questions` items, topping up instead of regenerating.
+    `generate(syllabus, n, difficulty, exclude=...)` is one of the generate_*
+    coroutines from b.py and `parse` the matching parser. When fewer valid
+    items come back than were asked for, a follow-up request asks only for
+    the missing count and lists the questions already produced so they are
+    not repeated. At most `max_rounds` follow-ups are made; a round that
+    yields nothing backs off exponentially before the next one. An upstream
+    error on the first request propagates; one during a follow-up ends the
+    top-up and the questions gathered so far are returned.
+    Near-duplicate questions are dropped like unparseable ones (and so also
+    topped up), as are repeats of questions in `history_index`, a
+    dedup.NearDuplicateIndex of questions already served for this syllabus.
+    With `commit` the kept questions are added to that history.
+    `initial` items are questions already in hand (from the question bank):
+    they are kept first and only the rest is generated.
+    """
+    stats["requests"] += 1
+    items = []
+    # Dropped repeats are listed in follow-ups too, so the model moves away from them
+    repeated = []
+    deduplicator = Deduplicator(history_index)
+
+    def add_items(batch):
+        added = 0
+        for item in batch:
+            if len(items) >= num_questions:
+                continue
+            if not deduplicator.accept(item):
+                repeated.append(item_text(item))
+                continue
+            items.append(item)
+            added += 1
+        return added
+
+    def add(text):
+        with span("parse"):
+            batch = parse(text)
+        return add_items(batch)
+
+    add_items(initial or [])
+    if len(items) < num_questions:
+        exclude = [item_text(item) for item in items] or None
+        try:
+            add(await generate(syllabus, num_questions - len(items), difficulty, exclude=exclude))
+        except HTTPException:
+            # With questions already in hand, a failed request only leaves the response short
+            if not items:
+                raise
+            stats["topup_errors"] += 1
+            max_rounds = 0
+        if len(items) < num_questions:
+            stats["short"] += 1
+
+    empty_rounds = 0
+    for _ in range(max_rounds):
+        missing = num_questions - len(items)
+        if missing <= 0:
+            break
+        if empty_rounds:
+            await asyncio.sleep(backoff_delay(empty_rounds - 1))
+        stats["topup_calls"] += 1
+        # A list even when empty: the prompt then asks for a readable retry (see b.exclusion_note)
+        exclude = [item_text(item) for item in items] + repeated
+        try:
+            added = add(await generate(syllabus, missing, difficulty, exclude=exclude))
+        except HTTPException:
+            stats["topup_errors"] += 1
+            break
+        stats["topup_items"] += added
+        empty_rounds = 0 if added else empty_rounds + 1
+
+    if len(items) < num_questions:
+        stats["unfilled"] += 1
+    if commit:
+        deduplicator.commit()
+    return items
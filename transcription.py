@@ -0,0 +1,178 @@
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+
+STT_BACKEND = os.getenv("STT_BACKEND", "google")  # "google" or "stub"
+STT_SEGMENT_SECONDS = float(os.getenv("STT_SEGMENT_SECONDS", "30"))
+STT_OVERLAP_SECONDS = float(os.getenv("STT_OVERLAP_SECONDS", "1"))
+# "silence" moves each cut to the quietest point near the window end; "fixed" cuts at window boundaries
+STT_SPLIT_MODE = os.getenv("STT_SPLIT_MODE", "silence")
+STT_CONCURRENCY = int(os.getenv("STT_CONCURRENCY", "4"))
+
+# How far back from the window end to look for a pause when splitting on silence
+_SILENCE_SEARCH_SECONDS = 5.0
+_MIN_SILENCE_MS = 300
+
+
+class RecognizerError(Exception):
+    """The recognition service could not be reached or refused the request."""
+
+
+class GoogleRecognizer:
+    """Backend using SpeechRecognition's Google Web Speech client."""
+
+    def recognize(self, audio, language):
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        data = sr.AudioData(audio.raw_data, audio.frame_rate, audio.sample_width)
+        try:
+            result = recognizer.recognize_google(data, language=language, show_all=True)
+        except sr.UnknownValueError:
+            return "", 0.0
+        except sr.RequestError as e:
+            raise RecognizerError(str(e))
+        if not result or 'alternative' not in result:
+            return "", 0.0
+        # Handle missing 'confidence' key
+        best = max(result['alternative'], key=lambda x: x.get('confidence', 0))
+        return best['transcript'], best.get('confidence', 0.0)
+
+
+class StubRecognizer:
+    """
+    Offline backend for tests and benchmarks. Returns a deterministic
+    transcript for each segment, or whatever `transcribe(audio)` returns.
+    """
+
+    def __init__(self, transcribe=None):
+        self.transcribe = transcribe
+
+    def recognize(self, audio, language):
+        if self.transcribe is not None:
+            return self.transcribe(audio), 1.0
+        return f"[{len(audio) / 1000:.1f}s of speech]", 1.0
+
+
+def get_recognizer(kind=STT_BACKEND):
+    if kind == "google":
+        return GoogleRecognizer()
+    if kind == "stub":
+        return StubRecognizer()
+    raise ValueError(f"Unknown speech-to-text backend: {kind}")
+
+
+def iter_segments(wav_file, segment_seconds=STT_SEGMENT_SECONDS, overlap_seconds=STT_OVERLAP_SECONDS,
+                  split_mode=STT_SPLIT_MODE):
+    """
+    Yield (start_seconds, end_seconds, AudioSegment) for consecutive mono
+    segments of a PCM WAV file (path or file object). Only one window is read
+    into memory at a time, so memory is bounded by the segment length rather
+    than the recording length.
+    """
+    with wave.open(wav_file, "rb") as reader:
+        rate = reader.getframerate()
+        width = reader.getsampwidth()
+        channels = reader.getnchannels()
+        total = reader.getnframes()
+        window = max(int(segment_seconds * rate), 1)
+        overlap = min(int(overlap_seconds * rate), window // 2)
+
+        start = 0
+        while start < total:
+            reader.setpos(start)
+            frames = reader.readframes(min(window, total - start))
+            audio = AudioSegment(data=frames, sample_width=width, frame_rate=rate, channels=channels)
+            if channels > 1:
+                audio = audio.set_channels(1)
+
+            length = len(frames) // (width * channels)
+            if start + length < total and split_mode == "silence":
+                cut = _quiet_cut(audio)
+                if cut is not None:
+                    length = int(cut * rate / 1000)
+                    audio = audio[:cut]
+
+            yield start / rate, (start + length) / rate, audio
+            if start + length >= total:
+                break
+            # Pause-aligned cuts don't split words, so they need no overlap
+            start += length if split_mode == "silence" and length < window else max(length - overlap, 1)
+
+
+def _quiet_cut(audio):
+    """Millisecond offset of the middle of the last pause near the end of `audio`."""
+    search_from = max(len(audio) - int(_SILENCE_SEARCH_SECONDS * 1000), len(audio) // 2)
+    tail = audio[search_from:]
+    silences = detect_silence(tail, min_silence_len=_MIN_SILENCE_MS, silence_thresh=audio.dBFS - 16)
+    if not silences:
+        return None
+    silence_start, silence_end = silences[-1]
+    return search_from + (silence_start + silence_end) // 2
+
+
+def _merge_overlap(previous, current, max_words=12):
+    # Overlapping windows can repeat a few words at the seam; drop them from the second one
+    before, after = previous.split(), current.split()
+    for size in range(min(max_words, len(before), len(after)), 0, -1):
+        if [w.lower() for w in before[-size:]] == [w.lower() for w in after[:size]]:
+            return " ".join(after[size:])
+    return current
+
+
+def transcribe_segments(wav_file, language="en-US", recognizer=None, concurrency=STT_CONCURRENCY,
+                        progress=None, **segment_options):
+    """
+    Transcribe a WAV file segment by segment, `concurrency` segments at a time,
+    and stitch the results in order. `progress`, if given, is called with the
+    fraction of the recording transcribed so far.
+    Returns {"text": ..., "segments": [{"start", "end", "text", "confidence"}, ...]}.
+    """
+    recognizer = recognizer or get_recognizer()
+    duration = _duration(wav_file)
+    segments = []
+    errors = []
+
+    def collect(start, end, future):
+        try:
+            text, confidence = future.result()
+        except RecognizerError as e:
+            errors.append(str(e))
+            text, confidence = "", 0.0
+        segments.append({"start": round(start, 3), "end": round(end, 3), "text": text, "confidence": confidence})
+        if progress is not None and duration:
+            progress(min(end / duration, 1.0))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = []
+        for start, end, audio in iter_segments(wav_file, **segment_options):
+            in_flight.append((start, end, executor.submit(recognizer.recognize, audio, language)))
+            # Keep at most `concurrency` segments buffered so memory stays bounded
+            if len(in_flight) >= concurrency:
+                collect(*in_flight.pop(0))
+        for item in in_flight:
+            collect(*item)
+
+    if errors and not any(segment["text"] for segment in segments):
+        raise RecognizerError(errors[0])
+
+    parts = []
+    for segment in segments:
+        text = segment["text"]
+        if parts and text:
+            text = _merge_overlap(parts[-1], text)
+        if text:
+            parts.append(text)
+    return {"text": " ".join(parts), "segments": segments}
+
+
+def _duration(wav_file):
+    with wave.open(wav_file, "rb") as reader:
+        duration = reader.getnframes() / reader.getframerate()
+    if hasattr(wav_file, "seek"):
+        wav_file.seek(0)
+    return duration
@@ -0,0 +1,259 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from fastapi import HTTPException
+from requests.adapters import HTTPAdapter
+
+from metrics import span
+from resilience import Upstream
+from shared_state import get_shared_store
+
+
+TRANSLATE_API_URL = os.getenv("TRANSLATE_API_URL", "https://translation.googleapis.com/language/translate/v2")
+# Google accepts up to 128 "q" values per request; keep well inside the payload limit too
+TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "100"))
+TRANSLATE_BATCH_CHARS = int(os.getenv("TRANSLATE_BATCH_CHARS", "25000"))
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", "50000"))
+LANGUAGES_TTL = float(os.getenv("LANGUAGES_TTL", "86400"))
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "30"))
+# Client-side quota and circuit breaker for the translation API (see LLM_RATE_* in llm_client)
+TRANSLATE_RATE_PER_MINUTE = float(os.getenv("TRANSLATE_RATE_PER_MINUTE", "0"))
+TRANSLATE_RATE_BURST = int(os.getenv("TRANSLATE_RATE_BURST", "5"))
+TRANSLATE_RATE_MAX_WAIT = float(os.getenv("TRANSLATE_RATE_MAX_WAIT", "5"))
+TRANSLATE_BREAKER_FAILURES = int(os.getenv("TRANSLATE_BREAKER_FAILURES", "5"))
+TRANSLATE_BREAKER_RESET = float(os.getenv("TRANSLATE_BREAKER_RESET", "30"))
+
+# Question fields that hold translatable text
+QUIZ_TEXT_FIELDS = ("question", "options", "answer", "explanation", "item")
+# "A. text" option lines: only the text is translated, the label is kept
+_OPTION_LINE = re.compile(r"^(\(?[A-Fa-f][.)]\s+)(.*)$", re.DOTALL)
+
+upstream = Upstream(
+    "Translation", TRANSLATE_RATE_PER_MINUTE, TRANSLATE_RATE_BURST, TRANSLATE_RATE_MAX_WAIT,
+    TRANSLATE_BREAKER_FAILURES, TRANSLATE_BREAKER_RESET,
+    store=get_shared_store(),
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared requests session so translation calls reuse pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _api_key():
+    api_key = os.getenv("GOOGLE_TRANSLATE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="API key not configured.")
+    return api_key
+
+
+class TranslationMemory:
+    """LRU map of (source text hash, target language) -> translated text."""
+
+    def __init__(self, max_entries=TRANSLATION_MEMORY_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+
+    @staticmethod
+    def key(text, target_language):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), target_language
+
+    def get(self, text, target_language):
+        key = self.key(text, target_language)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, text, target_language, translation):
+        key = self.key(text, target_language)
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "upstream_calls": self.upstream_calls,
+        }
+
+
+memory = TranslationMemory()
+
+
+def _batches(texts):
+    batch, chars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= TRANSLATE_BATCH_SIZE or chars + len(text) > TRANSLATE_BATCH_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        yield batch
+
+
+def _get_json(method, url, **kwargs):
+    # One rate-limited, circuit-broken call to the translation API
+    def call():
+        upstream.limiter.acquire_blocking(upstream.name)
+        with span("translation"):
+            response = get_session().request(method, url, timeout=TRANSLATE_TIMEOUT, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+    return upstream.call_blocking(call)
+
+
+def _request_translations(texts, target_language):
+    data = [("q", text) for text in texts]
+    data += [("target", target_language), ("format", "text"), ("key", _api_key())]
+    result = _get_json("POST", TRANSLATE_API_URL, data=data)
+    memory.upstream_calls += 1
+    return [item["translatedText"] for item in result["data"]["translations"]]
+
+
+def translate_segments(texts, target_language):
+    """
+    Translate a list of strings. Each distinct string is looked up in the
+    translation memory first; only the misses are sent upstream, batched
+    into multi-"q" requests.
+    """
+    translations = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        if not text.strip():
+            translations[text] = text
+            continue
+        cached = memory.get(text, target_language)
+        if cached is None:
+            missing.append(text)
+        else:
+            translations[text] = cached
+
+    for batch in _batches(missing):
+        for text, translated in zip(batch, _request_translations(batch, target_language)):
+            memory.set(text, target_language, translated)
+            translations[text] = translated
+
+    return [translations[text] for text in texts]
+
+
+def translate_text(text, target_language):
+    return translate_segments([text], target_language)[0]
+
+
+def _is_answer_key(question, field, value):
+    # MCQ answers are option letters and True/False answers are values clients
+    # compare against; both stay as they are
+    if field != "answer":
+        return False
+    value = value.strip()
+    return value in ("True", "False") or ("options" in question and re.fullmatch(r"[A-Fa-f]", value) is not None)
+
+
+def _option_parts(line):
+    """(label, text) of one option line; the label is "" for unlabelled lines."""
+    match = _OPTION_LINE.match(line)
+    return (match.group(1), match.group(2)) if match else ("", line)
+
+
+def _collect(node, segments):
+    # Walk question dicts/lists and collect the text of translatable fields
+    if isinstance(node, list):
+        for child in node:
+            _collect(child, segments)
+    elif isinstance(node, dict):
+        for field, value in node.items():
+            if field in QUIZ_TEXT_FIELDS and isinstance(value, str):
+                if _is_answer_key(node, field, value):
+                    continue
+                # Options are one line per choice; translate them separately
+                if field == "options":
+                    segments.extend(_option_parts(line)[1] for line in value.split("\n"))
+                else:
+                    segments.append(value)
+            else:
+                _collect(value, segments)
+
+
+def _rebuild(node, translated):
+    if isinstance(node, list):
+        return [_rebuild(child, translated) for child in node]
+    if isinstance(node, dict):
+        rebuilt = {}
+        for field, value in node.items():
+            if field in QUIZ_TEXT_FIELDS and isinstance(value, str):
+                if _is_answer_key(node, field, value):
+                    rebuilt[field] = value
+                elif field == "options":
+                    rebuilt[field] = "\n".join(
+                        _option_parts(line)[0] + next(translated) for line in value.split("\n")
+                    )
+                else:
+                    rebuilt[field] = next(translated)
+            else:
+                rebuilt[field] = _rebuild(value, translated)
+        return rebuilt
+    return node
+
+
+def translate_quiz(questions, target_language):
+    """
+    Translate generated questions segment by segment (question, the text of
+    each option, answer, explanation, matching items), keeping ids and
+    structure intact. Option labels, MCQ answer letters and True/False
+    answers are not translated, so answers still match the options.
+    """
+    segments = []
+    _collect(questions, segments)
+    translated = iter(translate_segments(segments, target_language))
+    return _rebuild(questions, translated)
+
+
+_languages = None
+_languages_fetched_at = 0.0
+_languages_lock = threading.Lock()
+
+
+def get_supported_languages():
+    """Supported languages ({name: code}), fetched at most once per LANGUAGES_TTL."""
+    global _languages, _languages_fetched_at
+    with _languages_lock:
+        if _languages is not None and time.monotonic() - _languages_fetched_at < LANGUAGES_TTL:
+            return _languages
+
+        params = {
+            "key": _api_key(),
+            "target": "en",  # Fetch language names in English
+        }
+        result = _get_json("GET", f"{TRANSLATE_API_URL}/languages", params=params)
+        _languages = {lang["name"]: lang["language"] for lang in result["data"]["languages"]}
+        _languages_fetched_at = time.monotonic()
+        return _languages
@@ -0,0 +1,102 @@
+import hashlib
+import io
+import json
+import os
+
+from fastapi import HTTPException, UploadFile
+from starlette.formparsers import MultiPartParser
+
+from metrics import span
+
+
+# Request bodies (uploads) larger than this are rejected with 413
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+# Uploads are kept in memory up to this size and spill to an anonymous temp file above it
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Starlette spools each uploaded file while it parses the request body
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_BYTES
+
+
+def _too_large(max_bytes):
+    return f"Upload exceeds the {max_bytes} byte limit."
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects request bodies over `max_bytes` with 413 before they are spooled:
+    at once when Content-Length is too large, otherwise as soon as the
+    streamed body passes the limit. In that case the app sees the client
+    disconnect and its own response is dropped.
+    """
+
+    def __init__(self, app, max_bytes=UPLOAD_MAX_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def _refuse(self, send):
+        body = json.dumps({"detail": _too_large(self.max_bytes)}).encode("utf-8")
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await self._refuse(send)
+
+        received = 0
+        started = refused = False
+
+        async def limited_receive():
+            nonlocal received, refused
+            if refused:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    refused = True
+                    if not started:
+                        await self._refuse(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if refused:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+
+async def read_upload(upload: UploadFile, max_bytes=UPLOAD_MAX_BYTES):
+    """
+    Take over the file Starlette spooled the upload into, without copying it.
+    The file is hashed in place (its `sha256` attribute holds the hex digest)
+    and returned positioned at the start. It is detached from the request, so
+    it outlives it (background jobs); the caller closes it.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with span("upload_read"):
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                await upload.close()
+                raise HTTPException(status_code=413, detail=_too_large(max_bytes))
+            digest.update(chunk)
+        await upload.seek(0)
+    file = upload.file
+    # The request closes its form files once the response is sent; leave it an empty stand-in
+    upload.file = io.BytesIO()
+    file.sha256 = digest.hexdigest()
+    return file
@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+# Thread pool for I/O-bound work (document reads, calls to the speech API)
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+# Process pool for CPU-bound decoding/transcoding
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+# Jobs allowed per pool (running + queued) before requests are refused with 429
+WORKER_MAX_PENDING = int(os.getenv("WORKER_MAX_PENDING", "32"))
+WORKER_JOB_TIMEOUT = float(os.getenv("WORKER_JOB_TIMEOUT", "600"))
+
+
+class WorkerPool:
+    """
+    Bounded executor wrapper used from async handlers.
+    Jobs are refused once `max_pending` are running or queued. A job that
+    exceeds its timeout is reported as failed to the caller but keeps its slot
+    until the underlying work really finishes, so back-pressure stays accurate.
+    """
+
+    def __init__(self, name, executor_class, max_workers, max_pending=WORKER_MAX_PENDING,
+                 timeout=WORKER_JOB_TIMEOUT):
+        self.name = name
+        self.executor_class = executor_class
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.busy_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self.executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, fn, *args, timeout=None):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"The {self.name} worker pool is busy. Please retry shortly.",
+                    headers={"Retry-After": "5"},
+                )
+            self.pending += 1
+
+        started = time.monotonic()
+        if self.executor_class is ThreadPoolExecutor:
+            # Threads run in the caller's context, so per-request state (timing spans) carries over
+            fn, args = contextvars.copy_context().run, (fn, *args)
+        future = self._get_executor().submit(fn, *args)
+        future.add_done_callback(lambda f: self._finished(f, started))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=504, detail=f"The {self.name} job timed out.")
+
+    def _finished(self, future, started):
+        # Runs in the executor's thread once the job is really over
+        with self._lock:
+            self.pending -= 1
+            self.busy_seconds += time.monotonic() - started
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queued": max(self.pending - self.max_workers, 0),
+            "utilization": min(self.pending, self.max_workers) / self.max_workers,
+            "average_utilization": self.busy_seconds / (elapsed * self.max_workers) if elapsed else 0.0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+io_pool = WorkerPool("io", ThreadPoolExecutor, WORKER_THREADS)
+cpu_pool = WorkerPool("cpu", ProcessPoolExecutor, WORKER_PROCESSES)
+
+
+def shutdown_pools():
+    io_pool.shutdown()
+    cpu_pool.shutdown()
+
+
+def pool_stats():
+    return {"io": io_pool.stats(), "cpu": cpu_pool.stats()}